@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+corpus.py - مولّد مدخلات اصطناعية قابلة لإعادة الإنتاج لاختبارات الأداء
+كل المولدات تعتمد على مكتبة بايثون القياسية فقط (بما فيها XLSX و DOCX و PDF)
+حتى يعمل الجناح دون اتصال على أي جهاز لينكس عادي.
+
+المعامل scale يضبط الحجم: 1.0 = الحجم الكامل (ملايين الصفوف)، 0.01 = تجربة سريعة.
+"""
+
+import io
+import os
+import gzip
+import json
+import zlib
+import random
+import sqlite3
+import tarfile
+import zipfile
+from xml.sax.saxutils import escape
+
+SEED = 20260213
+FIXED_DATE = (2026, 1, 1, 0, 0, 0)
+FIXED_MTIME = 1767225600
+
+WORDS_EN = ("archive extraction text model training data table value record document "
+            "report summary index section chapter figure result method analysis sample").split()
+WORDS_AR = "أرشيف استخراج نص نموذج تدريب بيانات جدول قيمة سجل مستند تقرير ملخص فهرس قسم فصل نتيجة".split()
+
+
+def _scaled(n, scale, minimum=1):
+    return max(minimum, int(n * scale))
+
+
+def _sentence(rng, words=12):
+    pool = WORDS_EN + WORDS_AR
+    return " ".join(rng.choice(pool) for _ in range(words))
+
+
+def _text_blob(rng, size):
+    """نص متعدد الأسطر بحجم تقريبي size بايت"""
+    parts = []
+    total = 0
+    while total < size:
+        line = _sentence(rng, rng.randint(6, 18)) + "\n"
+        parts.append(line)
+        total += len(line.encode('utf-8'))
+    return "".join(parts)
+
+
+def _ascii_sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS_EN) for _ in range(words))
+
+
+# ============ أرشيفات ============
+def make_zip_many_small(path, scale, rng):
+    count = _scaled(20000, scale, 10)
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for i in range(count):
+            info = zipfile.ZipInfo(f"project/module_{i // 200:03d}/file_{i:06d}.txt", FIXED_DATE)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            zf.writestr(info, _text_blob(rng, rng.randint(200, 4000)))
+    return {'members': count}
+
+
+def make_zip_few_huge(path, scale, rng):
+    count = 4
+    member_size = _scaled(32 * 1024 * 1024, scale, 64 * 1024)
+    # كتلة واحدة تتكرر حتى يبقى التوليد سريعاً مع بقاء البيانات قابلة للضغط بشكل واقعي
+    block = _text_blob(rng, 256 * 1024)
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for i in range(count):
+            info = zipfile.ZipInfo(f"dumps/huge_{i}.log", FIXED_DATE)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with zf.open(info, 'w', force_zip64=True) as out:
+                written = 0
+                while written < member_size:
+                    data = f"[{i}:{written}] ".encode('utf-8') + block.encode('utf-8')
+                    out.write(data)
+                    written += len(data)
+    return {'members': count}
+
+
+def make_tar_gz_nested(path, scale, rng):
+    count = _scaled(5000, scale, 10)
+
+    def add(tar, name, data):
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = FIXED_MTIME
+        tar.addfile(info, io.BytesIO(data))
+
+    # أرشيف داخلي يُضمَّن كعضو في الأرشيف الخارجي
+    inner = io.BytesIO()
+    with gzip.GzipFile(fileobj=inner, mode='wb', mtime=0) as gz:
+        with tarfile.open(fileobj=gz, mode='w') as inner_tar:
+            for i in range(max(1, count // 10)):
+                add(inner_tar, f"inner/notes_{i:05d}.md", _text_blob(rng, 1500).encode('utf-8'))
+
+    with open(path, 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as gz:
+            with tarfile.open(fileobj=gz, mode='w') as tar:
+                for i in range(count):
+                    depth = "/".join(f"level{d}_{(i >> d) % 4}" for d in range(1, 6))
+                    add(tar, f"root/{depth}/doc_{i:06d}.txt", _text_blob(rng, rng.randint(300, 3000)).encode('utf-8'))
+                add(tar, "root/bundles/inner.tar.gz", inner.getvalue())
+    return {'members': count + 1}
+
+
+# ============ قواعد بيانات ============
+def make_sqlite_large(path, scale, rng):
+    rows = _scaled(2_000_000, scale, 100)
+    if os.path.exists(path):
+        os.unlink(path)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, created_at TEXT, user_id INTEGER, "
+                 "amount REAL, message TEXT, payload BLOB)")
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, joined INTEGER)")
+    conn.executemany("INSERT INTO users VALUES (?, ?, ?)",
+                     ((i, f"user_{i}", FIXED_MTIME - i * 3600) for i in range(_scaled(10000, scale, 10))))
+    batch = []
+    for i in range(rows):
+        batch.append((i, f"2025-{1 + i % 12:02d}-{1 + i % 28:02d} {i % 24:02d}:{i % 60:02d}:00",
+                      i % 10000, round(rng.random() * 1000, 2), _ascii_sentence(rng, 8),
+                      b'\x00\x01' * 8 if i % 100 == 0 else None))
+        if len(batch) >= 50000:
+            conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)", batch)
+            batch = []
+    if batch:
+        conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)", batch)
+    conn.commit()
+    conn.close()
+    return {'rows': rows}
+
+
+# ============ XLSX (SpreadsheetML خام) ============
+def _col_letter(index):
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def make_xlsx_multi_sheet(path, scale, rng):
+    sheets = 6
+    rows = _scaled(50000, scale, 20)
+    headers = ["id", "date", "customer", "amount", "notes"]
+    content_types = ['<?xml version="1.0" encoding="UTF-8" standalone="yes"?>',
+                     '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">',
+                     '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>',
+                     '<Default Extension="xml" ContentType="application/xml"/>',
+                     '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>']
+    workbook_sheets = []
+    workbook_rels = []
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for s in range(1, sheets + 1):
+            content_types.append(f'<Override PartName="/xl/worksheets/sheet{s}.xml" '
+                                 'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>')
+            workbook_sheets.append(f'<sheet name="Sheet_{s}" sheetId="{s}" r:id="rId{s}"/>')
+            workbook_rels.append(f'<Relationship Id="rId{s}" '
+                                 'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+                                 f'Target="worksheets/sheet{s}.xml"/>')
+            info = zipfile.ZipInfo(f"xl/worksheets/sheet{s}.xml", FIXED_DATE)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with zf.open(info, 'w', force_zip64=True) as out:
+                out.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                          b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+                header_cells = "".join(f'<c r="{_col_letter(c)}1" t="inlineStr"><is><t>{h}</t></is></c>'
+                                       for c, h in enumerate(headers))
+                out.write(f'<row r="1">{header_cells}</row>'.encode('utf-8'))
+                for r in range(2, rows + 2):
+                    cells = (f'<c r="A{r}"><v>{r - 1}</v></c>'
+                             f'<c r="B{r}" t="inlineStr"><is><t>2025-{1 + r % 12:02d}-{1 + r % 28:02d}</t></is></c>'
+                             f'<c r="C{r}" t="inlineStr"><is><t>{escape(_sentence(rng, 2))}</t></is></c>'
+                             f'<c r="D{r}"><v>{round(rng.random() * 5000, 2)}</v></c>'
+                             f'<c r="E{r}" t="inlineStr"><is><t>{escape(_sentence(rng, 6))}</t></is></c>')
+                    out.write(f'<row r="{r}">{cells}</row>'.encode('utf-8'))
+                out.write(b'</sheetData></worksheet>')
+        content_types.append('</Types>')
+        zf.writestr(zipfile.ZipInfo("[Content_Types].xml", FIXED_DATE), "".join(content_types))
+        zf.writestr(zipfile.ZipInfo("_rels/.rels", FIXED_DATE),
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+                    'Target="xl/workbook.xml"/></Relationships>')
+        zf.writestr(zipfile.ZipInfo("xl/workbook.xml", FIXED_DATE),
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+                    f'<sheets>{"".join(workbook_sheets)}</sheets></workbook>')
+        zf.writestr(zipfile.ZipInfo("xl/_rels/workbook.xml.rels", FIXED_DATE),
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                    f'{"".join(workbook_rels)}</Relationships>')
+    return {'sheets': sheets, 'rows': sheets * rows}
+
+
+# ============ DOCX (WordprocessingML خام) ============
+def make_docx_with_tables(path, scale, rng):
+    paragraphs = _scaled(4000, scale, 20)
+    tables = _scaled(80, scale, 2)
+    body = io.StringIO()
+    body.write('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+               '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>')
+    every = max(1, paragraphs // tables)
+    for i in range(paragraphs):
+        body.write(f'<w:p><w:r><w:t xml:space="preserve">{escape(_sentence(rng, 20))}</w:t></w:r></w:p>')
+        if i % every == every - 1:
+            body.write('<w:tbl>')
+            for _ in range(20):
+                body.write('<w:tr>')
+                for _ in range(4):
+                    body.write(f'<w:tc><w:p><w:r><w:t>{escape(_sentence(rng, 3))}</w:t></w:r></w:p></w:tc>')
+                body.write('</w:tr>')
+            body.write('</w:tbl>')
+    body.write('<w:sectPr/></w:body></w:document>')
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(zipfile.ZipInfo("[Content_Types].xml", FIXED_DATE),
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                    '<Default Extension="xml" ContentType="application/xml"/>'
+                    '<Override PartName="/word/document.xml" '
+                    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+                    '</Types>')
+        zf.writestr(zipfile.ZipInfo("_rels/.rels", FIXED_DATE),
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+                    'Target="word/document.xml"/></Relationships>')
+        info = zipfile.ZipInfo("word/document.xml", FIXED_DATE)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        zf.writestr(info, body.getvalue())
+    return {'paragraphs': paragraphs, 'tables': tables}
+
+
+# ============ PDF (كتابة يدوية لبنية الملف) ============
+def _pdf_escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def _write_pdf(path, pages):
+    """pages: قائمة (محتوى الصفحة bytes، قاموس موارد نصي، قائمة كائنات إضافية bytes)"""
+    objects = [None, None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for content, resources, extra in pages:
+        extra_ids = []
+        for obj in extra:
+            objects.append(obj)
+            extra_ids.append(len(objects))
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        content_id = len(objects)
+        res = resources.format(*extra_ids).encode('ascii')
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents %d 0 R /Resources %s >>"
+                       % (content_id, res))
+        page_ids.append(len(objects))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids).encode('ascii')
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+    with open(path, 'wb') as f:
+        f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for num, body in enumerate(objects, 1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % num + body + b"\nendobj\n")
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for off in offsets:
+            f.write(b"%010d 00000 n \n" % off)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+
+
+def make_pdf_text_layer(path, scale, rng):
+    page_count = _scaled(200, scale, 2)
+    pages = []
+    for p in range(page_count):
+        lines = [f"Page {p + 1}"] + [_ascii_sentence(rng, 11) for _ in range(45)]
+        ops = ["BT /F1 11 Tf 14 TL 56 750 Td"]
+        ops.extend(f"({_pdf_escape(line)}) Tj T*" for line in lines)
+        ops.append("ET")
+        pages.append(("\n".join(ops).encode('latin-1'), "<< /Font << /F1 3 0 R >> >>", []))
+    _write_pdf(path, pages)
+    return {'pages': page_count}
+
+
+def make_pdf_image_only(path, scale, rng):
+    page_count = _scaled(20, scale, 1)
+    width, height = 850, 1100
+    pages = []
+    for p in range(page_count):
+        # خطوط أفقية داكنة تحاكي أسطر نص ممسوح ضوئياً
+        pixels = bytearray(b'\xff' * (width * height))
+        for row in range(60, height - 60, 28):
+            start = rng.randint(60, 120)
+            end = rng.randint(width - 200, width - 60)
+            stripe = bytes(rng.choice((0, 30, 60)) for _ in range(end - start))
+            for y in range(row, row + 12):
+                offset = y * width
+                pixels[offset + start:offset + end] = stripe
+        data = zlib.compress(bytes(pixels), 6)
+        image = (b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceGray "
+                 b"/BitsPerComponent 8 /Filter /FlateDecode /Length %d >>\nstream\n" % (width, height, len(data))
+                 + data + b"\nendstream")
+        content = b"q 612 0 0 792 0 0 cm /Im1 Do Q"
+        pages.append((content, "<< /XObject << /Im1 {0} 0 R >> >>", [image]))
+    _write_pdf(path, pages)
+    return {'pages': page_count}
+
+
+# ============ نصوص و HTML ============
+def make_html_page(path, scale, rng):
+    size = _scaled(4 * 1024 * 1024, scale, 40 * 1024)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("<!DOCTYPE html><html><head><title>Chat export</title>"
+                "<style>body{font-family:sans-serif}</style><script>var x = 1;</script></head><body>\n")
+        written = 0
+        i = 0
+        while written < size:
+            role = 'user' if i % 2 == 0 else 'assistant'
+            block = (f'<div class="message {role}"><div class="content"><p>{escape(_sentence(rng, 25))}</p>'
+                     f'<ul><li>{escape(_sentence(rng, 6))}</li><li>{escape(_sentence(rng, 6))}</li></ul>'
+                     f'<script>track({i});</script></div></div>\n')
+            f.write(block)
+            written += len(block.encode('utf-8'))
+            i += 1
+        f.write("</body></html>\n")
+    return {'messages': i}
+
+
+def make_gz_text(path, scale, rng):
+    size = _scaled(16 * 1024 * 1024, scale, 16 * 1024)
+    block = _text_blob(rng, 64 * 1024).encode('utf-8')
+    with open(path, 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as gz:
+            written = 0
+            while written < size:
+                gz.write(block)
+                written += len(block)
+    return {'bytes': size}
+
+
+def make_plain_text(path, scale, rng):
+    size = _scaled(32 * 1024 * 1024, scale, 16 * 1024)
+    block = _text_blob(rng, 64 * 1024).encode('utf-8')
+    with open(path, 'wb') as f:
+        written = 0
+        while written < size:
+            f.write(block)
+            written += len(block)
+    return {'bytes': size}
+
+
+# اسم الملف -> دالة التوليد
+GENERATORS = {
+    'zip_many_small.zip': make_zip_many_small,
+    'zip_few_huge.zip': make_zip_few_huge,
+    'nested.tar.gz': make_tar_gz_nested,
+    'large.sqlite': make_sqlite_large,
+    'multi_sheet.xlsx': make_xlsx_multi_sheet,
+    'tables.docx': make_docx_with_tables,
+    'text_layer.pdf': make_pdf_text_layer,
+    'image_only.pdf': make_pdf_image_only,
+    'chat_page.html': make_html_page,
+    'single.log.gz': make_gz_text,
+    'plain_utf8.txt': make_plain_text,
+}
+
+
+def build_corpus(corpus_dir, scale=1.0, names=None, force=False):
+    """توليد الملفات المطلوبة (أو إعادة استخدامها إن وُجدت بنفس المقياس) وإرجاع مساراتها"""
+    os.makedirs(corpus_dir, exist_ok=True)
+    manifest_path = os.path.join(corpus_dir, 'corpus.json')
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    paths = {}
+    for name, generator in GENERATORS.items():
+        if names and name not in names:
+            continue
+        path = os.path.join(corpus_dir, name)
+        entry = manifest.get(name)
+        if force or entry is None or entry.get('scale') != scale or not os.path.exists(path):
+            # بذرة لكل ملف حتى لا يتغير محتواه عند اختيار مجموعة فرعية من الحالات
+            rng = random.Random(f"{SEED}:{name}")
+            info = generator(path, scale, rng)
+            manifest[name] = {'scale': scale, 'seed': SEED, 'bytes': os.path.getsize(path), **info}
+            print(f"   ✓ {name}: {manifest[name]['bytes'] / 1e6:.1f} MB")
+        paths[name] = path
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return paths
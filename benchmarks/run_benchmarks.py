@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+run_benchmarks.py - جناح قياس أداء شامل لمعالجات zip_rar_folder2txt.py
+- يولّد مدخلات اصطناعية ثابتة (corpus.py) ويعيد استخدامها بين التشغيلات
+- يشغّل كل معالج في عملية فرعية مستقلة ويقيس الزمن والإنتاجية (MB/s، عنصر/s) وذروة RSS
+- يقارن النتائج بخط أساس محفوظ (baseline.json) ويفشل عند تجاوز حدود التراجع
+
+الاستخدام (من جذر المشروع):
+  python -m benchmarks.run_benchmarks [--scale 0.05] [--cases zip_many_small,sqlite_direct]
+  python -m benchmarks.run_benchmarks --save-baseline        # حفظ النتائج كخط أساس جديد
+  python -m benchmarks.run_benchmarks --check                # CI: غياب خط الأساس أو اختلاف مقياسه فشل
+
+خط الأساس المحفوظ (baseline.json) مأخوذ بالمقياس المرجعي REFERENCE_SCALE مع --repeat 3؛
+أعد حفظه بعد أي تغيير مقصود في الأداء أو عند تغيير جهاز CI.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import resource
+import multiprocessing
+
+from benchmarks import corpus
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+DEFAULT_CORPUS_DIR = os.path.join(tempfile.gettempdir(), 'archive_tools_bench_corpus')
+# المقياس الذي يُحفظ به baseline.json في المستودع
+REFERENCE_SCALE = 0.05
+
+# حدود التراجع الافتراضية: انخفاض الإنتاجية أو زيادة الذاكرة بأكثر من هذه النسبة يُعد تراجعاً
+DEFAULT_THROUGHPUT_TOLERANCE = 0.20
+DEFAULT_RSS_TOLERANCE = 0.25
+
+# اسم الحالة -> (ملف المدخل، اسم المعالج، معاملات إضافية، المكتبات المطلوبة في الوحدة)
+CASES = {
+    'zip_many_small': ('zip_many_small.zip', 'extract_archive_to_files', {'archive_type': 'zip'}, ()),
+    'zip_few_huge': ('zip_few_huge.zip', 'extract_archive_to_files', {'archive_type': 'zip'}, ()),
+    'tar_gz_nested': ('nested.tar.gz', 'extract_tar_to_files', {}, ()),
+    'sqlite_direct': ('large.sqlite', 'extract_db_direct_to_text', {}, ()),
+    'sqlite_via_excel': ('large.sqlite', 'extract_db_via_excel_to_text', {}, ()),
+    'xlsx_multi_sheet': ('multi_sheet.xlsx', 'extract_excel_to_text', {}, ('load_workbook',)),
+    'docx_tables': ('tables.docx', 'extract_docx_to_text', {}, ()),
+    'pdf_text_layer': ('text_layer.pdf', 'extract_pdf_advanced', {'use_ocr': False}, ('pdfplumber',)),
+    'pdf_image_only': ('image_only.pdf', 'extract_pdf_advanced', {'use_ocr': False}, ('pdfplumber',)),
+    'pdf_image_ocr': ('image_only.pdf', 'extract_pdf_advanced', {'use_ocr': True}, ('pdfplumber', 'pytesseract', 'PIL')),
+    'html_page': ('chat_page.html', 'extract_html_to_text', {}, ()),
+    'html_page_bs4': ('chat_page.html', 'extract_html_to_text', {'engine': 'bs4'}, ('bs4',)),
+    'gz_single': ('single.log.gz', 'extract_gz_to_file', {}, ()),
+    'plain_text': ('plain_utf8.txt', 'extract_single_file_to_text', {}, ()),
+}
+
+
+def _load_extractor():
+    from scripts import zip_rar_folder2txt
+    return zip_rar_folder2txt
+
+
+def _rss_bytes():
+    """RSS الحالية للعملية من /proc (لينكس)"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def _run_case_child(conn, handler_name, input_path, kwargs):
+    """تُنفذ في عملية فرعية: تشغيل المعالج مرة واحدة وإرسال القياسات عبر الأنبوب"""
+    devnull = open(os.devnull, 'w')
+    sys.stdout = devnull
+    try:
+        extractor = _load_extractor()
+        handler = getattr(extractor, handler_name)
+        out_dir = tempfile.mkdtemp(prefix='bench_out_')
+        rss_before = _rss_bytes()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        result = handler(input_path, out_dir, **kwargs)
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        # ru_maxrss بالكيلوبايت على لينكس
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        output_bytes = 0
+        for root, _, files in os.walk(out_dir):
+            for name in files:
+                output_bytes += os.path.getsize(os.path.join(root, name))
+        shutil.rmtree(out_dir, ignore_errors=True)
+        conn.send({
+            'ok': bool(result[0]),
+            'wall_seconds': wall,
+            'cpu_seconds': cpu,
+            'items': result[1],
+            'output_bytes': output_bytes,
+            'rss_before': rss_before,
+            'peak_rss': peak_rss,
+        })
+    except Exception as e:
+        conn.send({'ok': False, 'error': repr(e)})
+    finally:
+        conn.close()
+        devnull.close()
+
+
+def run_case(name, input_path, repeat=1):
+    _, handler_name, kwargs, _ = CASES[name]
+    ctx = multiprocessing.get_context('fork')
+    runs = []
+    for _ in range(repeat):
+        parent_conn, child_conn = ctx.Pipe(duplex=False)
+        proc = ctx.Process(target=_run_case_child, args=(child_conn, handler_name, input_path, kwargs))
+        proc.start()
+        child_conn.close()
+        result = parent_conn.recv()
+        proc.join()
+        if not result.get('ok'):
+            return {'status': 'failed', 'error': result.get('error', 'المعالج لم ينشئ أي ملف')}
+        runs.append(result)
+    # أفضل زمن من عدة تكرارات يقلل أثر الضوضاء
+    best = min(runs, key=lambda r: r['wall_seconds'])
+    input_bytes = os.path.getsize(input_path)
+    wall = max(best['wall_seconds'], 1e-9)
+    return {
+        'status': 'ok',
+        'handler': handler_name,
+        'input_bytes': input_bytes,
+        'output_bytes': best['output_bytes'],
+        'items': best['items'],
+        'wall_seconds': round(best['wall_seconds'], 4),
+        'cpu_seconds': round(best['cpu_seconds'], 4),
+        'mb_per_s': round(input_bytes / 1e6 / wall, 3),
+        'items_per_s': round(best['items'] / wall, 1),
+        'peak_rss_mb': round(max(r['peak_rss'] for r in runs) / 1e6, 1),
+        'rss_growth_mb': round(max(r['peak_rss'] - r['rss_before'] for r in runs) / 1e6, 1),
+    }
+
+
+def compare_with_baseline(results, baseline, throughput_tol, rss_tol, check=False):
+    """إرجاع قائمة التراجعات مقارنة بخط الأساس (فقط للحالات الموجودة في الطرفين).
+    مع check يُعد اختلاف المقياس فشلاً بدلاً من تجاوز المقارنة."""
+    regressions = []
+    base_cases = baseline.get('cases', {})
+    if baseline.get('scale') != results['scale']:
+        message = f"مقياس خط الأساس ({baseline.get('scale')}) يختلف عن الحالي ({results['scale']})"
+        if check:
+            return [f"{message}; لا يمكن المقارنة"]
+        print(f"⚠️ {message}; المقارنة متجاوزة")
+        return regressions
+    for name, current in results['cases'].items():
+        base = base_cases.get(name)
+        if not base or current.get('status') != 'ok' or base.get('status') != 'ok':
+            continue
+        if current['mb_per_s'] < base['mb_per_s'] * (1 - throughput_tol):
+            regressions.append(f"{name}: الإنتاجية {current['mb_per_s']} MB/s < خط الأساس {base['mb_per_s']} MB/s")
+        if current['peak_rss_mb'] > base['peak_rss_mb'] * (1 + rss_tol):
+            regressions.append(f"{name}: ذروة الذاكرة {current['peak_rss_mb']} MB > خط الأساس {base['peak_rss_mb']} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="جناح قياس أداء معالجات الاستخراج على مدخلات اصطناعية.")
+    parser.add_argument('--scale', type=float, default=REFERENCE_SCALE,
+                        help=f'حجم المدخلات (1.0 = الحجم الكامل، الافتراضي {REFERENCE_SCALE} وهو مقياس خط الأساس)')
+    parser.add_argument('--cases', help='قائمة حالات مفصولة بفواصل (الافتراضي: الكل)')
+    parser.add_argument('--repeat', type=int, default=1, help='عدد التكرارات لكل حالة (يؤخذ الأفضل)')
+    parser.add_argument('--corpus-dir', default=DEFAULT_CORPUS_DIR, help='مجلد المدخلات المولدة')
+    parser.add_argument('--regenerate', action='store_true', help='إعادة توليد المدخلات حتى لو وُجدت')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='ملف خط الأساس')
+    parser.add_argument('--save-baseline', action='store_true', help='حفظ النتائج الحالية كخط أساس')
+    parser.add_argument('--check', action='store_true',
+                        help='وضع CI: الفشل عند غياب خط الأساس أو اختلاف مقياسه، لا تجاوز المقارنة')
+    parser.add_argument('--throughput-tolerance', type=float, default=DEFAULT_THROUGHPUT_TOLERANCE)
+    parser.add_argument('--rss-tolerance', type=float, default=DEFAULT_RSS_TOLERANCE)
+    parser.add_argument('--output', help='كتابة النتائج إلى ملف JSON')
+    parser.add_argument('--list', action='store_true', help='عرض الحالات المتاحة والخروج')
+    args = parser.parse_args()
+
+    if args.list:
+        for name, (input_name, handler, kwargs, _) in CASES.items():
+            print(f"{name:18} {handler}({input_name}{', ' if kwargs else ''}{kwargs or ''})")
+        return
+
+    selected = list(CASES) if not args.cases else [c.strip() for c in args.cases.split(',') if c.strip()]
+    unknown = [c for c in selected if c not in CASES]
+    if unknown:
+        print(f"❌ حالات غير معروفة: {', '.join(unknown)}")
+        sys.exit(2)
+
+    extractor = _load_extractor()
+    runnable = []
+    skipped = {}
+    for name in selected:
+        missing = [lib for lib in CASES[name][3] if getattr(extractor, lib, None) is None]
+        if missing:
+            skipped[name] = f"مكتبات غير مثبتة: {', '.join(missing)}"
+        else:
+            runnable.append(name)
+
+    print(f"🧪 توليد المدخلات (المقياس {args.scale}) في: {args.corpus_dir}")
+    needed = {CASES[name][0] for name in runnable}
+    paths = corpus.build_corpus(args.corpus_dir, args.scale, names=needed, force=args.regenerate)
+
+    results = {
+        'scale': args.scale,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'cases': {},
+    }
+    print(f"\n{'الحالة':18} {'الزمن(ث)':>9} {'MB/s':>9} {'عنصر/s':>10} {'ذروة RSS':>10}")
+    for name in runnable:
+        # خط الأساس المحفوظ أفضل 3 تكرارات، فالمقارنة في وضع CI بالعدد نفسه على الأقل
+        res = run_case(name, paths[CASES[name][0]], repeat=max(args.repeat, 3) if args.check else args.repeat)
+        results['cases'][name] = res
+        if res['status'] == 'ok':
+            print(f"{name:18} {res['wall_seconds']:>9.3f} {res['mb_per_s']:>9.2f} "
+                  f"{res['items_per_s']:>10.1f} {res['peak_rss_mb']:>8.1f}MB")
+        else:
+            print(f"{name:18} ❌ {res['error']}")
+    for name, reason in skipped.items():
+        results['cases'][name] = {'status': 'skipped', 'reason': reason}
+        print(f"{name:18} ⏭️ {reason}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 تم حفظ خط الأساس: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        if args.check:
+            print(f"\n❌ لا يوجد خط أساس في {args.baseline}؛ شغّل مع --save-baseline لإنشائه")
+            sys.exit(1)
+        print(f"\nℹ️ لا يوجد خط أساس في {args.baseline}؛ شغّل مع --save-baseline لإنشائه")
+        return
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare_with_baseline(results, baseline, args.throughput_tolerance, args.rss_tolerance,
+                                        check=args.check)
+    if regressions:
+        print("\n❌ تراجعات في الأداء:")
+        for line in regressions:
+            print(f"   • {line}")
+        sys.exit(1)
+    print("\n✅ لا توجد تراجعات مقارنة بخط الأساس")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+adaptive_pool.py - مجموعة عمليات ذات تزامن متكيف حسب الذاكرة والحمل
+- تقيس RSS لشجرة العمليات (العملية الرئيسية وكل أبنائها وأحفادها) واستخدام المعالج
+- تقلص عدد المهام المتزامنة عند اقتراب الذاكرة من الميزانية، وتزيده عند وجود أنوية خاملة
+- تقدّر ذاكرة كل مهمة مسبقاً (Excel الكبير، OCR ...) وتوسمها، ولا تقبلها إلا إذا اتسعت لها الميزانية
+
+كل مهمة تعمل في عملية مستقلة (fork على لينكس) تنتهي بانتهائها، فتقليص التزامن يحرر الذاكرة فعلاً.
+"""
+
+import os
+import time
+import signal
+import pathlib
+import traceback
+import collections
+import multiprocessing
+import multiprocessing.connection
+
+try:
+    import psutil  # اختيارية: قياس أدق وأسرع إن كانت مثبتة
+except ImportError:
+    psutil = None
+
+MB = 1024 * 1024
+
+# تقدير تقريبي لذاكرة كل نوع: (ذاكرة ثابتة بالميغابايت، مضاعف حجم الملف)
+MEMORY_PROFILES = {
+    # xlsx تُقرأ تدفقياً (openpyxl read_only): جدول النصوص المشتركة هو ما يبقى في الذاكرة
+    '.xlsx': (40, 4.0),
+    # xls تُحمّل كاملة عبر pandas
+    '.xls': (120, 25.0),
+    '.docx': (40, 0.5),
+    '.pdf': (120, 4.0),
+    '.db': (60, 0.5),
+    '.sqlite': (60, 0.5),
+    '.sqlite3': (60, 0.5),
+    '.html': (50, 8.0),
+    '.htm': (50, 8.0),
+}
+DEFAULT_PROFILE = (40, 0.2)
+OCR_EXTRA_MB = 350
+HEAVY_JOB_MB = 512
+
+
+def estimate_job_memory(path, use_ocr=False):
+    """تقدير ذاكرة المهمة بالميغابايت ووسمها؛ يعيد (التقدير، الوسم)"""
+    try:
+        size = os.path.getsize(path) if os.path.isfile(path) else 0
+    except OSError:
+        size = 0
+    ext = pathlib.Path(path).suffix.lower()
+    base, factor = MEMORY_PROFILES.get(ext, DEFAULT_PROFILE)
+    estimate = base + factor * size / MB
+    if use_ocr and ext == '.pdf':
+        estimate += OCR_EXTRA_MB
+    tag = 'memory_hungry' if estimate >= HEAVY_JOB_MB or (use_ocr and ext == '.pdf') else 'normal'
+    return estimate, tag
+
+
+# ============ قياس الموارد ============
+def _read_proc_tree():
+    """خريطة pid -> (ppid, rss بالبايت) من /proc"""
+    page = os.sysconf('SC_PAGE_SIZE')
+    tree = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'rb') as f:
+                stat = f.read()
+            # اسم العملية بين قوسين وقد يحتوي مسافات
+            fields = stat[stat.rindex(b')') + 2:].split()
+            ppid = int(fields[1])
+            rss = int(fields[21]) * page
+        except (OSError, ValueError, IndexError):
+            continue
+        tree[int(entry)] = (ppid, rss)
+    return tree
+
+
+def process_tree_rss(root_pid=None):
+    """مجموع RSS للعملية وكل أحفادها بالبايت"""
+    root_pid = root_pid or os.getpid()
+    if psutil is not None:
+        try:
+            root = psutil.Process(root_pid)
+            procs = [root] + root.children(recursive=True)
+            total = 0
+            for proc in procs:
+                try:
+                    total += proc.memory_info().rss
+                except psutil.Error:
+                    pass
+            return total
+        except psutil.Error:
+            return 0
+    if not os.path.isdir('/proc'):
+        return 0
+    tree = _read_proc_tree()
+    children = collections.defaultdict(list)
+    for pid, (ppid, _) in tree.items():
+        children[ppid].append(pid)
+    total = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        if pid in tree:
+            total += tree[pid][1]
+        stack.extend(children.get(pid, ()))
+    return total
+
+
+def available_memory():
+    """الذاكرة المتاحة في النظام بالبايت (MemAvailable)، أو None إن تعذر"""
+    if psutil is not None:
+        return psutil.virtual_memory().available
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class CpuSampler:
+    """نسبة استخدام المعالج للنظام كله بين عينتين متتاليتين (0..1)"""
+
+    def __init__(self):
+        self._last = self._read()
+
+    @staticmethod
+    def _read():
+        try:
+            with open('/proc/stat', 'r') as f:
+                values = [int(v) for v in f.readline().split()[1:]]
+            idle = values[3] + (values[4] if len(values) > 4 else 0)
+            return sum(values), idle
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def sample(self):
+        if psutil is not None:
+            return psutil.cpu_percent(interval=None) / 100.0
+        current = self._read()
+        if current is None or self._last is None:
+            load = os.getloadavg()[0] if hasattr(os, 'getloadavg') else 0.0
+            return min(1.0, load / (os.cpu_count() or 1))
+        total = current[0] - self._last[0]
+        idle = current[1] - self._last[1]
+        self._last = current
+        if total <= 0:
+            return 0.0
+        return max(0.0, min(1.0, 1.0 - idle / total))
+
+
+# ============ العامل ============
+def _child_main(conn, fn, args, kwargs):
+    try:
+        result = fn(*args, **kwargs)
+        conn.send((True, result))
+    except BaseException as e:
+        conn.send((False, f"{e!r}\n{traceback.format_exc()}"))
+    finally:
+        conn.close()
+
+
+class _Job:
+    __slots__ = ('key', 'fn', 'args', 'kwargs', 'cost_mb', 'tag', 'retried', 'process', 'conn', 'started')
+
+    def __init__(self, key, fn, args, kwargs, cost_mb, tag):
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.cost_mb = cost_mb
+        self.tag = tag
+        self.retried = False
+        self.process = None
+        self.conn = None
+        self.started = None
+
+
+class AdaptivePool:
+    """مجموعة عمليات تضبط عدد المهام المتزامنة بين min_workers و max_workers آلياً.
+
+    submit() يضيف مهمة إلى الطابور، و poll() يقبل المهام الممكنة ويجمع المنتهية
+    ويعدّل الحد كل interval ثانية. المهمة التي تُقتل بإشارة (غالباً OOM) يُعاد
+    تشغيلها مرة واحدة منفردة ويُخفض الحد إلى النصف."""
+
+    def __init__(self, min_workers=1, max_workers=None, memory_budget_mb=None,
+                 target_cpu=0.85, interval=2.0, verbose=True):
+        self.min_workers = max(1, min_workers)
+        self.max_workers = max(self.min_workers, max_workers or os.cpu_count() or 1)
+        if memory_budget_mb is None:
+            avail = available_memory()
+            memory_budget_mb = (avail * 0.7 / MB) if avail else 4096
+        self.memory_budget_mb = memory_budget_mb
+        self.target_cpu = target_cpu
+        self.interval = interval
+        self.verbose = verbose
+        self.limit = self.min_workers
+        self.queue = collections.deque()
+        self.running = {}
+        self.reserved_mb = 0.0
+        self._cpu = CpuSampler()
+        self._last_adjust = time.monotonic()
+        self.last_rss_mb = 0.0
+        self.last_cpu = 0.0
+        try:
+            self._ctx = multiprocessing.get_context('fork')
+        except ValueError:
+            self._ctx = multiprocessing.get_context('spawn')
+
+    # ---------- الواجهة ----------
+    def submit(self, key, fn, *args, cost_mb=None, tag='normal', **kwargs):
+        job = _Job(key, fn, args, kwargs, cost_mb if cost_mb is not None else DEFAULT_PROFILE[0], tag)
+        self.queue.append(job)
+
+    @property
+    def busy(self):
+        return len(self.queue) + len(self.running)
+
+    def poll(self, timeout=0.0):
+        """قبول ما يمكن من المهام وانتظار المنتهية حتى timeout؛ يعيد [(key, ok, result)]"""
+        self._maybe_adjust()
+        self._admit()
+        finished = []
+        if self.running:
+            conns = [job.conn for job in self.running.values()]
+            for conn in multiprocessing.connection.wait(conns, timeout):
+                job = self.running.pop(conn)
+                finished.extend(self._reap(job))
+            self._admit()
+        elif timeout:
+            time.sleep(timeout)
+        return finished
+
+    def run_all(self):
+        """مولّد يعيد نتائج كل المهام المضافة حتى ينتهي الطابور"""
+        while self.busy:
+            for item in self.poll(timeout=self.interval):
+                yield item
+
+    def shutdown(self, cancel=False):
+        if cancel:
+            self.queue.clear()
+            for job in self.running.values():
+                job.process.terminate()
+        for job in list(self.running.values()):
+            job.process.join()
+        self.running.clear()
+
+    # ---------- التنفيذ ----------
+    def _admit(self):
+        while self.queue and len(self.running) < self.limit:
+            job = self.queue[0]
+            cost = min(job.cost_mb, self.memory_budget_mb)
+            # المهمة التي لا تتسع لها الميزانية تنتظر، إلا إذا لم يكن هناك شيء آخر يعمل
+            if self.running and self.reserved_mb + cost > self.memory_budget_mb:
+                break
+            self.queue.popleft()
+            parent_conn, child_conn = self._ctx.Pipe(duplex=False)
+            job.process = self._ctx.Process(target=_child_main, args=(child_conn, job.fn, job.args, job.kwargs))
+            job.process.start()
+            child_conn.close()
+            job.conn = parent_conn
+            job.started = time.monotonic()
+            self.running[parent_conn] = job
+            self.reserved_mb += cost
+
+    def _reap(self, job):
+        try:
+            ok, result = job.conn.recv()
+        except (EOFError, OSError):
+            ok, result = False, None
+        job.conn.close()
+        job.process.join()
+        self.reserved_mb = max(0.0, self.reserved_mb - min(job.cost_mb, self.memory_budget_mb))
+        code = job.process.exitcode
+        if result is None and code is not None and code < 0:
+            sig = -code
+            if not job.retried:
+                # غالباً قتلها نظام OOM: نخفض الحد ونعيد المهمة لتعمل منفردة
+                self.limit = max(self.min_workers, self.limit // 2)
+                job.retried = True
+                job.cost_mb = self.memory_budget_mb
+                job.tag = 'memory_hungry'
+                self.queue.appendleft(job)
+                self._log(f"⚠️ توقفت مهمة بالإشارة {sig}؛ إعادة تشغيلها منفردة، الحد الآن {self.limit}")
+                return []
+            try:
+                sig_name = signal.Signals(sig).name
+            except ValueError:
+                sig_name = str(sig)
+            result = f"انتهت العملية بالإشارة {sig_name}"
+        elif result is None:
+            result = f"انتهت العملية دون نتيجة (رمز الخروج {code})"
+        return [(job.key, ok, result)]
+
+    def _maybe_adjust(self):
+        now = time.monotonic()
+        if now - self._last_adjust < self.interval:
+            return
+        self._last_adjust = now
+        rss_mb = process_tree_rss() / MB
+        cpu = self._cpu.sample()
+        avail = available_memory()
+        self.last_rss_mb, self.last_cpu = rss_mb, cpu
+        old = self.limit
+        low_system_memory = avail is not None and avail / MB < 0.1 * self.memory_budget_mb
+        if rss_mb > 0.9 * self.memory_budget_mb or low_system_memory:
+            self.limit = max(self.min_workers, self.limit - 1)
+        elif (self.queue and len(self.running) >= self.limit and cpu < self.target_cpu
+              and rss_mb < 0.7 * self.memory_budget_mb):
+            self.limit = min(self.max_workers, self.limit + 1)
+        if self.limit != old:
+            self._log(f"⚙️ التزامن {old} → {self.limit} (RSS {rss_mb:.0f}/{self.memory_budget_mb:.0f} MB، المعالج {cpu:.0%})")
+
+    def _log(self, message):
+        if self.verbose:
+            print(message, flush=True)
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+chat_export.py - استخراج محادثات صفحات الدردشة المحفوظة (HTML) إلى JSONL منظم
+- يتعرف على تخطيط الصفحة (ChatGPT، Open WebUI / Z.ai، Claude، Gemini) من بصمة رأسها،
+  وتُخزّن البصمة مؤقتاً فلا يتكرر الكشف لصفحات الموقع نفسه
+- يستخرج أدوار المستخدم والمساعد بمحددات مترجمة مسبقاً لكل تخطيط
+- يحلل كل صفحة تدفقياً (lxml iterparse) ويحذف العناصر المكتملة خارج الأدوار، فلا تُبنى شجرة كاملة
+- يكتب سجلاً واحداً لكل محادثة فور الانتهاء من صفحتها: {source, layout, title, url, turns}
+
+الاستخدام:
+  python -m scripts.chat_export [-o conversations.jsonl] [--append] [--compress gzip] ملفات_أو_مجلدات...
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+
+try:
+    from scripts import zip_rar_folder2txt as extractor
+except ImportError:
+    import zip_rar_folder2txt as extractor
+
+lxml_etree = extractor.lxml_etree
+
+CHAT_PAGE_EXTENSIONS = ('.html', '.htm')
+# بصمة التخطيط تُؤخذ من أول 64KB (الرأس وتعليق "saved from" الذي تضيفه المتصفحات)؛
+# إن لم تكفِ لكشف التخطيط يُفحص حتى DETECT_BYTES من الصفحة
+SIGNATURE_BYTES = 64 * 1024
+DETECT_BYTES = 2 * 1024 * 1024
+
+# اسم التخطيط -> علامات الكشف (تعابير نمطية على بداية الصفحة)، محددات الأدوار بالترتيب،
+# عناصر واجهة تُتجاهل داخل الدور، ولاحقة العنوان التي تُحذف من <title>
+CHAT_LAYOUTS = {
+    'chatgpt': {
+        'markers': (r'https?://(?:chatgpt\.com|chat\.openai\.com)/', r'data-message-author-role='),
+        'turns': (('[data-message-author-role=user]', 'user'),
+                  ('[data-message-author-role=assistant]', 'assistant')),
+        'skip': 'button, .sr-only',
+        'title_suffix': r'\s*[|\-–]\s*ChatGPT\s*$|^\s*ChatGPT\s*[|\-–]\s*',
+    },
+    'open-webui': {
+        'markers': (r'https?://chat\.z\.ai/', r'\bZ\.ai - Free AI Chatbot', r'\bOpen WebUI\b', r'class="[^"]*\bchat-assistant\b'),
+        'turns': (('.user-message, .chat-user', 'user'),
+                  ('.chat-assistant', 'assistant')),
+        'skip': 'button, .sr-only',
+        'title_suffix': r'\s*[|_]\s*(?:Z\.ai|Open WebUI)\b.*$',
+    },
+    'claude': {
+        'markers': (r'https?://claude\.ai/', r'font-claude-(?:message|response)'),
+        'turns': (('[data-testid=user-message]', 'user'),
+                  ('.font-claude-message, .font-claude-response', 'assistant')),
+        'skip': 'button, .sr-only',
+        'title_suffix': r'\s*-\s*Claude\s*$',
+    },
+    'gemini': {
+        'markers': (r'https?://gemini\.google\.com/', r'<user-query\b'),
+        'turns': (('user-query', 'user'),
+                  ('model-response', 'assistant')),
+        'skip': 'button, .cdk-visually-hidden',
+        'title_suffix': r'^\s*Gemini\s*[|\-–]\s*|\s*[|\-–]\s*Gemini\s*$',
+    },
+}
+
+_SAVED_FROM_URL = re.compile(rb'<!--\s*saved from url=\(\d+\)(\S+?)\s*-->', re.I)
+_PAGE_URL = re.compile(rb'<(?:link[^>]+rel=["\']canonical["\']|meta[^>]+property=["\']og:url["\'])[^>]*'
+                       rb'(?:href|content)=["\']([^"\']+)', re.I)
+_GENERATOR = re.compile(rb'<meta[^>]+name=["\']generator["\'][^>]+content=["\']([^"\']+)', re.I)
+_TITLE = re.compile(rb'<title[^>]*>([^<]*)', re.I)
+_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.I)
+_URL_HOST = re.compile(r'^[a-z][\w+.-]*://([^/?#]+)', re.I)
+
+# بصمة الرأس -> اسم التخطيط (أو None لصفحة غير معروفة)
+_LAYOUT_CACHE = {}
+_CACHE_STATS = {'hits': 0, 'misses': 0}
+_COMPILED_LAYOUTS = {}
+
+
+# ============ المحددات المترجمة ============
+_SELECTOR_TOKEN = re.compile(r'([\w-]+)|\.([\w-]+)|\[([\w-]+)(?:=["\']?([^"\'\]]*)["\']?)?\]')
+
+
+def compile_selector(selector):
+    """ترجمة محدد بسيط على نمط CSS إلى دالة تطابق عنصر lxml:
+    وسم، .صنف، [سمة] أو [سمة=قيمة] مجتمعة، وبدائل مفصولة بفواصل"""
+    alternatives = []
+    for alternative in selector.split(','):
+        alternative = alternative.strip()
+        tag, classes, attrs = None, set(), []
+        pos = 0
+        while pos < len(alternative):
+            match = _SELECTOR_TOKEN.match(alternative, pos)
+            if not match or (match.group(1) and pos):
+                raise ValueError(f"محدد غير مدعوم: {selector!r}")
+            if match.group(1):
+                tag = match.group(1).lower()
+            elif match.group(2):
+                classes.add(match.group(2))
+            else:
+                attrs.append((match.group(3).lower(), match.group(4)))
+            pos = match.end()
+        alternatives.append((tag, frozenset(classes), tuple(attrs)))
+
+    def matches(elem):
+        for tag, classes, attrs in alternatives:
+            if tag and elem.tag != tag:
+                continue
+            if classes and not classes.issubset((elem.get('class') or '').split()):
+                continue
+            if any(elem.get(name) is None if value is None else elem.get(name) != value for name, value in attrs):
+                continue
+            return True
+        return False
+    return matches
+
+
+def compiled_layout(name):
+    """محددات التخطيط مترجمة مرة واحدة لكل عملية"""
+    compiled = _COMPILED_LAYOUTS.get(name)
+    if compiled is None:
+        spec = CHAT_LAYOUTS[name]
+        compiled = {
+            'turns': [(compile_selector(selector), role) for selector, role in spec['turns']],
+            'skip': compile_selector(spec['skip']),
+            'title_suffix': re.compile(spec['title_suffix']),
+        }
+        _COMPILED_LAYOUTS[name] = compiled
+    return compiled
+
+
+# ============ كشف التخطيط ============
+def page_head(path):
+    """أول SIGNATURE_BYTES من الصفحة مع ترميزها والعنوان والرابط الأصلي إن وُجدا"""
+    with open(path, 'rb') as f:
+        head = f.read(SIGNATURE_BYTES)
+    charset = _CHARSET.search(head)
+    encoding = charset.group(1).decode('ascii').lower() if charset else 'utf-8'
+    url = _SAVED_FROM_URL.search(head) or _PAGE_URL.search(head)
+    title = _TITLE.search(head)
+    return {
+        'head': head,
+        'encoding': encoding,
+        'url': url.group(1).decode(encoding, 'replace') if url else None,
+        'title': title.group(1).decode(encoding, 'replace') if title else None,
+    }
+
+
+def layout_signature(info):
+    """بصمة ثابتة لصفحات الموقع نفسه: المضيف والمولّد، أو لاحقة العنوان بعد آخر فاصل إن لم يُعرف المضيف"""
+    host = _URL_HOST.match(info['url'] or '')
+    generator = _GENERATOR.search(info['head'])
+    generator = generator.group(1).decode('ascii', 'replace') if generator else None
+    if host:
+        return (host.group(1).lower(), generator, None)
+    suffix = re.split(r'\s[|\-–_]\s', (info['title'] or '').strip())
+    return (None, generator, suffix[-1] if len(suffix) > 1 else None)
+
+
+def _match_layout(text):
+    for name, spec in CHAT_LAYOUTS.items():
+        if any(re.search(marker, text) for marker in spec['markers']):
+            return name
+    return None
+
+
+def detect_layout(path, info):
+    """اسم التخطيط من البصمة المخزنة، وإلا بالبحث عن علامات التخطيطات في بداية الصفحة"""
+    signature = layout_signature(info)
+    cacheable = any(signature)
+    if cacheable and signature in _LAYOUT_CACHE:
+        _CACHE_STATS['hits'] += 1
+        return _LAYOUT_CACHE[signature]
+    _CACHE_STATS['misses'] += 1
+    layout = _match_layout(info['head'].decode(info['encoding'], 'replace'))
+    if layout is None and len(info['head']) == SIGNATURE_BYTES:
+        with open(path, 'rb') as f:
+            layout = _match_layout(f.read(DETECT_BYTES).decode(info['encoding'], 'replace'))
+    if cacheable:
+        _LAYOUT_CACHE[signature] = layout
+    return layout
+
+
+# ============ استخراج الأدوار ============
+CHAT_SKIP_TAGS = frozenset({'script', 'style', 'noscript', 'svg', 'template', 'textarea'})
+_BLOCK_TAGS = frozenset({'p', 'div', 'li', 'ul', 'ol', 'pre', 'br', 'hr', 'tr', 'table', 'blockquote',
+                         'section', 'article', 'details', 'summary', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'})
+_WHITESPACE = re.compile(r'\s+')
+
+
+def turn_text(elem, skip):
+    """نص الدور مع الحفاظ على فواصل الفقرات والقوائم، ونص <pre> كما هو (الشيفرة)"""
+    parts = []
+
+    def add(text, raw):
+        if not text:
+            return
+        if not raw:
+            text = _WHITESPACE.sub(' ', text)
+            if not parts or parts[-1].endswith('\n'):
+                text = text.lstrip()
+        if text:
+            parts.append(text)
+
+    def newline():
+        if parts and not parts[-1].endswith('\n'):
+            parts[-1] = parts[-1].rstrip(' ')
+            parts.append('\n')
+
+    def walk(node, raw):
+        for child in node:
+            if isinstance(child.tag, str) and child.tag not in CHAT_SKIP_TAGS and not skip(child):
+                block = child.tag in _BLOCK_TAGS
+                child_raw = raw or child.tag == 'pre'
+                if block:
+                    newline()
+                add(child.text, child_raw)
+                walk(child, child_raw)
+                if block:
+                    newline()
+            add(child.tail, raw)
+
+    add(elem.text, elem.tag == 'pre')
+    walk(elem, elem.tag == 'pre')
+    return re.sub(r'\n{3,}', '\n\n', ''.join(parts)).strip()
+
+
+def parse_chat_page(path, layout, info):
+    """تحليل صفحة واحدة تدفقياً وإرجاع سجل المحادثة. العناصر المكتملة خارج الأدوار تُحذف فوراً،
+    فلا يبقى في الذاكرة إلا الدور الجاري."""
+    compiled = compiled_layout(layout)
+    rules = compiled['turns']
+    skip = compiled['skip']
+    turns = []
+    title = None
+    active = None  # (عنصر الدور الجاري، الدور)
+    context = lxml_etree.iterparse(path, events=('start', 'end'), html=True, encoding=info['encoding'],
+                                   remove_comments=True, remove_pis=True)
+    for event, elem in context:
+        if event == 'start':
+            if active is None:
+                for predicate, role in rules:
+                    if predicate(elem):
+                        active = (elem, role)
+                        break
+            continue
+        if active is not None:
+            if elem is not active[0]:
+                continue
+            text = turn_text(elem, skip)
+            if text:
+                turns.append({'role': active[1], 'text': text})
+            active = None
+        elif elem.tag == 'title' and title is None:
+            title = compiled['title_suffix'].sub('', (elem.text or '').strip()).strip()
+        # العنصر المكتمل وإخوته السابقون لم يعودوا لازمين
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+    del context
+    return {
+        'source': path,
+        'layout': layout,
+        'title': title or None,
+        'url': info['url'],
+        'turns': turns,
+    }
+
+
+def iter_chat_pages(paths):
+    """الملفات المطلوبة بالترتيب، والمجلدات تُمسح بحثاً عن صفحات HTML (دون المجلدات المخفية)"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+                for name in sorted(files):
+                    if name.lower().endswith(CHAT_PAGE_EXTENSIONS):
+                        yield os.path.join(root, name)
+        elif os.path.isfile(path):
+            yield path
+        else:
+            print(f" ⚠️ غير موجود: {path}")
+
+
+def export_conversations(paths, output_path, append=False):
+    """كتابة سجل JSONL لكل صفحة محادثة معروفة التخطيط فور تحليلها؛ يعيد إحصاءات التشغيل"""
+    stats = {'pages': 0, 'conversations': 0, 'turns': 0, 'unknown': 0, 'empty': 0, 'failed': 0}
+    started = time.perf_counter()
+    with extractor.open_text_output(output_path, 'a' if append else 'w') as out:
+        for path in iter_chat_pages(paths):
+            stats['pages'] += 1
+            name = os.path.basename(path)
+            try:
+                info = page_head(path)
+                layout = detect_layout(path, info)
+                if layout is None:
+                    stats['unknown'] += 1
+                    print(f" ⏭️ {name}: تخطيط غير معروف")
+                    continue
+                record = parse_chat_page(path, layout, info)
+            except (lxml_etree.LxmlError, OSError, LookupError, ValueError) as e:
+                stats['failed'] += 1
+                print(f" ❌ {name}: {e}")
+                continue
+            if not record['turns']:
+                stats['empty'] += 1
+                print(f" ⚠️ {name}: لا توجد أدوار ({layout})")
+                continue
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            stats['conversations'] += 1
+            stats['turns'] += len(record['turns'])
+            print(f" ✓ {name}: {layout}، {len(record['turns'])} دور")
+    stats['seconds'] = time.perf_counter() - started
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="استخراج محادثات صفحات الدردشة المحفوظة إلى JSONL (سجل لكل محادثة).")
+    parser.add_argument('paths', nargs='+', help='صفحات HTML أو مجلدات تحتويها')
+    parser.add_argument('-o', '--output', default='conversations.jsonl', help='ملف JSONL الناتج')
+    parser.add_argument('--append', action='store_true', help='الإلحاق بملف الناتج بدلاً من استبداله')
+    parser.add_argument('--compress', choices=['none', 'gzip', 'zstd'], default='none',
+                        help='ضغط الناتج أثناء كتابته (zstd تتطلب مكتبة zstandard)')
+    args = parser.parse_args()
+
+    if lxml_etree is None:
+        print("❌ مكتبة lxml غير مثبتة. قم بتثبيتها باستخدام: pip install lxml")
+        sys.exit(1)
+    extractor.set_output_compression(args.compress)
+    output_path = extractor.output_name(args.output)
+    stats = export_conversations(args.paths, output_path, append=args.append)
+    rate = stats['pages'] / stats['seconds'] if stats['seconds'] else 0
+    print(f"\n✅ {stats['conversations']} محادثة ({stats['turns']} دور) من {stats['pages']} صفحة "
+          f"في {stats['seconds']:.2f} ث ({rate:.1f} صفحة/ث) ← {output_path}")
+    if stats['unknown'] or stats['empty'] or stats['failed']:
+        print(f"   تخطيط غير معروف: {stats['unknown']}، بلا أدوار: {stats['empty']}، أخطاء: {stats['failed']}")
+    print(f"   بصمات التخطيط: {len(_LAYOUT_CACHE)}، إصابات الذاكرة المؤقتة: {_CACHE_STATS['hits']}")
+
+
+if __name__ == "__main__":
+    main()
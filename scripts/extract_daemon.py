@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+extract_daemon.py - خادم استخراج دائم (daemon) مع عميل خفيف
+يبقي المكتبات والمعالجات محمّلة في الذاكرة ويستقبل المهام عبر مقبس محلي،
+فلا تدفع كل عملية سحب وإفلات تكلفة تشغيل بايثون واستيراد المكتبات من جديد.
+
+البروتوكول: أسطر JSON عبر مقبس Unix (أو TCP على 127.0.0.1 عند عدم توفره).
+يرسل العميل طلباً واحداً ويستقبل سطور التقدم أولاً بأول حتى سطر "done".
+مقبس Unix محمي بصلاحيات 0600؛ أما TCP فيقبله أي مستخدم محلي، فكل طلب عليه يحمل رمزاً سرياً
+يكتبه الخادم عند تشغيله في ملف بصلاحيات 0600 (--token-file) ويقرؤه العميل منه.
+
+كل مهمة تعمل في عملية مستقلة تتفرع من خادم forkserver حمّل المستخرج ومكتباته مسبقاً،
+فتبقى المكتبات دافئة ولا تتسرب خيارات مهمة (متغيرات الوحدة العامة) إلى غيرها.
+
+الاستخدام:
+  تشغيل الخادم:  python -m scripts.extract_daemon serve [--socket PATH | --port N] [--workers N]
+  إرسال مهمة:    python -m scripts.extract_daemon submit [--via-excel] [--ocr] ملف1 ملف2 ...
+  فحص الخادم:    python -m scripts.extract_daemon ping
+  إيقاف الخادم:  python -m scripts.extract_daemon stop
+"""
+
+import os
+import sys
+import hmac
+import json
+import time
+import queue
+import socket
+import secrets
+import argparse
+import tempfile
+import threading
+import socketserver
+import multiprocessing
+
+# يُحمّل المستخرج عند تشغيل الخادم فقط حتى يبقى العميل خفيفاً وسريع الإقلاع
+extractor = None
+
+RUNTIME_DIR = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+DEFAULT_SOCKET = os.path.join(RUNTIME_DIR, 'archive_tools_daemon.sock')
+DEFAULT_TOKEN_FILE = os.path.join(RUNTIME_DIR, 'archive_tools_daemon.token')
+DEFAULT_PORT = 8765
+HAS_UNIX_SOCKETS = hasattr(socket, 'AF_UNIX')
+
+
+def load_extractor():
+    global extractor
+    if extractor is None:
+        try:
+            from scripts import zip_rar_folder2txt as module
+        except ImportError:
+            import zip_rar_folder2txt as module
+        extractor = module
+    return extractor
+
+
+# ============ رمز المصادقة (TCP) ============
+def write_token(path):
+    """إنشاء رمز جديد في ملف لا يقرؤه إلا مالك الخادم؛ الملف القديم يُحذف أولاً حتى لا يُتبع رابط رمزي"""
+    token = secrets.token_hex(32)
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_NOFOLLOW', 0), 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(token + '\n')
+    return token
+
+
+def read_token(path):
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+# ============ تنفيذ المهمة في عملية مستقلة ============
+class PipeEvents:
+    """واجهة put() لقائمة الأحداث فوق أنبوب multiprocessing (من العملية العاملة إلى الخادم)"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def put(self, event):
+        self._conn.send(event)
+
+
+class JobLogSink:
+    """يجمع النص المطبوع ويرسل كل سطر مكتمل كحدث إلى قائمة أحداث المهمة"""
+
+    def __init__(self, events):
+        self._events = events
+        self._buffer = ''
+
+    def write(self, text):
+        self._buffer += text
+        while '\n' in self._buffer:
+            line, self._buffer = self._buffer.split('\n', 1)
+            self._events.put({'type': 'log', 'line': line})
+        return len(text)
+
+    def flush(self):
+        if self._buffer:
+            self._events.put({'type': 'log', 'line': self._buffer})
+            self._buffer = ''
+
+
+def run_job_in_child(conn, request, compress):
+    """تُنفذ في العملية العاملة: الخيارات تُضبط هنا فقط، والمطبوع والنتائج والمقاييس تُرسل عبر الأنبوب"""
+    module = load_extractor()
+    events = PipeEvents(conn)
+    sink = JobLogSink(events)
+    sys.stdout = sink
+    try:
+        module.set_output_compression(compress)
+        paths = request.get('paths') or []
+        via_excel = bool(request.get('via_excel'))
+        use_ocr = bool(request.get('use_ocr'))
+        for i, item in enumerate(paths, 1):
+            print(f"[{i}/{len(paths)}] {'=' * 50}")
+            started = time.perf_counter()
+            try:
+                with module.measure_stage('process_single_item', item) as sample:
+                    results = module.process_single_item(item, via_excel=via_excel, use_ocr=use_ocr)
+                    sample['items'] = sum(r[1] for r in results)
+            except Exception as e:
+                sink.flush()
+                events.put({'type': 'error', 'item': item, 'message': str(e)})
+                continue
+            sink.flush()
+            events.put({
+                'type': 'result',
+                'item': item,
+                'files': sum(len(r[0]) for r in results),
+                'processed': sum(r[1] for r in results),
+                'skipped': sum(r[2] for r in results),
+                'seconds': round(time.perf_counter() - started, 3),
+            })
+    finally:
+        sink.flush()
+        conn.send({'type': 'metrics', 'stages': module.METRICS.drain()})
+        conn.close()
+
+
+def _job_context():
+    """forkserver يحمّل المستخرج مرة واحدة ثم تتفرع منه كل مهمة (عملية أحادية الخيط، آمنة للتفرع)"""
+    try:
+        ctx = multiprocessing.get_context('forkserver')
+    except ValueError:
+        return multiprocessing.get_context('spawn')
+    ctx.set_forkserver_preload([load_extractor().__name__])
+    return ctx
+
+
+# ============ الخادم ============
+class ExtractionDaemon:
+    """يدير طابور المهام؛ كل خيط عامل يشغّل مهمته في عملية مستقلة وينقل أحداثها إلى العميل"""
+
+    def __init__(self, workers=1, metrics_prom=None, compress=None):
+        self.metrics_prom = metrics_prom
+        self.compress = compress
+        self.jobs = queue.Queue()
+        self.started_at = time.time()
+        self.jobs_done = 0
+        self._lock = threading.Lock()
+        self._ctx = _job_context()
+        self._children = set()
+        self._threads = []
+        for i in range(max(1, workers)):
+            t = threading.Thread(target=self._worker_loop, name=f"extract-worker-{i + 1}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def warm_up(self):
+        """تحميل مسبق لما يمكن تحميله حتى لا تدفع المهمة الأولى تكلفته"""
+        if extractor.pytesseract is not None:
+            try:
+                version = extractor.pytesseract.get_tesseract_version()
+                print(f" ✓ Tesseract جاهز: {version}")
+            except Exception as e:
+                print(f" ⚠️ Tesseract غير متاح: {e}")
+        for name in ('pd', 'load_workbook', 'bs4', 'pdfplumber', 'PIL'):
+            status = 'محمّلة' if getattr(extractor, name, None) is not None else 'غير مثبتة'
+            print(f" ✓ {name}: {status}")
+        # تشغيل forkserver الآن ليحمّل المكتبات قبل وصول المهمة الأولى
+        warm = self._ctx.Process(target=time.sleep, args=(0,))
+        warm.start()
+        warm.join()
+
+    def submit(self, request):
+        """إضافة طلب إلى الطابور وإرجاع قائمة الأحداث التي سيُبث عبرها التقدم"""
+        events = queue.Queue()
+        self.jobs.put((request, events))
+        return events
+
+    def _worker_loop(self):
+        while True:
+            request, events = self.jobs.get()
+            try:
+                self._run_job(request, events)
+            except Exception as e:
+                events.put({'type': 'error', 'message': str(e)})
+            finally:
+                with self._lock:
+                    self.jobs_done += 1
+                    if self.metrics_prom:
+                        extractor.METRICS.write_prometheus(self.metrics_prom)
+                events.put({'type': 'done'})
+
+    def _run_job(self, request, events):
+        """تشغيل المهمة في عملية مستقلة وتمرير أحداثها إلى العميل حتى تنتهي"""
+        parent_conn, child_conn = self._ctx.Pipe(duplex=False)
+        process = self._ctx.Process(target=run_job_in_child, args=(child_conn, request, self.compress))
+        process.start()
+        child_conn.close()
+        with self._lock:
+            self._children.add(process)
+        try:
+            while True:
+                try:
+                    event = parent_conn.recv()
+                except EOFError:
+                    break
+                if event['type'] == 'metrics':
+                    extractor.METRICS.merge(event['stages'])
+                else:
+                    events.put(event)
+        finally:
+            parent_conn.close()
+            process.join()
+            with self._lock:
+                self._children.discard(process)
+        if process.exitcode:
+            events.put({'type': 'error', 'message': f"انتهت العملية العاملة برمز {process.exitcode}"})
+
+    def terminate_children(self):
+        with self._lock:
+            children = list(self._children)
+        for process in children:
+            process.terminate()
+        for process in children:
+            process.join()
+
+    def status(self):
+        return {
+            'type': 'status',
+            'pid': os.getpid(),
+            'uptime': round(time.time() - self.started_at, 1),
+            'queued': self.jobs.qsize(),
+            'jobs_done': self.jobs_done,
+            'workers': len(self._threads),
+            'stages': extractor.METRICS.snapshot(),
+        }
+
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    """يقرأ طلباً JSON واحداً من العميل ويبث الأحداث سطراً سطراً"""
+
+    def _send(self, event):
+        self.wfile.write((json.dumps(event, ensure_ascii=False) + '\n').encode('utf-8'))
+        self.wfile.flush()
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line.decode('utf-8'))
+        except ValueError:
+            self._send({'type': 'error', 'message': 'طلب JSON غير صالح'})
+            return
+        token = getattr(self.server, 'token', None)
+        if token and not hmac.compare_digest(str(request.get('token') or ''), token):
+            self._send({'type': 'error', 'message': 'رمز المصادقة مفقود أو غير صحيح'})
+            return
+        daemon = self.server.daemon_state
+        action = request.get('action', 'process')
+        if action == 'ping':
+            self._send(daemon.status())
+        elif action == 'stop':
+            self._send({'type': 'done', 'message': 'جارٍ إيقاف الخادم'})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        elif action == 'process':
+            events = daemon.submit(request)
+            while True:
+                event = events.get()
+                try:
+                    self._send(event)
+                except OSError:
+                    # انقطع العميل؛ تكمل المهمة في الخلفية
+                    return
+                if event['type'] == 'done':
+                    break
+        else:
+            self._send({'type': 'error', 'message': f"إجراء غير معروف: {action}"})
+
+
+if HAS_UNIX_SOCKETS:
+    class UnixDaemonServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+class TCPDaemonServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def _remove_stale_socket(path):
+    """حذف ملف مقبس متروك من خادم سابق توقف دون تنظيف"""
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+    else:
+        raise RuntimeError(f"يوجد خادم يعمل بالفعل على {path}")
+    finally:
+        probe.close()
+
+
+def serve(socket_path=None, port=None, workers=1, metrics_prom=None, compress=None, token_file=None):
+    load_extractor()
+    daemon = ExtractionDaemon(workers=workers, metrics_prom=metrics_prom, compress=compress)
+    print("🔥 تهيئة الخادم وتحميل المكتبات...")
+    daemon.warm_up()
+    if port is not None or not HAS_UNIX_SOCKETS:
+        token_file = token_file or DEFAULT_TOKEN_FILE
+        server = TCPDaemonServer(('127.0.0.1', port or DEFAULT_PORT), DaemonRequestHandler)
+        server.token = write_token(token_file)
+        where = f"127.0.0.1:{server.server_address[1]} (رمز المصادقة في {token_file})"
+    else:
+        token_file = None
+        socket_path = socket_path or DEFAULT_SOCKET
+        _remove_stale_socket(socket_path)
+        old_umask = os.umask(0o077)
+        try:
+            server = UnixDaemonServer(socket_path, DaemonRequestHandler)
+        finally:
+            os.umask(old_umask)
+        where = socket_path
+    server.daemon_state = daemon
+    print(f"✅ الخادم يستمع على: {where} (العمال: {workers})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        daemon.terminate_children()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+        if token_file and os.path.exists(token_file):
+            os.unlink(token_file)
+        print("🛑 تم إيقاف الخادم")
+
+
+# ============ العميل ============
+def _connect(socket_path=None, port=None):
+    if port is not None or not HAS_UNIX_SOCKETS:
+        return socket.create_connection(('127.0.0.1', port or DEFAULT_PORT))
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(socket_path or DEFAULT_SOCKET)
+    return sock
+
+
+def send_request(request, socket_path=None, port=None, token_file=None):
+    """إرسال طلب إلى الخادم وإرجاع مولّد لأحداثه بالترتيب"""
+    if port is not None or not HAS_UNIX_SOCKETS:
+        request = dict(request, token=read_token(token_file or DEFAULT_TOKEN_FILE))
+    sock = _connect(socket_path, port)
+    try:
+        sock.sendall((json.dumps(request, ensure_ascii=False) + '\n').encode('utf-8'))
+        with sock.makefile('rb') as stream:
+            for line in stream:
+                event = json.loads(line.decode('utf-8'))
+                yield event
+                if event.get('type') in ('done', 'status'):
+                    return
+    finally:
+        sock.close()
+
+
+def submit(paths, via_excel=False, use_ocr=False, socket_path=None, port=None, token_file=None):
+    request = {
+        'action': 'process',
+        'paths': [os.path.abspath(p) for p in paths],
+        'via_excel': via_excel,
+        'use_ocr': use_ocr,
+    }
+    errors = 0
+    total_files = 0
+    for event in send_request(request, socket_path, port, token_file):
+        kind = event.get('type')
+        if kind == 'log':
+            print(event['line'])
+        elif kind == 'result':
+            total_files += event['files']
+            print(f"✓ اكتمل: {event['files']} ملف منشأ ({event['seconds']} ث)")
+        elif kind == 'error':
+            errors += 1
+            print(f"❌ {event.get('item', '')} {event['message']}")
+    print(f"\n📁 عدد الملفات النصية المنشأة: {total_files}")
+    return errors == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="خادم استخراج دائم يبقي المعالجات محمّلة ويستقبل المهام عبر مقبس محلي.")
+    parser.add_argument('--socket', help=f'مسار مقبس Unix (الافتراضي: {DEFAULT_SOCKET})')
+    parser.add_argument('--port', type=int, help='استخدام TCP على 127.0.0.1 بدلاً من مقبس Unix')
+    parser.add_argument('--token-file', help=f'ملف رمز المصادقة لاتصالات TCP (الافتراضي: {DEFAULT_TOKEN_FILE})')
+    sub = parser.add_subparsers(dest='command', required=True)
+    serve_parser = sub.add_parser('serve', help='تشغيل الخادم')
+    serve_parser.add_argument('--workers', type=int, default=1, help='عدد الخيوط العاملة (الافتراضي 1)')
+    serve_parser.add_argument('--metrics-prom', metavar='PATH', help='تحديث ملف Prometheus textfile بعد كل مهمة')
+    serve_parser.add_argument('--compress', choices=['none', 'gzip', 'zstd'], default='none',
+                              help='ضغط المخرجات النصية أثناء كتابتها (zstd تتطلب مكتبة zstandard)')
+    submit_parser = sub.add_parser('submit', help='إرسال ملفات/مجلدات للمعالجة')
+    submit_parser.add_argument('--via-excel', action='store_true', help='تصدير قواعد البيانات بالتنسيق المقروء (تواريخ ص/م)')
+    submit_parser.add_argument('--ocr', action='store_true', help='تشغيل OCR على صفحات PDF التي لا تحتوي على نص')
+    submit_parser.add_argument('files', nargs='+', help='الملفات أو المجلدات المراد معالجتها')
+    sub.add_parser('ping', help='عرض حالة الخادم')
+    sub.add_parser('stop', help='إيقاف الخادم')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve(args.socket, args.port, args.workers, args.metrics_prom, args.compress, args.token_file)
+        return
+    try:
+        if args.command == 'submit':
+            ok = submit(args.files, args.via_excel, args.ocr, args.socket, args.port, args.token_file)
+            sys.exit(0 if ok else 1)
+        failed = False
+        for event in send_request({'action': args.command}, args.socket, args.port, args.token_file):
+            print(json.dumps(event, ensure_ascii=False, indent=2))
+            failed = failed or event.get('type') == 'error'
+        sys.exit(1 if failed else 0)
+    except (ConnectionError, FileNotFoundError):
+        print("❌ الخادم غير مشغّل. شغّله أولاً: python -m scripts.extract_daemon serve")
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
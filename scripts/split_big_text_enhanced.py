@@ -9,8 +9,12 @@ split_big_text_enhanced.py - تقسيم الملف النصي الكبير إل
 import os
 import sys
 import re
+import io
+import gzip
 import shutil
 
+COMPRESSED_SUFFIXES = ('.gz', '.zst')
+
 def safe_filename(filename, max_length=150):
     """
     تنظيف اسم الملف ليكون صالحاً لأنظمة الملفات.
@@ -30,6 +34,27 @@ def safe_filename(filename, max_length=150):
         filename = filename[:max_length]
     return filename
 
+def open_text_input(file_path):
+    """فتح الملف للقراءة سواء كان نصاً خاماً أو مضغوطاً بـ gzip/zstd (يُكشف من البايتات الأولى)"""
+    with open(file_path, 'rb') as f:
+        magic = f.read(4)
+    if magic[:2] == b'\x1f\x8b':
+        return gzip.open(file_path, 'rt', encoding='utf-8')
+    if magic == b'\x28\xb5\x2f\xfd':
+        try:
+            from compression import zstd  # بايثون 3.14+
+            return zstd.open(file_path, 'rt', encoding='utf-8')
+        except ImportError:
+            pass
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("الملف مضغوط بـ zstd: قم بتثبيت zstandard (pip install zstandard)")
+        reader = zstandard.ZstdDecompressor().stream_reader(open(file_path, 'rb'), read_across_frames=True,
+                                                             closefd=True)
+        return io.TextIOWrapper(reader, encoding='utf-8')
+    return open(file_path, 'r', encoding='utf-8')
+
 def get_unique_dirname(target_dir, base_name):
     """إنشاء اسم مجلد فريد لتجنب التكرار"""
     dir_path = os.path.join(target_dir, base_name + "_split")
@@ -51,12 +76,15 @@ def split_big_text_file(file_path):
 
     # مجلد الإخراج
     output_dir = os.path.dirname(file_path)
-    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    base_name = os.path.basename(file_path)
+    if base_name.endswith(COMPRESSED_SUFFIXES):
+        base_name = os.path.splitext(base_name)[0]
+    base_name = os.path.splitext(base_name)[0]
     target_dir = get_unique_dirname(output_dir, base_name)
     os.makedirs(target_dir, exist_ok=True)
     print(f"📁 مجلد الإخراج: {target_dir}")
 
-    with open(file_path, 'r', encoding='utf-8') as f:
+    with open_text_input(file_path) as f:
         content = f.read()
 
     # نمط التعرف على الأقسام: "اسم الملف: " ثم اسم الملف (حتى نهاية السطر)
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+watch_folder.py - مراقبة مجلد وارد (inbox) ومعالجة ما يُسقط فيه تلقائياً
+- يستخدم inotify على لينكس، ويعود إلى فحص دوري خفيف في الأنظمة الأخرى
+- لا يعالج الملف حتى يستقر حجمه وتاريخ تعديله (لتجنب الملفات نصف المنسوخة)
+- يوزع العناصر على مجموعة عمليات متكيفة (adaptive_pool) تستدعي process_single_item
+- يسجل كل ما عولج في ملف manifest حتى لا يعاد عند إعادة التشغيل
+
+الاستخدام:
+  python -m scripts.watch_folder [--workers N] [--settle ثوانٍ] [--via-excel] [--ocr] مجلد_الوارد
+"""
+
+import os
+import sys
+import json
+import time
+import errno
+import select
+import struct
+import argparse
+import datetime
+
+try:
+    from scripts import zip_rar_folder2txt as extractor
+    from scripts import adaptive_pool
+except ImportError:
+    import zip_rar_folder2txt as extractor
+    import adaptive_pool
+
+MANIFEST_NAME = '.ingest_manifest.jsonl'
+# العنصر الذي فشل بالبصمة نفسها هذا العدد من المرات لا يُعاد حتى يتغير على القرص
+MAX_INGEST_ATTEMPTS = 3
+# لواحق ملفات التنزيل/النسخ غير المكتملة
+PARTIAL_SUFFIXES = ('.part', '.partial', '.crdownload', '.download', '.tmp', '~')
+
+# ============ inotify عبر ctypes (لينكس فقط) ============
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """غلاف بسيط حول inotify يعيد أسماء العناصر التي تغيرت في المجلد"""
+
+    def __init__(self, path):
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), mask) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, 'inotify_add_watch failed')
+
+    def read_names(self, timeout):
+        """انتظار الأحداث حتى timeout ثانية وإرجاع مجموعة الأسماء المتأثرة"""
+        names = set()
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return names
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return names
+            raise
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _wd, _mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            raw = data[offset:offset + length].split(b'\0', 1)[0]
+            offset += length
+            if raw:
+                names.add(os.fsdecode(raw))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """بديل بالفحص الدوري: لا يعيد قراءة المجلد إلا إذا تغير تاريخ تعديله"""
+
+    def __init__(self, path, rescan_every=30.0):
+        self.path = path
+        self.rescan_every = rescan_every
+        self._dir_mtime = None
+        self._last_scan = 0.0
+
+    def read_names(self, timeout):
+        time.sleep(timeout)
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return set()
+        now = time.monotonic()
+        if mtime == self._dir_mtime and now - self._last_scan < self.rescan_every:
+            return set()
+        self._dir_mtime = mtime
+        self._last_scan = now
+        with os.scandir(self.path) as it:
+            return {entry.name for entry in it}
+
+    def close(self):
+        pass
+
+
+def create_watcher(path, force_polling=False):
+    if not force_polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(path), 'inotify'
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(path), 'polling'
+
+
+# ============ الاستقرار والـ manifest ============
+def is_candidate_name(name):
+    """استبعاد الملفات المخفية ومجلدات المخرجات والملفات غير المكتملة"""
+    if name.startswith('.') or name.endswith(PARTIAL_SUFFIXES):
+        return False
+    return not extractor.is_output_dirname(name)
+
+
+def item_signature(path):
+    """بصمة (الحجم، آخر تعديل) لملف، أو مجموعها لمجلد بكامل محتواه"""
+    st = os.stat(path)
+    if not os.path.isdir(path):
+        return (st.st_size, st.st_mtime_ns)
+    total_size = 0
+    latest = st.st_mtime_ns
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            try:
+                fst = os.stat(os.path.join(root, name))
+            except OSError:
+                continue
+            total_size += fst.st_size
+            latest = max(latest, fst.st_mtime_ns)
+    return (total_size, latest)
+
+
+class IngestManifest:
+    """سجل JSONL للعناصر المعالجة، مفتاحه الاسم مع الحجم وتاريخ التعديل.
+    العنصر الناجح لا يُعاد، والفاشل يُعاد حتى max_attempts محاولة (ملف مقفل أو خطأ عابر)."""
+
+    def __init__(self, path, max_attempts=MAX_INGEST_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.seen = set()
+        self.failures = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._note((rec['name'], rec['size'], rec['mtime_ns']), rec.get('status', 'ok'))
+
+    def _note(self, key, status):
+        if status == 'ok':
+            self.seen.add(key)
+        else:
+            self.failures[key] = self.failures.get(key, 0) + 1
+
+    def attempts(self, name, signature):
+        return self.failures.get((name, signature[0], signature[1]), 0)
+
+    def contains(self, name, signature):
+        """هل انتهى أمر العنصر: نجح، أو استنفد محاولاته بالبصمة نفسها"""
+        key = (name, signature[0], signature[1])
+        return key in self.seen or self.failures.get(key, 0) >= self.max_attempts
+
+    def record(self, name, signature, summary):
+        rec = {
+            'name': name,
+            'size': signature[0],
+            'mtime_ns': signature[1],
+            'ingested_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        }
+        rec.update(summary)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(rec, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self._note((name, signature[0], signature[1]), summary.get('status', 'ok'))
+
+
+# ============ الحلقة الرئيسية ============
+def watch(inbox, workers=2, settle=5.0, poll_interval=1.0, via_excel=False, use_ocr=False,
+          manifest_path=None, min_workers=1, memory_budget_mb=None, once=False, force_polling=False, metrics_json=None, metrics_prom=None,
+          profile=None):
+    inbox = os.path.abspath(inbox)
+    manifest = IngestManifest(manifest_path or os.path.join(inbox, MANIFEST_NAME))
+    watcher, mode = create_watcher(inbox, force_polling)
+    print(f"👀 مراقبة المجلد: {inbox} (الوضع: {mode}، العمال: {workers}، الاستقرار: {settle} ث)")
+
+    # الاسم -> (البصمة، وقت آخر تغيير لها)
+    pending = {}
+    in_flight = {}
+    with os.scandir(inbox) as it:
+        initial = {entry.name for entry in it}
+
+    def note(names):
+        now = time.monotonic()
+        for name in names:
+            if not is_candidate_name(name) or name in in_flight:
+                continue
+            path = os.path.join(inbox, name)
+            try:
+                sig = item_signature(path)
+            except OSError:
+                pending.pop(name, None)
+                continue
+            if manifest.contains(name, sig):
+                pending.pop(name, None)
+                continue
+            old = pending.get(name)
+            if old is None or old[0] != sig:
+                pending[name] = (sig, now)
+
+    note(initial)
+    pool = adaptive_pool.AdaptivePool(min_workers=min(min_workers, workers), max_workers=workers,
+                                      memory_budget_mb=memory_budget_mb)
+    try:
+        while True:
+            # إعادة فحص المرشحين فقط (وليس المجلد كاملاً) لمعرفة استقرارهم
+            note(list(pending))
+            now = time.monotonic()
+            for name, (sig, since) in list(pending.items()):
+                if now - since < settle:
+                    continue
+                del pending[name]
+                path = os.path.join(inbox, name)
+                print(f"📥 عنصر جديد مستقر: {name}")
+                cost, tag = adaptive_pool.estimate_job_memory(path, use_ocr=use_ocr)
+                pool.submit(name, extractor.run_item_job, path, via_excel, use_ocr, profile, cost_mb=cost, tag=tag)
+                in_flight[name] = sig
+
+            for name, ok, summary in pool.poll(timeout=0):
+                sig = in_flight.pop(name)
+                if not ok:
+                    summary = {'status': 'error', 'error': summary}
+                extractor.METRICS.merge(summary.pop('metrics', {}))
+                manifest.record(name, sig, summary)
+                if metrics_json:
+                    extractor.METRICS.write_json(metrics_json, inbox=inbox,
+                                                 updated_at=datetime.datetime.now().isoformat(timespec='seconds'))
+                if metrics_prom:
+                    extractor.METRICS.write_prometheus(metrics_prom)
+                if summary['status'] == 'ok':
+                    print(f"✓ اكتمل {name}: {summary['files']} ملف منشأ ({summary['seconds']} ث)")
+                elif not manifest.contains(name, sig):
+                    # يعود إلى الانتظار فيُعاد بعد مهلة الاستقرار
+                    print(f"⚠️ فشل {name} (المحاولة {manifest.attempts(name, sig)}/{manifest.max_attempts}): "
+                          f"{summary.get('error')}")
+                    pending[name] = (sig, time.monotonic())
+                else:
+                    print(f"❌ فشل {name}: {summary.get('error')}")
+
+            if once and not pending and not in_flight:
+                break
+            note(watcher.read_names(min(poll_interval, settle) if pending or in_flight else poll_interval))
+    except KeyboardInterrupt:
+        print("\n🛑 إيقاف المراقبة... إلغاء المهام الجارية")
+    finally:
+        # إنهاء العمليات العاملة وانتظارها حتى لا تبقى يتيمة؛ المهام الملغاة لا تدخل السجل
+        # فتُعالج من جديد في التشغيل القادم
+        pool.shutdown(cancel=True)
+        watcher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="مراقبة مجلد وارد ومعالجة الملفات الجديدة تلقائياً بعد استقرارها.")
+    parser.add_argument('inbox', help='المجلد المراد مراقبته')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help='الحد الأعلى للعمليات العاملة (يتكيف التزامن آلياً حسب الذاكرة والحمل)')
+    parser.add_argument('--min-workers', type=int, default=1, help='الحد الأدنى للتزامن')
+    parser.add_argument('--memory-budget', type=float, metavar='MB', help='ميزانية الذاكرة (الافتراضي 70%% من المتاحة)')
+    parser.add_argument('--settle', type=float, default=5.0, help='عدد الثواني التي يجب أن يبقى فيها الملف دون تغيير')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='فترة الفحص الدوري بالثواني')
+    parser.add_argument('--manifest', help=f'مسار ملف السجل (الافتراضي: <المجلد>/{MANIFEST_NAME})')
+    parser.add_argument('--via-excel', action='store_true', help='تصدير قواعد البيانات بالتنسيق المقروء (تواريخ ص/م)')
+    parser.add_argument('--ocr', action='store_true', help='تشغيل OCR على صفحات PDF التي لا تحتوي على نص')
+    parser.add_argument('--compress', choices=['none', 'gzip', 'zstd'], default='none',
+                        help='ضغط المخرجات النصية أثناء كتابتها (zstd تتطلب مكتبة zstandard)')
+    parser.add_argument('--polling', action='store_true', help='فرض الفحص الدوري بدلاً من inotify')
+    parser.add_argument('--once', action='store_true', help='معالجة الموجود حالياً ثم الخروج')
+    parser.add_argument('--metrics-json', metavar='PATH', help='تحديث تقرير JSON بمقاييس المراحل بعد كل عنصر')
+    parser.add_argument('--metrics-prom', metavar='PATH', help='تحديث ملف Prometheus textfile بعد كل عنصر')
+    parser.add_argument('--profile', nargs='?', const='profiles', metavar='DIR', help='تقرير cProfile لكل عنصر في DIR')
+    parser.add_argument('--profile-threshold', type=float, default=0.0, metavar='SECONDS',
+                        help='عدم كتابة تقارير التحليل إلا للعناصر الأبطأ من هذا الزمن')
+    parser.add_argument('--profile-alloc', action='store_true', help='إضافة لقطة tracemalloc لأكبر مواضع التخصيص')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.inbox):
+        print(f"❌ المجلد غير موجود: {args.inbox}")
+        sys.exit(1)
+    extractor.set_output_compression(args.compress)
+    profile = None
+    if args.profile:
+        profile = {'profile_dir': os.path.abspath(args.profile), 'threshold': args.profile_threshold,
+                   'trace_alloc': args.profile_alloc}
+    watch(args.inbox, workers=args.workers, settle=args.settle, poll_interval=args.poll_interval,
+          via_excel=args.via_excel, use_ocr=args.ocr, manifest_path=args.manifest,
+          min_workers=args.min_workers, memory_budget_mb=args.memory_budget,
+          once=args.once, force_polling=args.polling,
+          metrics_json=args.metrics_json, metrics_prom=args.metrics_prom, profile=profile)
+
+
+if __name__ == "__main__":
+    main()
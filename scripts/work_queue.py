@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+work_queue.py - توزيع المعالجة على عدة أجهزة عبر طابور مهام مشترك بنظام الإيجار (lease)
+- المنسق يسجل المدخلات في جدول طابور (SQLite على نظام ملفات مشترك)
+- أي عدد من العمال على أي جهاز يستأجر عنصراً، ويجدد الإيجار بنبضات دورية أثناء المعالجة
+  عبر process_single_item، ثم يسجل النتيجة
+- الإيجار المنتهي (عامل توقف أو انقطع) يعود إلى الطابور تلقائياً، حتى max_attempts محاولات
+- بديل محلي مبني على ملف JSON مع قفل fcntl للاختبار دون SQLite مشترك
+
+الاستخدام:
+  python -m scripts.work_queue enqueue queue.db [--expand] مدخل1 مدخل2 ...
+  python -m scripts.work_queue work queue.db [--lease 300] [--exit-when-empty] [--via-excel] [--ocr]
+  python -m scripts.work_queue status queue.db
+  python -m scripts.work_queue requeue queue.db        # إعادة العناصر الفاشلة إلى الطابور
+
+ملاحظة: المسارات تُخزن مطلقة، فيجب أن تكون المدخلات والطابور مركّبة بالمسار نفسه على كل الأجهزة.
+وتعتمد صلاحية الإيجار على ساعات الأجهزة؛ اجعل مدة الإيجار أكبر بكثير من فرق التوقيت بينها.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import sqlite3
+import argparse
+import threading
+import contextlib
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    from scripts import zip_rar_folder2txt as extractor
+except ImportError:
+    import zip_rar_folder2txt as extractor
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+STATUSES = ('queued', 'leased', 'done', 'failed')
+
+
+# ============ طابور SQLite ============
+class SQLiteLeaseQueue:
+    """طابور في قاعدة SQLite مشتركة؛ كل انتقال حالة يتم داخل معاملة BEGIN IMMEDIATE.
+
+    لا يُستخدم وضع WAL لأنه لا يعمل عبر أنظمة الملفات الشبكية (NFS/SMB)."""
+
+    def __init__(self, path, max_attempts=DEFAULT_MAX_ATTEMPTS, clock=time.time):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self._local = threading.local()
+        with self._transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS work_items (
+                    id INTEGER PRIMARY KEY,
+                    path TEXT NOT NULL UNIQUE,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker TEXT,
+                    lease_expires REAL,
+                    enqueued_at REAL NOT NULL,
+                    finished_at REAL,
+                    result TEXT
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS work_items_status ON work_items (status, id)")
+
+    def _conn(self):
+        # اتصال لكل خيط: خيط النبضات يعمل بالتوازي مع خيط المعالجة
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def enqueue(self, paths):
+        now = self.clock()
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO work_items (path, enqueued_at) VALUES (?, ?)",
+                             ((p, now) for p in paths))
+            return conn.total_changes - before
+
+    def _expire_leases(self, conn, now):
+        conn.execute("""UPDATE work_items SET status = 'failed', worker = NULL, lease_expires = NULL,
+                            finished_at = ?, result = ?
+                        WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?""",
+                     (now, json.dumps({'status': 'error', 'error': 'انتهى الإيجار في كل المحاولات'}),
+                      now, self.max_attempts))
+        return conn.execute("""UPDATE work_items SET status = 'queued', worker = NULL, lease_expires = NULL
+                               WHERE status = 'leased' AND lease_expires < ?""", (now,)).rowcount
+
+    def lease(self, worker, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """استئجار أقدم عنصر في الطابور؛ يعيد (id, path) أو None"""
+        now = self.clock()
+        with self._transaction() as conn:
+            self._expire_leases(conn, now)
+            row = conn.execute("SELECT id, path FROM work_items WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                return None
+            conn.execute("""UPDATE work_items SET status = 'leased', worker = ?, lease_expires = ?,
+                                attempts = attempts + 1
+                            WHERE id = ?""", (worker, now + lease_seconds, row[0]))
+            return row[0], row[1]
+
+    def heartbeat(self, item_id, worker, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """تمديد الإيجار؛ يعيد False إن لم يعد العنصر مستأجراً لهذا العامل"""
+        with self._transaction() as conn:
+            return conn.execute("""UPDATE work_items SET lease_expires = ?
+                                   WHERE id = ? AND worker = ? AND status = 'leased'""",
+                                (self.clock() + lease_seconds, item_id, worker)).rowcount == 1
+
+    def complete(self, item_id, worker, summary):
+        """تسجيل نتيجة العنصر؛ يعيد False إن فقد العامل الإيجار قبل الانتهاء"""
+        status = 'done' if summary.get('status') == 'ok' else 'failed'
+        with self._transaction() as conn:
+            return conn.execute("""UPDATE work_items SET status = ?, worker = NULL, lease_expires = NULL,
+                                       finished_at = ?, result = ?
+                                   WHERE id = ? AND worker = ? AND status = 'leased'""",
+                                (status, self.clock(), json.dumps(summary, ensure_ascii=False),
+                                 item_id, worker)).rowcount == 1
+
+    def requeue_failed(self):
+        with self._transaction() as conn:
+            return conn.execute("""UPDATE work_items SET status = 'queued', attempts = 0, result = NULL,
+                                       finished_at = NULL
+                                   WHERE status = 'failed'""").rowcount
+
+    def stats(self):
+        """عدد العناصر في كل حالة بعد إعادة الإيجارات المنتهية"""
+        with self._transaction() as conn:
+            self._expire_leases(conn, self.clock())
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM work_items GROUP BY status").fetchall())
+        return {status: counts.get(status, 0) for status in STATUSES}
+
+    def failures(self, limit=20):
+        rows = self._conn().execute("""SELECT path, attempts, result FROM work_items
+                                       WHERE status = 'failed' ORDER BY finished_at DESC LIMIT ?""",
+                                    (limit,)).fetchall()
+        return [(path, attempts, json.loads(result or '{}').get('error')) for path, attempts, result in rows]
+
+
+# ============ بديل محلي بملف JSON ============
+class FileLeaseQueue:
+    """الواجهة نفسها فوق ملف JSON محمي بقفل fcntl؛ مناسب للاختبار على جهاز واحد"""
+
+    def __init__(self, path, max_attempts=DEFAULT_MAX_ATTEMPTS, clock=time.time):
+        if fcntl is None:
+            raise RuntimeError("FileLeaseQueue يتطلب fcntl (أنظمة POSIX)")
+        self.path = path
+        self.lock_path = path + '.lock'
+        self.max_attempts = max_attempts
+        self.clock = clock
+        with self._transaction():
+            pass
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        with open(self.lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        state = json.load(f)
+                except (FileNotFoundError, ValueError):
+                    state = {'next_id': 1, 'items': {}}
+                yield state
+                tmp = self.path + '.tmp'
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(state, f, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def enqueue(self, paths):
+        now = self.clock()
+        added = 0
+        with self._transaction() as state:
+            known = {item['path'] for item in state['items'].values()}
+            for p in paths:
+                if p in known:
+                    continue
+                state['items'][str(state['next_id'])] = {
+                    'path': p, 'status': 'queued', 'attempts': 0, 'worker': None,
+                    'lease_expires': None, 'enqueued_at': now, 'finished_at': None, 'result': None,
+                }
+                state['next_id'] += 1
+                known.add(p)
+                added += 1
+        return added
+
+    def _expire_leases(self, state, now):
+        for item in state['items'].values():
+            if item['status'] == 'leased' and item['lease_expires'] < now:
+                item['worker'] = item['lease_expires'] = None
+                if item['attempts'] >= self.max_attempts:
+                    item.update(status='failed', finished_at=now,
+                                result={'status': 'error', 'error': 'انتهى الإيجار في كل المحاولات'})
+                else:
+                    item['status'] = 'queued'
+
+    def lease(self, worker, lease_seconds=DEFAULT_LEASE_SECONDS):
+        now = self.clock()
+        with self._transaction() as state:
+            self._expire_leases(state, now)
+            queued = [int(k) for k, item in state['items'].items() if item['status'] == 'queued']
+            if not queued:
+                return None
+            item_id = min(queued)
+            item = state['items'][str(item_id)]
+            item.update(status='leased', worker=worker, lease_expires=now + lease_seconds,
+                        attempts=item['attempts'] + 1)
+            return item_id, item['path']
+
+    def _owned(self, state, item_id, worker):
+        item = state['items'].get(str(item_id))
+        if item and item['status'] == 'leased' and item['worker'] == worker:
+            return item
+        return None
+
+    def heartbeat(self, item_id, worker, lease_seconds=DEFAULT_LEASE_SECONDS):
+        with self._transaction() as state:
+            item = self._owned(state, item_id, worker)
+            if item:
+                item['lease_expires'] = self.clock() + lease_seconds
+            return item is not None
+
+    def complete(self, item_id, worker, summary):
+        with self._transaction() as state:
+            item = self._owned(state, item_id, worker)
+            if item:
+                item.update(status='done' if summary.get('status') == 'ok' else 'failed',
+                            worker=None, lease_expires=None, finished_at=self.clock(), result=summary)
+            return item is not None
+
+    def requeue_failed(self):
+        count = 0
+        with self._transaction() as state:
+            for item in state['items'].values():
+                if item['status'] == 'failed':
+                    item.update(status='queued', attempts=0, result=None, finished_at=None)
+                    count += 1
+        return count
+
+    def stats(self):
+        counts = dict.fromkeys(STATUSES, 0)
+        with self._transaction() as state:
+            self._expire_leases(state, self.clock())
+            for item in state['items'].values():
+                counts[item['status']] += 1
+        return counts
+
+    def failures(self, limit=20):
+        with self._transaction() as state:
+            failed = [item for item in state['items'].values() if item['status'] == 'failed']
+        failed.sort(key=lambda item: item['finished_at'] or 0, reverse=True)
+        return [(item['path'], item['attempts'], (item['result'] or {}).get('error')) for item in failed[:limit]]
+
+
+def open_queue(path, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """ملفات .json تستخدم البديل المحلي، وما عداها قاعدة SQLite"""
+    if path.lower().endswith('.json'):
+        return FileLeaseQueue(path, max_attempts=max_attempts)
+    return SQLiteLeaseQueue(path, max_attempts=max_attempts)
+
+
+# ============ العامل ============
+class LeaseHeartbeat(threading.Thread):
+    """خيط يجدد إيجار العنصر كل ثلث مدة الإيجار حتى يُوقف"""
+
+    def __init__(self, queue, item_id, worker, lease_seconds):
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.item_id = item_id
+        self.worker = worker
+        self.lease_seconds = lease_seconds
+        self.lost = False
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.lease_seconds / 3):
+            try:
+                if not self.queue.heartbeat(self.item_id, self.worker, self.lease_seconds):
+                    self.lost = True
+                    return
+            except sqlite3.Error as e:
+                # خطأ عابر في نظام الملفات المشترك: نحاول في النبضة التالية
+                print(f"⚠️ تعذر تجديد الإيجار: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def run_worker(queue, worker_id=None, lease_seconds=DEFAULT_LEASE_SECONDS, via_excel=False, use_ocr=False,
+               exit_when_empty=False, idle_sleep=5.0):
+    """حلقة العامل: استئجار، معالجة مع نبضات، تسجيل النتيجة"""
+    worker_id = worker_id or default_worker_id()
+    print(f"👷 العامل {worker_id} جاهز (مدة الإيجار {lease_seconds} ث)")
+    done = 0
+    while True:
+        leased = queue.lease(worker_id, lease_seconds)
+        if leased is None:
+            stats = queue.stats()
+            if exit_when_empty and stats['leased'] == 0:
+                break
+            time.sleep(idle_sleep)
+            continue
+        item_id, path = leased
+        print(f"\n📥 [{item_id}] {path}")
+        heartbeat = LeaseHeartbeat(queue, item_id, worker_id, lease_seconds)
+        heartbeat.start()
+        try:
+            summary = extractor.run_item_job(path, via_excel=via_excel, use_ocr=use_ocr)
+        finally:
+            heartbeat.stop()
+        summary.pop('metrics', None)
+        summary['worker'] = worker_id
+        if heartbeat.lost or not queue.complete(item_id, worker_id, summary):
+            print(f"⚠️ [{item_id}] فُقد الإيجار قبل الانتهاء؛ النتيجة لم تُسجل وسيعالجه عامل آخر")
+        elif summary['status'] == 'ok':
+            done += 1
+            print(f"✓ [{item_id}] {summary['files']} ملف منشأ ({summary['seconds']} ث)")
+        else:
+            print(f"❌ [{item_id}] {summary.get('error')}")
+    print(f"\n🏁 لا مزيد من العناصر؛ عالج هذا العامل {done} عنصر")
+
+
+def expand_inputs(inputs, expand=False):
+    """المسارات المطلقة للمدخلات؛ مع expand يصبح كل عنصر داخل المجلد مهمة مستقلة"""
+    paths = []
+    for item in inputs:
+        item = os.path.abspath(item)
+        if expand and os.path.isdir(item):
+            with os.scandir(item) as it:
+                # مجلدات المخرجات من تشغيل سابق ليست مدخلات
+                paths.extend(sorted(e.path for e in it
+                                    if not e.name.startswith('.') and not extractor.is_output_dirname(e.name)))
+        else:
+            paths.append(item)
+    return paths
+
+
+def print_status(queue):
+    stats = queue.stats()
+    total = sum(stats.values())
+    print(f"📊 الطابور: {total} عنصر")
+    labels = {'queued': 'في الانتظار', 'leased': 'قيد المعالجة', 'done': 'مكتمل', 'failed': 'فاشل'}
+    for status in STATUSES:
+        print(f"   {labels[status]}: {stats[status]}")
+    failures = queue.failures()
+    if failures:
+        print("\n❌ آخر الإخفاقات:")
+        for path, attempts, error in failures:
+            print(f"   • {path} (محاولات: {attempts}): {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="طابور مهام مشترك لتوزيع الاستخراج على عدة أجهزة.")
+    parser.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS,
+                        help='أقصى عدد لمحاولات العنصر قبل اعتباره فاشلاً')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_enqueue = sub.add_parser('enqueue', help='إضافة مدخلات إلى الطابور')
+    p_enqueue.add_argument('queue', help='ملف الطابور (.db لـ SQLite أو .json للبديل المحلي)')
+    p_enqueue.add_argument('--expand', action='store_true', help='جعل كل عنصر داخل المجلدات المعطاة مهمة مستقلة')
+    p_enqueue.add_argument('inputs', nargs='+')
+
+    p_work = sub.add_parser('work', help='تشغيل عامل يستأجر العناصر ويعالجها')
+    p_work.add_argument('queue')
+    p_work.add_argument('--worker-id', help='معرف العامل (الافتراضي: الجهاز:رقم العملية)')
+    p_work.add_argument('--lease', type=float, default=DEFAULT_LEASE_SECONDS, help='مدة الإيجار بالثواني')
+    p_work.add_argument('--exit-when-empty', action='store_true', help='الخروج عند فراغ الطابور')
+    p_work.add_argument('--idle-sleep', type=float, default=5.0, help='فترة الانتظار عند فراغ الطابور')
+    p_work.add_argument('--via-excel', action='store_true', help='تصدير قواعد البيانات بالتنسيق المقروء (تواريخ ص/م)')
+    p_work.add_argument('--ocr', action='store_true', help='تشغيل OCR على صفحات PDF التي لا تحتوي على نص')
+    p_work.add_argument('--compress', choices=['none', 'gzip', 'zstd'], default='none',
+                        help='ضغط المخرجات النصية أثناء كتابتها (zstd تتطلب مكتبة zstandard)')
+
+    p_status = sub.add_parser('status', help='عرض حالة الطابور')
+    p_status.add_argument('queue')
+
+    p_requeue = sub.add_parser('requeue', help='إعادة العناصر الفاشلة إلى الطابور')
+    p_requeue.add_argument('queue')
+
+    args = parser.parse_args()
+    queue = open_queue(args.queue, max_attempts=args.max_attempts)
+
+    if args.command == 'enqueue':
+        paths = expand_inputs(args.inputs, expand=args.expand)
+        missing = [p for p in paths if not os.path.exists(p)]
+        for p in missing:
+            print(f"⚠️ غير موجود: {p}")
+        added = queue.enqueue([p for p in paths if p not in missing])
+        print(f"✓ أضيف {added} عنصر جديد ({len(paths) - len(missing) - added} موجود مسبقاً)")
+    elif args.command == 'work':
+        extractor.set_output_compression(args.compress)
+        try:
+            run_worker(queue, worker_id=args.worker_id, lease_seconds=args.lease,
+                       via_excel=args.via_excel, use_ocr=args.ocr,
+                       exit_when_empty=args.exit_when_empty, idle_sleep=args.idle_sleep)
+        except KeyboardInterrupt:
+            # الإيجار الجاري ينتهي ويعود العنصر إلى الطابور تلقائياً
+            print("\n🛑 تم إيقاف العامل")
+    elif args.command == 'status':
+        print_status(queue)
+    elif args.command == 'requeue':
+        print(f"✓ أعيد {queue.requeue_failed()} عنصر إلى الطابور")
+
+
+if __name__ == "__main__":
+    main()
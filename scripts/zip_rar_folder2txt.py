@@ -19,19 +19,39 @@ except Exception:
 
 import os
 import re
+import csv
 import json
 import shutil
 import hashlib
+import random
 import zipfile
 import tarfile
+import io
 import gzip
+import codecs
 import datetime
 import tempfile
 import sqlite3
 import subprocess
 import warnings
 import pathlib
+import posixpath
+import xml.etree.ElementTree as ET
+import argparse
+import concurrent.futures
+import time
+import threading
+import multiprocessing
+import functools
+import contextlib
+import cProfile
+import pstats
+import tracemalloc
 from pathlib import Path
+try:
+    import fcntl
+except ImportError:  # ويندوز
+    fcntl = None
 from typing import Dict, List, Tuple, Optional, Union
 
 # إخماد تحذيرات المكتبات (اختياري)
@@ -53,19 +73,24 @@ def check_and_import(module_name, package_name=None):
 
 # استيراد المكتبات الاختيارية
 pd = check_and_import('pandas', 'pandas')
-if pd:
-    try:
-        from openpyxl import load_workbook  # جزء من pandas/openpyxl
-    except ImportError:
-        pd = None
-        print("⚠️ openpyxl غير مثبتة، معالجة Excel ستكون محدودة.")
+try:
+    from openpyxl import load_workbook  # قراءة XLSX المتدفقة (read_only) ومحرك pandas للكتابة
+except ImportError:
+    load_workbook = None
+if pd and load_workbook is None:
+    pd = None
+    print("⚠️ openpyxl غير مثبتة، معالجة Excel ستكون محدودة.")
 
-docx = check_and_import('docx', 'python-docx')
 bs4 = check_and_import('bs4', 'beautifulsoup4')
+try:
+    from lxml import etree as lxml_etree  # محرك HTML السريع (--html-engine)
+except ImportError:
+    lxml_etree = None
 rarfile = check_and_import('rarfile', 'rarfile')
 pdfplumber = check_and_import('pdfplumber', 'pdfplumber')
 PIL = check_and_import('PIL', 'Pillow')
 pytesseract = check_and_import('pytesseract', 'pytesseract')
+chardet = check_and_import('chardet', 'chardet')
 
 # ============ الامتدادات المدعومة ============
 TEXT_EXTENSIONS = {'.txt', '.py', '.js', '.json', '.xml', '.csv', '.md', '.yml', '.yaml', 
@@ -96,6 +121,16 @@ def safe_makedirs(path):
     if not os.path.exists(path):
         os.makedirs(path, exist_ok=True)
 
+def source_name(source):
+    """اسم المصدر لمعرفة امتداده وعرضه: المسار نفسه، أو اسم عضو الأرشيف لكائن ملف (MemberBuffer)"""
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    return getattr(source, 'member_name', None) or getattr(source, 'name', None) or ''
+
+def source_missing(source):
+    """مسار غير موجود؛ كائنات الملفات المفتوحة موجودة دائماً"""
+    return isinstance(source, (str, os.PathLike)) and not os.path.exists(source)
+
 def get_unique_filename(base_name, extension):
     """إنشاء اسم ملف فريد لتجنب الكتابة فوق الملفات الموجودة"""
     if not os.path.exists(base_name + extension):
@@ -119,6 +154,20 @@ def get_unique_dirname(target_dir, base_name):
             return new_path
         counter += 1
 
+
+def is_output_dirname(name):
+    """هل الاسم مجلد مخرجات أنشأه get_unique_dirname (<الاسم>_extracted أو <الاسم>_extracted_N)"""
+    stem = name.rsplit('_extracted', 1)
+    return len(stem) == 2 and (stem[1] == '' or (stem[1].startswith('_') and stem[1][1:].isdigit()))
+
+
+def item_output_dirname(target_dir, base_name):
+    """مجلد مخرجات عنصر أو عضو أرشيف: فريد في كل تشغيل، وثابت في التصدير التزايدي
+    ليعود كل تشغيل إلى ملفات الجداول السابقة ويُلحق بها"""
+    if DB_INCREMENTAL:
+        return os.path.join(target_dir, base_name + "_extracted")
+    return get_unique_dirname(target_dir, base_name)
+
 def is_split_archive_extension(extension):
     ext_lower = extension.lower()
     if ext_lower.startswith('.z') and ext_lower[2:].isdigit():
@@ -154,12 +203,20 @@ def is_model_file(file_path):
         return True
     return False
 
+TIMESTAMP_FORMATS = (
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M:%S.%f',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S.%f',
+    '%Y-%m-%d',
+    '%d/%m/%Y %H:%M:%S'
+)
+
+
 def convert_timestamp(value):
     """تحويل الطوابع الزمنية إلى تنسيق عربي مقروء (ص/م)"""
-    if pd is None:
-        return str(value)
     try:
-        if pd.isna(value) or value is None:
+        if value is None or (pd is not None and pd.isna(value)):
             return "NULL"
         if isinstance(value, (int, float)):
             try:
@@ -167,47 +224,38 @@ def convert_timestamp(value):
             except:
                 pass
         if isinstance(value, str):
-            formats = [
-                '%Y-%m-%d %H:%M:%S',
-                '%Y-%m-%d %H:%M:%S.%f',
-                '%Y-%m-%dT%H:%M:%S',
-                '%Y-%m-%dT%H:%M:%S.%f',
-                '%Y-%m-%d',
-                '%d/%m/%Y %H:%M:%S'
-            ]
-            for fmt in formats:
+            # كل الصيغ تبدأ برقم: النصوص العادية لا تمر على strptime أصلاً
+            if not value[:1].isdigit():
+                return value
+            for fmt in TIMESTAMP_FORMATS:
                 try:
                     value = datetime.datetime.strptime(value, fmt)
                     break
                 except:
                     continue
         if isinstance(value, datetime.datetime):
-            hour = value.hour
-            if hour == 0:
-                hour_12 = 12
-                meridiem = "ص"
-            elif 1 <= hour <= 11:
-                hour_12 = hour
-                meridiem = "ص"
-            elif hour == 12:
-                hour_12 = 12
-                meridiem = "م"
-            else:
-                hour_12 = hour - 12
-                meridiem = "م"
-            return f"{value.day:02d}/{value.month:02d}/{value.year} {hour_12}:{value.minute:02d}:{value.second:02d} {meridiem}"
+            return _format_datetime(value)
         return str(value)
     except Exception:
         return str(value)
 
 def extract_text_from_html(html_content):
-    if bs4 is None:
+    text = None
+    if html_engine() == 'lxml':
+        try:
+            root = lxml_etree.fromstring(html_content, lxml_etree.HTMLParser())
+            if root is not None:
+                text = ''.join(_HTML_SCRIPT_FREE_TEXT(root))
+        except (lxml_etree.LxmlError, ValueError):
+            text = None
+    if text is None and bs4 is None:
         return html_content
     try:
-        soup = bs4.BeautifulSoup(html_content, 'html.parser')
-        for script in soup(["script", "style"]):
-            script.decompose()
-        text = soup.get_text()
+        if text is None:
+            soup = bs4.BeautifulSoup(html_content, 'html.parser')
+            for script in soup(["script", "style"]):
+                script.decompose()
+            text = soup.get_text()
         lines = (line.strip() for line in text.splitlines())
         chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
         text = '\n'.join(chunk for chunk in chunks if chunk)
@@ -215,73 +263,1260 @@ def extract_text_from_html(html_content):
     except Exception as e:
         return html_content
 
+# ============ ضغط المخرجات أثناء الكتابة ============
+# None (نص خام) أو 'gzip' أو 'zstd'؛ تُضبط عبر set_output_compression (الخيار --compress)
+OUTPUT_COMPRESSION = None
+OUTPUT_COMPRESSION_LEVEL = None
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+_zstd = None
+
+
+def _load_zstd():
+    """وحدة zstd: compression.zstd في بايثون 3.14+، وإلا مكتبة zstandard الاختيارية"""
+    global _zstd
+    if _zstd is None:
+        try:
+            from compression import zstd as module
+        except ImportError:
+            module = check_and_import('zstandard', 'zstandard')
+        _zstd = module or False
+    return _zstd or None
+
+
+def set_output_compression(kind, level=None):
+    """تفعيل ضغط المخرجات النصية؛ يعيد الضغط المفعل فعلاً (gzip إن لم تتوفر zstd)"""
+    global OUTPUT_COMPRESSION, OUTPUT_COMPRESSION_LEVEL
+    if kind in (None, 'none'):
+        kind = None
+    elif kind == 'zstd' and _load_zstd() is None:
+        print("⚠️ zstd غير متوفرة، سيتم استخدام gzip بدلاً منها")
+        kind = 'gzip'
+    elif kind not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"نوع ضغط غير معروف: {kind}")
+    OUTPUT_COMPRESSION = kind
+    OUTPUT_COMPRESSION_LEVEL = level
+    return kind
+
+
+def output_name(path):
+    """مسار ملف المخرجات مع لاحقة الضغط المفعل (.gz أو .zst)"""
+    return path + COMPRESSION_SUFFIXES[OUTPUT_COMPRESSION] if OUTPUT_COMPRESSION else path
+
+
+def open_text_output(path, mode='w', newline=None):
+    """فتح ملف مخرجات نصي؛ البيانات تُضغط مرة واحدة أثناء الكتابة بدلاً من تمريرة ضغط لاحقة.
+    وضع الإلحاق 'a' يضيف إطاراً مضغوطاً جديداً، وكلا الصيغتين تقبل الإطارات المتتالية."""
+    if OUTPUT_COMPRESSION == 'gzip':
+        level = OUTPUT_COMPRESSION_LEVEL if OUTPUT_COMPRESSION_LEVEL is not None else 6
+        return gzip.open(path, mode + 't', encoding='utf-8', compresslevel=level, newline=newline)
+    if OUTPUT_COMPRESSION == 'zstd':
+        zstd = _load_zstd()
+        level = OUTPUT_COMPRESSION_LEVEL if OUTPUT_COMPRESSION_LEVEL is not None else 3
+        if hasattr(zstd, 'ZstdFile'):  # compression.zstd
+            return zstd.open(path, mode + 't', level=level, encoding='utf-8', newline=newline)
+        return zstd.open(path, mode + 't', cctx=zstd.ZstdCompressor(level=level), encoding='utf-8', newline=newline)
+    return open(path, mode, encoding='utf-8', newline=newline)
+
+
+# ============ قياس الأداء لكل مرحلة ============
+class StageMetrics:
+    """تجميع مقاييس كل معالج: الزمن الفعلي، زمن المعالج، البايتات الداخلة والخارجة، العناصر والأخطاء"""
+
+    FIELDS = ('calls', 'wall_seconds', 'cpu_seconds', 'input_bytes', 'output_bytes', 'items', 'errors')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}
+
+    def record(self, stage, **values):
+        with self._lock:
+            entry = self.stages.setdefault(stage, dict.fromkeys(self.FIELDS, 0))
+            entry['calls'] += values.pop('calls', 1)
+            for key, value in values.items():
+                entry[key] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {stage: dict(entry) for stage, entry in self.stages.items()}
+
+    def drain(self):
+        """إرجاع المقاييس الحالية وتصفيرها (لنقلها من عملية عاملة إلى العملية الرئيسية)"""
+        with self._lock:
+            stages, self.stages = self.stages, {}
+        return stages
+
+    def merge(self, stages):
+        for stage, entry in stages.items():
+            self.record(stage, **entry)
+
+    def write_json(self, path, **run_info):
+        report = dict(run_info)
+        report['stages'] = self.snapshot()
+        _atomic_write_text(path, json.dumps(report, ensure_ascii=False, indent=2))
+
+    def write_prometheus(self, path):
+        """كتابة ملف نصي بصيغة Prometheus يقرؤه node_exporter (textfile collector)"""
+        help_text = {
+            'calls': 'Number of handler invocations in the last run.',
+            'wall_seconds': 'Wall-clock seconds spent in the handler, excluding nested handlers.',
+            'cpu_seconds': 'CPU seconds spent in the handler thread, excluding nested handlers.',
+            'input_bytes': 'Bytes read from the handler inputs, excluding nested handlers.',
+            'output_bytes': 'Bytes written to the handler outputs, excluding nested handlers.',
+            'items': 'Items (rows, pages, members, files) produced by the handler.',
+            'errors': 'Handler calls that failed or produced no output.',
+        }
+        stages = self.snapshot()
+        lines = []
+        for field in self.FIELDS:
+            name = f"archive_tools_stage_{field}"
+            lines.append(f"# HELP {name} {help_text[field]}")
+            lines.append(f"# TYPE {name} gauge")
+            for stage in sorted(stages):
+                lines.append(f'{name}{{stage="{stage}"}} {stages[stage][field]}')
+        lines.append("# HELP archive_tools_last_run_timestamp_seconds Unix time of the last metrics export.")
+        lines.append("# TYPE archive_tools_last_run_timestamp_seconds gauge")
+        lines.append(f"archive_tools_last_run_timestamp_seconds {time.time():.3f}")
+        _atomic_write_text(path, "\n".join(lines) + "\n")
+
+
+METRICS = StageMetrics()
+
+
+def _atomic_write_text(path, text):
+    """كتابة عبر ملف مؤقت ثم إعادة تسمية حتى لا يقرأ أي طرف ملفاً نصف مكتوب"""
+    directory = os.path.dirname(os.path.abspath(path))
+    safe_makedirs(directory)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_metrics_')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _path_size(path):
+    """حجم ملف أو مجموع أحجام مجلد؛ صفر لأي مدخل ليس مساراً"""
+    if not isinstance(path, (str, os.PathLike)):
+        return 0
+    try:
+        if os.path.isfile(path):
+            return os.path.getsize(path)
+        total = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+    except OSError:
+        return 0
+
+
+# المراحل المفتوحة في الخيط الحالي: كل مرحلة متداخلة (عضو أرشيف، BLOB داخل قاعدة بيانات)
+# تُخصم من المرحلة التي تحتويها، فلا يُحسب الزمن أو البايتات مرتين عند جمع المراحل
+_STAGE_STACK = threading.local()
+EXCLUSIVE_FIELDS = ('wall_seconds', 'cpu_seconds', 'input_bytes', 'output_bytes')
+
+
+@contextlib.contextmanager
+def measure_stage(stage, input_path=None):
+    """قياس كتلة برمجية وتسجيلها في METRICS؛ يملأ المستدعي output_bytes و items.
+    الزمن والبايتات المسجلة حصرية: ما استهلكته المراحل المتداخلة يُسجل لها وحدها."""
+    sample = {'input_bytes': _path_size(input_path), 'output_bytes': 0, 'items': 0, 'errors': 0}
+    stack = getattr(_STAGE_STACK, 'open', None)
+    if stack is None:
+        stack = _STAGE_STACK.open = []
+    nested = dict.fromkeys(EXCLUSIVE_FIELDS, 0)
+    stack.append(nested)
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    try:
+        yield sample
+    except BaseException:
+        sample['errors'] += 1
+        raise
+    finally:
+        stack.pop()
+        sample['wall_seconds'] = time.perf_counter() - wall_start
+        sample['cpu_seconds'] = time.thread_time() - cpu_start
+        for field in EXCLUSIVE_FIELDS:
+            if stack:
+                stack[-1][field] += sample[field]
+            sample[field] = max(0, sample[field] - nested[field])
+        METRICS.record(stage, **sample)
+
+
+def instrumented(func):
+    """مزخرف للمعالجات التي تعيد (الملفات المنشأة، عدد العناصر، ...)"""
+    @functools.wraps(func)
+    def wrapper(source, *args, **kwargs):
+        with measure_stage(func.__name__, source) as sample:
+            result = func(source, *args, **kwargs)
+            files = result[0] or []
+            sample['items'] = result[1]
+            sample['output_bytes'] = sum(_path_size(p) for p in files)
+            # المعالجات تلتقط استثناءاتها وتعيد قائمة فارغة، فغياب أي مخرجات يُعد فشلاً
+            if not files and not result[1]:
+                sample['errors'] += 1
+            return result
+    return wrapper
+
+
+# ============ كشف الترميز ============
+CHARSET_SAMPLE_SIZE = 64 * 1024
+COPY_CHUNK_SIZE = 1024 * 1024
+# chardet يعطي النص العربي (windows-1256 / ISO-8859-6) ثقة بين 0.5 و 0.7 فقط
+CHARSET_MIN_CONFIDENCE = 0.3
+# الترميزات أحادية البايت (cp1256 ...) تفك أي بايتات دون خطأ، فلا يُخزن للملفات الشقيقة إلا كشف واثق
+CHARSET_CACHE_CONFIDENCE = 0.5
+
+
+def _decodes_cleanly(sample, encoding):
+    """هل تُفك العينة بهذا الترميز دون أخطاء (مع السماح بحرف مقطوع في نهايتها)"""
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+        return True
+    except (UnicodeDecodeError, LookupError):
+        return False
+
+
+class CharsetDetector:
+    """كشف الترميز من عينة محدودة من البايتات لمصدر واحد (أرشيف أو مجلد).
+    آخر ترميز مكتشف بثقة يُجرَّب أولاً على الملفات الشقيقة، فلا يُشغّل chardet إلا إذا لم تُفك به العينة."""
+
+    def __init__(self, source=None):
+        self.source = source
+        self.cached = None
+        self.detections = 0
+        self.cache_hits = 0
+
+    def detect(self, sample):
+        """الترميز المناسب للعينة، أو None إن تعذر الكشف"""
+        if _decodes_cleanly(sample, 'utf-8'):
+            return 'utf-8'
+        if self.cached and _decodes_cleanly(sample, self.cached):
+            self.cache_hits += 1
+            return self.cached
+        if chardet is None:
+            return None
+        self.detections += 1
+        result = chardet.detect(sample)
+        if not result.get('encoding') or (result.get('confidence') or 0) < CHARSET_MIN_CONFIDENCE:
+            return None
+        try:
+            encoding = codecs.lookup(result['encoding']).name
+        except LookupError:
+            return None
+        if encoding != self.cached:
+            source = os.path.basename(self.source) if self.source else ''
+            print(f"   🔤 ترميز مكتشف {source}: {encoding} (ثقة {result['confidence']:.2f})")
+        if result['confidence'] >= CHARSET_CACHE_CONFIDENCE:
+            self.cached = encoding
+        return encoding
+
+
+def decode_stream_to_file(stream, dest_path, detector, fallback='utf-8', skip_blank=False,
+                          translate_newlines=False):
+    """كتابة تدفق بايتات كنص بعد كشف ترميزه من العينة الأولى، على أجزاء دون تحميله كاملاً.
+    يعيد مسار الناتج (مع لاحقة الضغط)، أو None إن كان فارغاً (أو مسافات فقط مع skip_blank)."""
+    sample = stream.read(CHARSET_SAMPLE_SIZE)
+    if not sample:
+        return None
+    encoding = detector.detect(sample) or fallback
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    if translate_newlines:
+        decoder = io.IncrementalNewlineDecoder(decoder, translate=True)
+    dest_path = output_name(dest_path)
+    safe_makedirs(os.path.dirname(dest_path))
+    has_text = False
+    with open_text_output(dest_path) as out:
+        chunk = sample
+        while True:
+            text = decoder.decode(chunk, final=not chunk)
+            if text:
+                has_text = has_text or bool(text.strip())
+                out.write(text)
+            if not chunk:
+                break
+            chunk = stream.read(COPY_CHUNK_SIZE)
+    if skip_blank and not has_text:
+        os.remove(dest_path)
+        return None
+    return dest_path
+
+
+# ============ استنتاج أعمدة الطوابع الزمنية ============
+# يُحدد نوع كل عمود مرة واحدة (النوع المعلن، الاسم، وعينة من القيم) ثم يُحوَّل العمود دفعة واحدة؛
+# الأعمدة الأخرى (المعرفات، المبالغ، النصوص) تبقى كما هي.
+TIMESTAMP_SAMPLE_ROWS = 200
+_ID_COLUMN = re.compile(r'(?i:^(?:id|pk)$|_(?:id|pk)$)|[a-z]Id$')
+_TIME_COLUMN = re.compile(r'(?i)date|time|stamp|created|updated|modified|deleted|expire|(?:^|_)(?:at|on|ts)$|[a-z](?:At|On)$')
+# حدود الثواني منذ 1970: الأعمدة الموسومة بالاسم أو النوع تقبل من 1973، وغيرها من 2000 فقط؛ والحد الأعلى 2100
+EPOCH_HINTED_MIN = 1e8
+EPOCH_UNHINTED_MIN = 946684800
+EPOCH_MAX = 4102444800
+TIMESTAMP_HINTED_RATIO = 0.8
+_HOUR_LABELS = [str((hour + 11) % 12 + 1) for hour in range(24)]
+_MERIDIEMS = ["ص"] * 12 + ["م"] * 12
+
+
+def _format_datetime(value):
+    return (f"{value.day:02d}/{value.month:02d}/{value.year} {_HOUR_LABELS[value.hour]}:"
+            f"{value.minute:02d}:{value.second:02d} {_MERIDIEMS[value.hour]}")
+
+
+def _format_plain(value):
+    """عرض خلية عادية: NULL، بيانات ثنائية، أو القيمة نصاً"""
+    if value is None:
+        return "NULL"
+    if isinstance(value, (bytes, bytearray)):
+        return "<binary data>"
+    return str(value)
+
+
+def _parses_as(value, fmt):
+    try:
+        datetime.datetime.strptime(value, fmt)
+        return True
+    except ValueError:
+        return False
+
+
+def _infer_column_kind(name, declared, values):
+    """('epoch', 's'|'ms') أو ('text', صيغة أو None للمختلطة) أو None"""
+    if _ID_COLUMN.search(name):
+        return None
+    values = [v for v in values if v is not None and v != '']
+    if not values:
+        return None
+    hinted = bool(_TIME_COLUMN.search(name)) or any(t in declared.upper() for t in ('DATE', 'TIME'))
+    if all(isinstance(v, str) for v in values):
+        # الأعمدة الموسومة تتحمل قيماً شاذة قليلة تبقى كما هي عند التحويل
+        required = len(values) * (TIMESTAMP_HINTED_RATIO if hinted else 1.0)
+        if sum(v[:1].isdigit() for v in values) < required:
+            return None
+        for fmt in TIMESTAMP_FORMATS:
+            if sum(_parses_as(v, fmt) for v in values) >= required:
+                return ('text', fmt)
+        if sum(any(_parses_as(v, fmt) for fmt in TIMESTAMP_FORMATS) for v in values) >= required:
+            return ('text', None)
+        return None
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        low, high = min(values), max(values)
+        if hinted:
+            if EPOCH_HINTED_MIN <= low and high <= EPOCH_MAX:
+                return ('epoch', 's')
+            if EPOCH_HINTED_MIN * 1000 <= low and high <= EPOCH_MAX * 1000:
+                return ('epoch', 'ms')
+        elif all(isinstance(v, int) for v in values) and EPOCH_UNHINTED_MIN <= low and high <= EPOCH_MAX:
+            return ('epoch', 's')
+    return None
+
+
+def infer_timestamp_columns(conn, table_name, sample_size=TIMESTAMP_SAMPLE_ROWS):
+    """{فهرس العمود: النوع} لأعمدة الجدول التي تحمل طوابع زمنية، بالترتيب نفسه لـ SELECT *"""
+    table = _quote_ident(table_name)
+    declared = {row[1]: row[2] or '' for row in conn.execute(f"PRAGMA table_info({table})")}
+    cursor = conn.execute(f"SELECT * FROM {table} LIMIT {int(sample_size)}")
+    names = [description[0] for description in cursor.description]
+    sample = cursor.fetchall()
+    cursor.close()
+    kinds = {}
+    for index, name in enumerate(names):
+        kind = _infer_column_kind(name, declared.get(name, ''), [row[index] for row in sample])
+        if kind is not None:
+            kinds[index] = kind
+    return kinds
+
+
+def _format_timestamp_value(value, kind):
+    """المسار البديل دون pandas: تحويل قيمة واحدة بالنوع المستنتج مسبقاً للعمود"""
+    mode, detail = kind
+    try:
+        if mode == 'epoch' and isinstance(value, (int, float)):
+            return _format_datetime(datetime.datetime.fromtimestamp(value / 1000 if detail == 'ms' else value))
+        if mode == 'text' and isinstance(value, str):
+            if detail is not None:
+                return _format_datetime(datetime.datetime.strptime(value, detail))
+            for fmt in TIMESTAMP_FORMATS:
+                if _parses_as(value, fmt):
+                    return _format_datetime(datetime.datetime.strptime(value, fmt))
+    except (ValueError, OverflowError, OSError):
+        pass
+    return _format_plain(value)
+
+
+def format_timestamp_series(values, kind):
+    """تحويل عمود كامل (pandas Series) إلى نص ص/م بعمليات متجهة؛ ما لا يُحلل يبقى كما هو"""
+    mode, detail = kind
+    if mode == 'epoch':
+        from dateutil import tz  # تعتمد عليها pandas
+        parsed = pd.to_datetime(pd.to_numeric(values, errors='coerce'), unit=detail, utc=True, errors='coerce')
+        parsed = parsed.dt.tz_convert(tz.tzlocal()).dt.tz_localize(None)
+    else:
+        parsed = pd.to_datetime(values, format=detail or 'mixed', errors='coerce')
+    valid = parsed.notna()
+    # مكونات التاريخ تُستخرج كمصفوفات أعداد دفعة واحدة؛ strftime في pandas يمر على كل عنصر ببطء
+    parts = [getattr(parsed.dt, unit).fillna(0).astype(int).tolist()
+             for unit in ('day', 'month', 'year', 'hour', 'minute', 'second')]
+    result = pd.Series([f"{d:02d}/{m:02d}/{y} {_HOUR_LABELS[h]}:{mi:02d}:{sec:02d} {_MERIDIEMS[h]}"
+                        for d, m, y, h, mi, sec in zip(*parts)], index=values.index, dtype=object)
+    if not valid.all():
+        result[~valid] = values[~valid].map(lambda v: "NULL" if pd.isna(v) else _format_plain(v))
+    return result
+
+
+def format_columns(columns, timestamp_kinds):
+    """تنسيق دفعة معروضة أعمدةً: أعمدة الطوابع الزمنية تُحوَّل دفعة واحدة والبقية تُعرض كما هي"""
+    formatted = []
+    for index, values in enumerate(columns):
+        kind = timestamp_kinds.get(index)
+        if kind is None:
+            formatted.append([_format_plain(v) for v in values])
+        elif pd is not None:
+            formatted.append(format_timestamp_series(pd.Series(values, dtype=object), kind).tolist())
+        else:
+            formatted.append([_format_timestamp_value(v, kind) for v in values])
+    return formatted
+
+
 # ============ دوال معالجة قواعد البيانات ============
-def export_db_to_excel(db_path, output_excel):
-    if pd is None:
-        print(" ❌ pandas غير مثبتة. لا يمكن التصدير إلى Excel.")
-        return None, 0
+DB_FETCH_BATCH = 10000
+# عدد العمليات لتصدير جداول قاعدة واحدة بالتوازي (1 = تسلسلي)؛ يُضبط عبر --db-workers
+DB_EXPORT_WORKERS = 1
+# الجداول التي يتجاوز تقديرها هذا العدد من الصفوف تُقسم إلى مديات rowid تُصدّر بالتوازي (0 = بلا تقسيم)؛ --split-rows
+DB_SPLIT_ROWS = 1000000
+# صيغة مخرجات الجداول (قواعد البيانات وأوراق Excel): 'tsv' أو 'parquet' أو 'arrow' (يتطلب pyarrow)؛ --table-format
+TABLE_OUTPUT_FORMAT = 'tsv'
+# التصدير التزايدي: None أو 'append' (إلحاق بملف الجدول) أو 'delta' (ملف لكل تشغيل)؛ تُضبط عبر --incremental
+DB_INCREMENTAL = None
+# عمود updated_at اختياري بدلاً من rowid (--watermark-column)، ومسار ملف الحالة (--db-state)
+DB_WATERMARK_COLUMN = None
+DB_STATE_PATH = None
+# كتابة BLOB إلى ملفات جانبية تمر على المعالجات بدلاً من "<binary data>"؛ تُضبط عبر --extract-blobs
+DB_EXTRACT_BLOBS = False
+# أخذ عينة من كل جدول بدلاً من تصديره كاملاً: عدد الصفوف، الطريقة ('uniform' أو 'stratified') والبذرة؛ --sample
+DB_SAMPLE_ROWS = None
+DB_SAMPLE_MODE = 'stratified'
+DB_SAMPLE_SEED = 0
+_pyarrow = None
+
+
+def _quote_ident(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def export_table_tsv(conn, table_name, out_path, batch_size=DB_FETCH_BATCH, condition='', params=(), append=False,
+                     blob_refs=False, header=True):
+    """تصدير جدول إلى TSV على دفعات fetchmany عبر csv.writer؛ الذاكرة ثابتة مهما كان حجم الجدول.
+    تحويل NULL والبيانات الثنائية يتم داخل SQLite فتُكتب الصفوف دون حلقة بايثون لكل قيمة.
+    الحقول التي تحتوي tab أو سطراً جديداً أو علامة تنصيص تُحاط بعلامات تنصيص. يعيد عدد الصفوف.
+    condition/params تقيّد الصفوف، و append تلحقها بملف موجود دون ترويسة (header=False لأجزاء المدى التالية).
+    blob_refs تكتب معرّف الملف الجانبي لكل BLOB (انظر export_table_blobs) بدلاً من <binary data>."""
+    cursor = conn.cursor()
+    cursor.arraysize = batch_size
+    cursor.execute(f"SELECT * FROM {_quote_ident(table_name)} LIMIT 0")
+    col_names = [description[0] for description in cursor.description]
+    def blob_text(name):
+        if not blob_refs:
+            return "'<binary data>'"
+        prefix = _blob_ref_prefix(table_name, name).replace("'", "''")
+        return f"'<blob:{prefix}' || rowid || '>'"
+
+    columns = ", ".join(
+        f"CASE WHEN {c} IS NULL THEN 'NULL' WHEN typeof({c}) = 'blob' THEN {blob_text(name)} ELSE {c} END"
+        for name, c in zip(col_names, map(_quote_ident, col_names)))
+    where = f" WHERE {condition}" if condition else ''
+    cursor.execute(f"SELECT {columns} FROM {_quote_ident(table_name)}{where}", params)
+    rows_written = 0
+    with open_text_output(out_path, 'a' if append else 'w', newline='') as f:
+        writer = csv.writer(f, delimiter='\t', lineterminator='\n')
+        if header and not append:
+            writer.writerow(col_names)
+        while True:
+            rows = cursor.fetchmany()
+            if not rows:
+                break
+            writer.writerows(rows)
+            rows_written += len(rows)
+    cursor.close()
+    return rows_written
+
+
+def _format_rate(rows, seconds):
+    return f"{rows / seconds:,.0f} صف/ث" if seconds > 0 else "-"
+
+
+def sqlite_readonly_uri(db_path):
+    """URI للقراءة فقط؛ immutable=1 يلغي الأقفال وفحص التغييرات، إلا إذا وُجد ملف WAL لم يُدمج بعد"""
+    uri = pathlib.Path(os.path.abspath(db_path)).as_uri() + '?mode=ro'
+    if not os.path.exists(db_path + '-wal'):
+        uri += '&immutable=1'
+    return uri
+
+
+def estimate_table_rows(conn, table_name):
+    """تقدير سريع لعدد الصفوف: sqlite_stat1 إن وجدت، ثم max(rowid)، ثم COUNT(*)"""
     try:
-        conn = sqlite3.connect(db_path)
+        row = conn.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = ? LIMIT 1", (table_name,)).fetchone()
+        if row and row[0]:
+            return int(row[0].split()[0])
+    except (sqlite3.Error, ValueError):
+        pass
+    for query in (f"SELECT max(rowid) FROM {_quote_ident(table_name)}",
+                  f"SELECT COUNT(*) FROM {_quote_ident(table_name)}"):
+        try:
+            return conn.execute(query).fetchone()[0] or 0
+        except sqlite3.Error:
+            continue
+    return 0
+
+
+def _export_table_job(db_path, table_name, out_path, compression, compression_level, blob_refs=False,
+                      condition='', params=(), header=True, fmt=None):
+    """تُنفذ في عملية عاملة: اتصال مستقل للقراءة فقط وتصدير جدول واحد أو مدى منه"""
+    global OUTPUT_COMPRESSION, OUTPUT_COMPRESSION_LEVEL
+    OUTPUT_COMPRESSION, OUTPUT_COMPRESSION_LEVEL = compression, compression_level
+    started = time.perf_counter()
+    conn = sqlite3.connect(sqlite_readonly_uri(db_path), uri=True)
+    try:
+        if fmt:
+            rows = export_table_columnar(conn, table_name, out_path, fmt, condition=condition, params=params)
+        else:
+            rows = export_table_tsv(conn, table_name, out_path, blob_refs=blob_refs,
+                                    condition=condition, params=params, header=header)
+    finally:
+        conn.close()
+    return rows, time.perf_counter() - started
+
+
+def rowid_ranges(conn, table_name, parts):
+    """تقسيم مدى rowid إلى parts مدى متساوي العرض؛ يعيد [(الشرط، المعاملات، الوصف)] بالترتيب"""
+    table = _quote_ident(table_name)
+    low = conn.execute(f"SELECT min(rowid) FROM {table}").fetchone()[0]
+    high = conn.execute(f"SELECT max(rowid) FROM {table}").fetchone()[0]
+    if low is None or high - low + 1 < parts:
+        return []
+    bounds = [low + (high - low + 1) * i // parts for i in range(parts)] + [high + 1]
+    return [("rowid >= ? AND rowid < ?", (start, end), f"rowid {start:,}–{end - 1:,}")
+            for start, end in zip(bounds, bounds[1:])]
+
+
+def concat_part_files(out_path, part_paths):
+    """دمج ملفات الأجزاء بترتيبها في الملف النهائي: الأول يُعاد تسميته والبقية تُلحق داخل النواة.
+    إطارات gzip/zstd المتتالية ملف صالح، فالمخرجات المضغوطة تُدمج دون فك."""
+    os.replace(part_paths[0], out_path)
+    # 'r+b' لا 'ab': النواة ترفض copy_file_range على واصف مفتوح بـ O_APPEND (EBADF)،
+    # فالإزاحة في الملف الهدف تُمرر صراحة
+    with open(out_path, 'r+b') as dst:
+        offset = os.fstat(dst.fileno()).st_size
+        for part_path in part_paths[1:]:
+            with open(part_path, 'rb') as src:
+                size = os.fstat(src.fileno()).st_size
+                copied = 0
+                if hasattr(os, 'copy_file_range'):
+                    try:
+                        while copied < size:
+                            n = os.copy_file_range(src.fileno(), dst.fileno(), size - copied,
+                                                   copied, offset + copied)
+                            if n == 0:
+                                break
+                            copied += n
+                    except OSError:
+                        pass
+                if copied < size:
+                    src.seek(copied)
+                    dst.seek(offset + copied)
+                    shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+                    dst.flush()
+                offset += size
+            os.remove(part_path)
+
+
+def export_tables_parallel(db_path, conn, table_names, output_dir, workers, fmt=None):
+    """تصدير الجداول في عمليات متوازية، الأكبر أولاً؛ يعيد [(الجدول، المسار، الصفوف، الزمن)] بترتيب الجداول.
+    الجدول الأكبر من DB_SPLIT_ROWS يُقسم إلى مديات rowid تُكتب في ملفات أجزاء ثم تُدمج بترتيبها،
+    فيبقى الناتج مطابقاً للتصدير التسلسلي. ملفات Parquet/Arrow (fmt) لا تُدمج بالإلحاق فلا تُقسم."""
+    sizes = {name: estimate_table_rows(conn, name) for name in table_names}
+    jobs = []  # (الحجم التقديري، الجدول، رقم الجزء أو None، مسار الكتابة، الشرط، المعاملات، وصف المدى)
+    parts = {}
+    out_paths = {}
+    for name in table_names:
+        out_paths[name] = table_output_path(output_dir, name, fmt)
+        ranges = []
+        if not fmt and DB_SPLIT_ROWS and sizes[name] > DB_SPLIT_ROWS and _has_rowid(conn, name):
+            count = min(-(-sizes[name] // DB_SPLIT_ROWS), workers * 4)
+            ranges = rowid_ranges(conn, name, max(2, count))
+        if not ranges:
+            jobs.append((sizes[name], name, None, out_paths[name], '', (), None))
+            continue
+        parts[name] = [f"{out_paths[name]}.part{index:04d}" for index in range(len(ranges))]
+        print(f" ✂️ جدول {name}: ~{sizes[name]:,} صف مقسم إلى {len(ranges)} مدى")
+        for index, (condition, params, label) in enumerate(ranges):
+            jobs.append((sizes[name] / len(ranges), name, index, parts[name][index], condition, params, label))
+    jobs.sort(key=lambda job: -job[0])
+
+    results = {}
+    remaining = {name: len(paths) for name, paths in parts.items()}
+    ctx = multiprocessing.get_context('fork') if hasattr(os, 'fork') else None
+    with concurrent.futures.ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=ctx) as pool:
+        futures = {}
+        for _, name, index, path, condition, params, label in jobs:
+            future = pool.submit(_export_table_job, db_path, name, path, OUTPUT_COMPRESSION, OUTPUT_COMPRESSION_LEVEL,
+                                 blob_refs_enabled(conn, name), condition, params, header=not index, fmt=fmt)
+            futures[future] = (name, index, label)
+        for future in concurrent.futures.as_completed(futures):
+            name, index, label = futures[future]
+            rows, elapsed = future.result()
+            if index is None:
+                results[name] = (name, out_paths[name], rows, elapsed)
+                print(f" ✓ جدول {name}: {rows} صف ({elapsed:.2f} ث، {_format_rate(rows, elapsed)})")
+                continue
+            _, _, total, busy = results.get(name, (name, out_paths[name], 0, 0.0))
+            results[name] = (name, out_paths[name], total + rows, busy + elapsed)
+            remaining[name] -= 1
+            done = len(parts[name]) - remaining[name]
+            print(f"   ◦ {name} [{done}/{len(parts[name])}] {label}: {rows} صف ({elapsed:.2f} ث)")
+    for name, part_paths in parts.items():
+        concat_part_files(out_paths[name], part_paths)
+        _, _, rows, busy = results[name]
+        print(f" ✓ جدول {name}: {rows} صف من {len(part_paths)} مدى (زمن العمال {busy:.2f} ث)")
+    return [results[name] for name in table_names]
+
+
+# ============ أخذ عينات من الجداول الكبيرة ============
+def sample_rowids(conn, table_name, size, mode='stratified', seed=0):
+    """اختيار حتى size من rowid بقفزات على مفتاح الجدول (rowid >= نقطة LIMIT 1)، فالكلفة تتبع حجم العينة
+    لا حجم الجدول. uniform: نقاط عشوائية على المدى كله؛ stratified: نقطة عشوائية في كل شريحة متساوية منه.
+    الصفوف التي تلي فجوات كبيرة في rowid أوفر حظاً قليلاً."""
+    table = _quote_ident(table_name)
+    # min و max في استعلامين: معاً في استعلام واحد يمسحان الجدول كله بدلاً من قفزة على الفهرس
+    low = conn.execute(f"SELECT min(rowid) FROM {table}").fetchone()[0]
+    high = conn.execute(f"SELECT max(rowid) FROM {table}").fetchone()[0]
+    if low is None:
+        return []
+    rng = random.Random(f"{seed}:{table_name}")
+    # كل النقاط في استعلام واحد: بحث فرعي على المفتاح لكل نقطة من مصفوفة JSON
+    seek = (f"SELECT (SELECT rowid FROM {table} WHERE rowid >= p.value ORDER BY rowid LIMIT 1) "
+            f"FROM json_each(?) AS p")
+    span = high - low + 1
+    chosen = set()
+    # النقاط التي تقع على الصف نفسه تُعوَّض في جولات لاحقة
+    for _ in range(3):
+        need = size - len(chosen)
+        if need <= 0:
+            break
+        if mode == 'stratified':
+            width = span / need
+            points = [low + int(width * (i + rng.random())) for i in range(need)]
+        else:
+            points = [rng.randint(low, high) for _ in range(need)]
+        chosen.update(row[0] for row in conn.execute(seek, (json.dumps(points),)) if row[0] is not None)
+    return sorted(chosen)
+
+
+def sample_primary_keys(conn, table_name, total, size, mode='stratified', seed=0):
+    """جداول WITHOUT ROWID: اختيار مواقع الصفوف بمولّد البذرة نفسه (شريحة لكل نقطة أو نقاط موحدة)
+    ثم قراءة مفاتيحها في مسح واحد على المفتاح الأساسي بترتيبه. يعيد (أعمدة المفتاح، [قيم المفتاح])."""
+    table = _quote_ident(table_name)
+    pk_columns = [row[1] for row in sorted(
+        (row for row in conn.execute(f"PRAGMA table_info({table})") if row[5]), key=lambda row: row[5])]
+    rng = random.Random(f"{seed}:{table_name}")
+    if mode == 'stratified':
+        width = total / size
+        positions = [int(width * (i + rng.random())) for i in range(size)]
+    else:
+        positions = sorted(rng.sample(range(total), size))
+    columns = ", ".join(map(_quote_ident, pk_columns))
+    cursor = conn.cursor()
+    cursor.arraysize = DB_FETCH_BATCH
+    cursor.execute(f"SELECT {columns} FROM {table} ORDER BY {columns}")
+    keys = []
+    wanted = iter(positions)
+    target = next(wanted, None)
+    for index, key in enumerate(cursor):
+        if target is None:
+            break
+        if index == target:
+            keys.append(list(key))
+            target = next(wanted, None)
+    cursor.close()
+    return pk_columns, keys
+
+
+def table_sample(conn, table_name):
+    """شرط SQL يقصر التصدير على عينة الجدول؛ يعيد (الشرط، المعاملات، ملاحظة) أو ('', (), None) دون عينة"""
+    if not DB_SAMPLE_ROWS:
+        return '', (), None
+    total = estimate_table_rows(conn, table_name)
+    if total <= DB_SAMPLE_ROWS:
+        return '', (), None
+    if _has_rowid(conn, table_name):
+        rowids = sample_rowids(conn, table_name, DB_SAMPLE_ROWS, DB_SAMPLE_MODE, DB_SAMPLE_SEED)
+        return ("rowid IN (SELECT value FROM json_each(?))", (json.dumps(rowids),),
+                f"عينة {DB_SAMPLE_MODE}: {len(rowids)} من ~{total:,} صف")
+    # جداول WITHOUT ROWID: لا قفز بالمفتاح، فالمفاتيح المختارة تُقرأ في مسح واحد وتُقيد بها الصفوف
+    pk_columns, keys = sample_primary_keys(conn, table_name, total, DB_SAMPLE_ROWS, DB_SAMPLE_MODE, DB_SAMPLE_SEED)
+    if any(isinstance(value, bytes) for key in keys for value in key):
+        print(f" ⚠️ جدول {table_name}: مفتاح أساسي ثنائي لا يمكن أخذ عينة منه، سيُصدّر كاملاً")
+        return '', (), None
+    columns = ", ".join(map(_quote_ident, pk_columns))
+    values = ", ".join(f"json_extract(value, '$[{i}]')" for i in range(len(pk_columns)))
+    return (f"({columns}) IN (SELECT {values} FROM json_each(?))", (json.dumps(keys),),
+            f"عينة {DB_SAMPLE_MODE} (WITHOUT ROWID): {len(keys)} من ~{total:,} صف")
+
+
+# ============ استخراج BLOB إلى ملفات جانبية ============
+BLOB_DIR_SUFFIX = '_blobs'
+BLOB_SIGNATURES = (
+    (b'%PDF', '.pdf'),
+    (b'PK\x03\x04', '.zip'),
+    (b'\x1f\x8b', '.gz'),
+    (b'Rar!\x1a\x07', '.rar'),
+    (b'SQLite format 3\x00', '.sqlite'),
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'GIF8', '.gif'),
+    (b'{\\rtf', '.rtf'),
+)
+
+
+def sniff_blob_extension(head):
+    """تحديد نوع المحتوى من البايتات الأولى (التوقيع السحري)، ثم HTML أو نص UTF-8، وإلا .bin"""
+    for magic, ext in BLOB_SIGNATURES:
+        if head.startswith(magic):
+            return ext
+    if head[257:262] == b'ustar':
+        return '.tar'
+    if b'\x00' not in head and _decodes_cleanly(head, 'utf-8'):
+        start = head[:1024].lstrip().lower()
+        return '.html' if start.startswith((b'<!doctype html', b'<html')) else '.txt'
+    return '.bin'
+
+
+def _refine_zip_extension(path):
+    """ملفات Office الحديثة أرشيفات ZIP: التمييز بينها من أسماء الأعضاء"""
+    try:
+        with zipfile.ZipFile(path) as zf:
+            names = set(zf.namelist())
+    except zipfile.BadZipFile:
+        return path
+    ext = '.docx' if 'word/document.xml' in names else '.xlsx' if 'xl/workbook.xml' in names else None
+    if ext is None:
+        return path
+    new_path = os.path.splitext(path)[0] + ext
+    os.replace(path, new_path)
+    return new_path
+
+
+def _has_rowid(conn, table_name):
+    try:
+        conn.execute(f"SELECT rowid FROM {_quote_ident(table_name)} LIMIT 0")
+        return True
+    except sqlite3.Error:
+        return False
+
+
+def blob_refs_enabled(conn, table_name):
+    """الإشارة إلى BLOB بمعرّفه تتطلب blobopen (بايثون 3.11+) وجدولاً له rowid"""
+    return DB_EXTRACT_BLOBS and hasattr(conn, 'blobopen') and _has_rowid(conn, table_name)
+
+
+def _blob_ref_prefix(table_name, column):
+    safe_table = re.sub(r'[\\/*?:"<>|]', '_', table_name)
+    safe_column = re.sub(r'[\\/*?:"<>|]', '_', column)
+    return f"{safe_table}{BLOB_DIR_SUFFIX}/{safe_column}-"
+
+
+def blob_columns(conn, table_name, col_names):
+    """الأعمدة التي تحتوي BLOB فعلاً، بمسح واحد؛ typeof لا يحمّل محتوى القيم الكبيرة"""
+    checks = ", ".join(f"max(typeof({_quote_ident(c)}) = 'blob')" for c in col_names)
+    row = conn.execute(f"SELECT {checks} FROM {_quote_ident(table_name)}").fetchone()
+    return [c for c, flag in zip(col_names, row) if flag]
+
+
+def write_blob_sidecar(conn, table_name, column, rowid, base_path):
+    """نسخ BLOB واحد على دفعات عبر blobopen دون تحميله كاملاً في الذاكرة؛ يعيد مسار الملف"""
+    with conn.blobopen(table_name, column, rowid, readonly=True) as blob:
+        head = blob.read(COPY_CHUNK_SIZE)
+        path = base_path + sniff_blob_extension(head)
+        with open(path, 'wb') as f:
+            f.write(head)
+            while True:
+                chunk = blob.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                f.write(chunk)
+    if path.endswith('.zip'):
+        path = _refine_zip_extension(path)
+    return path
+
+
+def export_table_blobs(conn, table_name, output_dir, condition='', params=()):
+    """كتابة كل BLOB في الجدول إلى <الجدول>_blobs/<العمود>-<rowid>.<الامتداد> ثم تمريره إلى معالج نوعه.
+    المعرّف نفسه هو ما يُكتب في خلية TSV. يعيد (الملفات النصية الناتجة، عدد BLOB)."""
+    table = _quote_ident(table_name)
+    cursor = conn.execute(f"SELECT * FROM {table} LIMIT 0")
+    col_names = [description[0] for description in cursor.description]
+    cursor.close()
+    files_created = []
+    count = 0
+    for column in blob_columns(conn, table_name, col_names):
+        prefix = _blob_ref_prefix(table_name, column)
+        safe_makedirs(os.path.join(output_dir, os.path.dirname(prefix)))
+        where = f"typeof({_quote_ident(column)}) = 'blob'" + (f" AND ({condition})" if condition else '')
         cursor = conn.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%';")
-        tables = [row[0] for row in cursor.fetchall()]
-        cursor.close()
-        if not tables:
-            conn.close()
-            return None, 0
-        with pd.ExcelWriter(output_excel, engine='openpyxl') as writer:
-            total_rows = 0
-            for table in tables:
+        cursor.arraysize = DB_FETCH_BATCH
+        cursor.execute(f"SELECT rowid FROM {table} WHERE {where}", params)
+        while True:
+            rowids = cursor.fetchmany()
+            if not rowids:
+                break
+            for (rowid,) in rowids:
+                blob_id = f"{prefix}{rowid}"
+                path = write_blob_sidecar(conn, table_name, column, rowid, os.path.join(output_dir, blob_id))
+                count += 1
                 try:
-                    df = pd.read_sql_query(f"SELECT * FROM `{table}`", conn)
-                    for col in df.columns:
-                        df[col] = df[col].apply(convert_timestamp)
-                    sheet_name = table[:31]
-                    df.to_excel(writer, sheet_name=sheet_name, index=False)
-                    total_rows += len(df)
-                    print(f" ✓ جدول '{table}': {len(df)} صف")
+                    handled = None
+                    if is_handled_file(path):
+                        target_dir = os.path.splitext(path)[0] + "_extracted"
+                        safe_makedirs(target_dir)
+                        handled = extract_file_with_handler(path, target_dir)
                 except Exception as e:
-                    print(f" ⚠️ خطأ في تصدير '{table}': {str(e)}")
-        conn.close()
-        return output_excel, total_rows
-    except Exception as e:
-        print(f" ❌ خطأ في التصدير: {str(e)}")
-        if 'conn' in locals():
-            conn.close()
-        return None, 0
+                    print(f" ⚠️ خطأ في معالجة {blob_id}: {str(e)}")
+                    continue
+                if handled is not None:
+                    files_created.extend(handled[0])
+                elif path.endswith('.txt'):
+                    files_created.append(path)
+        cursor.close()
+    if count:
+        print(f" 📎 جدول {table_name}: {count} BLOB في {os.path.dirname(prefix)}/")
+    return files_created, count
+
+
+# ============ التصدير التزايدي (العلامات المائية) ============
+DB_STATE_NAME = '.db_export_state.json'
+
+
+def load_export_state(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_export_state(path, state):
+    """كتابة ملف الحالة ذرياً حتى لا يُترك نصف مكتوب عند الانقطاع"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _watermark_key(conn, table_name, col_names):
+    """عمود العلامة المائية: العمود المحدد إن وُجد في الجدول، وإلا rowid؛ None لجداول WITHOUT ROWID"""
+    if DB_WATERMARK_COLUMN and DB_WATERMARK_COLUMN in col_names:
+        return DB_WATERMARK_COLUMN
+    return 'rowid' if _has_rowid(conn, table_name) else None
+
+
+def export_table_incremental(conn, table_name, output_dir, entry, mode):
+    """تصدير الصفوف الأحدث من العلامة المحفوظة فقط، إلحاقاً بملف الجدول أو كملف دلتا مستقل.
+    يعيد (المسار أو None إن لم توجد صفوف جديدة، عدد الصفوف، سجل الحالة الجديد، ملفات BLOB)."""
+    table = _quote_ident(table_name)
+    cursor = conn.execute(f"SELECT * FROM {table} LIMIT 0")
+    col_names = [description[0] for description in cursor.description]
+    cursor.close()
+    safe_name = re.sub(r'[\\/*?:"<>|]', '_', table_name)
+    base_path = output_name(os.path.join(output_dir, f"{safe_name}.tsv"))
+    key = _watermark_key(conn, table_name, col_names)
+    if key is None:
+        print(f" ⚠️ جدول {table_name} بلا rowid ولا عمود علامة: تصدير كامل")
+        return base_path, export_table_tsv(conn, table_name, base_path), {}, []
+    key_sql = 'rowid' if key == 'rowid' else _quote_ident(key)
+    # الحد الأعلى يُثبت قبل القراءة: ما يُضاف أثناء التصدير يدخل في التشغيل التالي
+    high = conn.execute(f"SELECT max({key_sql}) FROM {table}").fetchone()[0]
+
+    previous = entry if entry.get('column') == key and entry.get('columns') == col_names else {}
+    if entry and not previous:
+        print(f" ⚠️ تغيّر مخطط {table_name} أو عمود العلامة: إعادة تصدير كامل")
+    low = previous.get('watermark')
+    if low is not None and high is not None and high < low:
+        print(f" ⚠️ تراجعت العلامة المائية لـ {table_name} (أعيد بناء القاعدة؟): إعادة تصدير كامل")
+        previous, low = {}, None
+    if low is not None and mode == 'append' and not os.path.exists(base_path):
+        print(f" ⚠️ ملف {os.path.basename(base_path)} غير موجود: إعادة تصدير كامل")
+        previous, low = {}, None
+
+    new_entry = {'column': key, 'columns': col_names, 'watermark': high if high is not None else low,
+                 'shards': previous.get('shards', 0), 'rows': previous.get('rows', 0)}
+    append = False
+    if low is None:
+        out_path = base_path
+        condition, params = (f"{key_sql} <= ? OR {key_sql} IS NULL", (high,)) if high is not None else ('', ())
+    elif high is None or high == low:
+        return None, 0, new_entry, []
+    else:
+        condition, params = f"{key_sql} > ? AND {key_sql} <= ?", (low, high)
+        if mode == 'append':
+            out_path, append = base_path, True
+        else:
+            new_entry['shards'] += 1
+            out_path = output_name(os.path.join(output_dir, f"{safe_name}.delta-{new_entry['shards']:04d}.tsv"))
+    blob_refs = blob_refs_enabled(conn, table_name)
+    rows = export_table_tsv(conn, table_name, out_path, condition=condition, params=params, append=append,
+                            blob_refs=blob_refs)
+    new_entry['rows'] += rows
+    blob_files = export_table_blobs(conn, table_name, output_dir, condition, params)[0] if blob_refs else []
+    return out_path, rows, new_entry, blob_files
+
+
+def export_tables_incremental(db_path, conn, table_names, output_dir, state_key=None):
+    """التصدير التزايدي لكل الجداول؛ الحالة تُحفظ بعد كل جدول. يعيد [(المسار، الصفوف)] للملفات المكتوبة.
+    state_key يعرّف القاعدة في ملف الحالة (الأرشيف!العضو لأعضاء الأرشيفات)، وإلا مسارها المطلق."""
+    state_path = DB_STATE_PATH or os.path.join(output_dir, DB_STATE_NAME)
+    state = load_export_state(state_path)
+    db_state = state.setdefault('databases', {}).setdefault(state_key or os.path.abspath(db_path), {'tables': {}})
+    written = []
+    for table_name in table_names:
+        table_started = time.perf_counter()
+        out_path, rows, entry, blob_files = export_table_incremental(conn, table_name, output_dir,
+                                                                     db_state['tables'].get(table_name, {}),
+                                                                     DB_INCREMENTAL)
+        elapsed = time.perf_counter() - table_started
+        db_state['tables'][table_name] = entry
+        db_state['updated_at'] = datetime.datetime.now().isoformat(timespec='seconds')
+        save_export_state(state_path, state)
+        if out_path is None:
+            print(f" ⏭️ جدول {table_name}: لا صفوف جديدة (العلامة {entry['watermark']})")
+            continue
+        written.append((out_path, rows))
+        written.extend((path, 0) for path in blob_files)
+        print(f" ✓ جدول {table_name}: {rows} صف جديد → {os.path.basename(out_path)} "
+              f"({elapsed:.2f} ث، {_format_rate(rows, elapsed)})")
+    return written
+
+
+# ============ مخرجات عمودية (Parquet / Arrow IPC) ============
+# تُكتب دفعة سجلات لكل دفعة fetchmany (أو دفعة صفوف من الورقة)، فلا يُحمّل الجدول كاملاً.
+# النصوص ترميز قاموسي، و NULL قيمة فارغة حقيقية، والأرقام والتواريخ بأنواعها؛ ملفات .arrow
+# غير مضغوطة لتُقرأ بـ memory_map دون نسخ.
+COLUMNAR_SUFFIXES = {'parquet': '.parquet', 'arrow': '.arrow'}
+# عمود نصي تتجاوز نسبة قيمه المختلفة هذا الحد في الدفعة الأولى يُكتب نصاً عادياً؛ القاموس لا يوفر فيه شيئاً
+DICTIONARY_MAX_RATIO = 0.5
+_SQLITE_ARROW_TYPES = {
+    frozenset({'integer'}): 'int64',
+    frozenset({'real'}): 'float64',
+    frozenset({'integer', 'real'}): 'float64',
+    frozenset({'text'}): 'dictionary',
+    frozenset({'blob'}): 'binary',
+}
+
+
+def _load_pyarrow():
+    global _pyarrow
+    if _pyarrow is None:
+        module = check_and_import('pyarrow', 'pyarrow')
+        if module is not None:
+            import pyarrow.parquet  # noqa: F401 (تحميل الوحدات الفرعية)
+            import pyarrow.ipc  # noqa: F401
+            import pyarrow.compute  # noqa: F401
+        _pyarrow = module or False
+    return _pyarrow or None
+
+
+def columnar_format():
+    """الصيغة العمودية المطلوبة (--table-format) إن كانت pyarrow متاحة، وإلا None أي TSV"""
+    if TABLE_OUTPUT_FORMAT == 'tsv':
+        return None
+    if _load_pyarrow() is None:
+        print(f" ⚠️ pyarrow غير مثبتة، سيتم الكتابة بصيغة TSV بدلاً من {TABLE_OUTPUT_FORMAT}")
+        return None
+    return TABLE_OUTPUT_FORMAT
+
+
+def _arrow_type(pa, name):
+    if name == 'dictionary':
+        return pa.dictionary(pa.int32(), pa.string())
+    return getattr(pa, name)()
+
+
+def _value_kind(value):
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    if isinstance(value, bool):
+        return 'bool_'
+    if isinstance(value, int):
+        return 'int64'
+    if isinstance(value, float):
+        return 'float64'
+    if isinstance(value, str):
+        return 'dictionary'
+    if isinstance(value, (bytes, bytearray)):
+        return 'binary'
+    if isinstance(value, datetime.datetime):
+        return 'timestamp'
+    return 'string'
+
+
+def infer_arrow_types(pa, columns):
+    """نوع كل عمود من قيم الدفعة الأولى: نوع واحد يُحفظ كما هو، int مع float يصبح float64، وغير ذلك نص"""
+    types = []
+    for values in columns:
+        kinds = {_value_kind(v) for v in values} - {None}
+        if kinds == {'int64', 'float64'}:
+            kinds = {'float64'}
+        kind = kinds.pop() if len(kinds) == 1 else 'dictionary' if not kinds else 'string'
+        types.append(pa.timestamp('us') if kind == 'timestamp' else _arrow_type(pa, kind))
+    return types
+
+
+def sqlite_arrow_types(pa, conn, table_name, col_names, condition='', params=()):
+    """أنواع Arrow لأعمدة الجدول من أنواع القيم المخزنة فعلاً (typeof في مسح واحد لا يحمّل المحتوى)"""
+    checks = ", ".join(f"max(typeof({_quote_ident(c)}) = '{kind}')"
+                       for c in col_names for kind in ('integer', 'real', 'text', 'blob'))
+    where = f" WHERE {condition}" if condition else ''
+    flags = conn.execute(f"SELECT {checks} FROM {_quote_ident(table_name)}{where}", params).fetchone()
+    types = []
+    for index in range(len(col_names)):
+        present = frozenset(kind for kind, flag in zip(('integer', 'real', 'text', 'blob'), flags[index * 4:index * 4 + 4])
+                            if flag)
+        types.append(_arrow_type(pa, _SQLITE_ARROW_TYPES.get(present, 'string' if present else 'dictionary')))
+    return types
+
+
+def _columnar_text(value):
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    if isinstance(value, (bytes, bytearray)):
+        return "<binary data>"
+    return str(value)
+
+
+class ColumnarWriter:
+    """كتابة دفعات سجلات إلى Parquet أو Arrow IPC. الأنواع تُعطى (من SQLite) أو تُستنتج من الدفعة الأولى؛
+    القيم اللاحقة التي لا تطابق نوع عمود رقمي تُكتب فارغة وتُحصى في coerced.
+    ملف Arrow IPC يقبل قاموساً واحداً لكل عمود، فيُبنى قاموس مشترك يمتد عبر الدفعات (dictionary deltas)."""
+
+    def __init__(self, path, col_names, fmt, types=None):
+        self.pa = _load_pyarrow()
+        self.path = path
+        self.col_names = [str(name) for name in col_names]
+        self.fmt = fmt
+        self.types = types
+        self.schema = None
+        self.coerced = 0
+        self._writer = None
+        self._dictionaries = {}
+
+    def _open(self, types, columns=None):
+        pa = self.pa
+        if columns is not None:
+            types = [pa.string() if pa.types.is_dictionary(arrow_type)
+                     and len(set(values)) > max(16, DICTIONARY_MAX_RATIO * len(values)) else arrow_type
+                     for arrow_type, values in zip(types, columns)]
+        self.schema = pa.schema([pa.field(name, arrow_type) for name, arrow_type in zip(self.col_names, types)])
+        if self.fmt == 'parquet':
+            compression = 'zstd' if OUTPUT_COMPRESSION == 'zstd' else 'snappy'
+            self._writer = pa.parquet.ParquetWriter(self.path, self.schema, compression=compression)
+        else:
+            options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+            self._writer = pa.ipc.new_file(self.path, self.schema, options=options)
+
+    def _shared_dictionary(self, index, encoded):
+        """إعادة ترقيم قاموس الدفعة على قاموس العمود التراكمي؛ الحلقة على القيم المختلفة في الدفعة فقط"""
+        pa = self.pa
+        mapping, values = self._dictionaries.setdefault(index, ({}, []))
+        remap = []
+        for value in encoded.dictionary.to_pylist():
+            position = mapping.get(value)
+            if position is None:
+                position = mapping[value] = len(values)
+                values.append(value)
+            remap.append(position)
+        indices = pa.compute.take(pa.array(remap, pa.int32()), encoded.indices)
+        return pa.DictionaryArray.from_arrays(indices, pa.array(values, pa.string()))
+
+    def _array(self, values, arrow_type):
+        pa = self.pa
+        text = pa.types.is_dictionary(arrow_type) or pa.types.is_string(arrow_type)
+        try:
+            array = pa.array(values, type=pa.string() if text else arrow_type, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, ValueError, OverflowError):
+            if text:
+                array = pa.array([_columnar_text(v) for v in values], type=pa.string())
+            else:
+                converted = []
+                for value in values:
+                    try:
+                        pa.scalar(value, type=arrow_type, from_pandas=True)
+                        converted.append(value)
+                    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, ValueError, OverflowError):
+                        converted.append(None)
+                        self.coerced += 1
+                array = pa.array(converted, type=arrow_type, from_pandas=True)
+        return array.dictionary_encode() if pa.types.is_dictionary(arrow_type) else array
+
+    def write_columns(self, columns):
+        columns = [list(values) for values in columns]
+        if self._writer is None:
+            self._open(self.types or infer_arrow_types(self.pa, columns), columns)
+        arrays = [self._array(values, field.type) for values, field in zip(columns, self.schema)]
+        if self.fmt == 'arrow':
+            arrays = [self._shared_dictionary(index, array) if self.pa.types.is_dictionary(array.type) else array
+                      for index, array in enumerate(arrays)]
+        self._writer.write_batch(self.pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+    def write_rows(self, rows):
+        if rows:
+            self.write_columns(list(zip(*rows)))
+
+    def close(self):
+        if self._writer is None:
+            self._open(self.types or [_arrow_type(self.pa, 'dictionary')] * len(self.col_names))
+        self._writer.close()
+        if self.coerced:
+            print(f" ⚠️ {self.coerced} قيمة لا تطابق نوع عمودها كُتبت فارغة في {os.path.basename(self.path)}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def export_table_columnar(conn, table_name, out_path, fmt, batch_size=DB_FETCH_BATCH, condition='', params=()):
+    """تصدير جدول إلى Parquet/Arrow دفعةً دفعة من المؤشر مع الحفاظ على الأنواع؛ يعيد عدد الصفوف"""
+    pa = _load_pyarrow()
+    cursor = conn.cursor()
+    cursor.arraysize = batch_size
+    where = f" WHERE {condition}" if condition else ''
+    cursor.execute(f"SELECT * FROM {_quote_ident(table_name)}{where}", params)
+    col_names = [description[0] for description in cursor.description]
+    types = sqlite_arrow_types(pa, conn, table_name, col_names, condition, params)
+    rows_written = 0
+    with ColumnarWriter(out_path, col_names, fmt, types) as writer:
+        while True:
+            rows = cursor.fetchmany()
+            if not rows:
+                break
+            writer.write_rows(rows)
+            rows_written += len(rows)
+    cursor.close()
+    return rows_written
 
+
+def table_output_path(output_dir, table_name, fmt=None):
+    safe_name = re.sub(r'[\\/*?:"<>|]', '_', table_name)
+    if fmt:
+        return os.path.join(output_dir, safe_name + COLUMNAR_SUFFIXES[fmt])
+    return output_name(os.path.join(output_dir, f"{safe_name}.tsv"))
+
+
+# ============ المسار المنسق (--via-excel) ============
+def _table_file_base(output_dir, table_name, used):
+    """اسم ملف من الاسم الكامل للجدول (دون قص أوراق Excel إلى 31 حرفاً) مع منع التصادم بعد التنظيف"""
+    safe_name = re.sub(r'[\\/*?:"<>|]', '_', table_name)
+    base, counter = safe_name, 1
+    while base.lower() in used:
+        counter += 1
+        base = f"{safe_name}_{counter}"
+    used.add(base.lower())
+    return os.path.join(output_dir, base)
+
+
+def export_table_formatted(conn, table_name, out_base, fmt='tsv', batch_size=DB_FETCH_BATCH, condition='', params=()):
+    """تصدير جدول بالعرض المنسق مباشرة من المؤشر على دفعات، دون ملف Excel وسيط. يعيد (المسار، الصفوف)."""
+    timestamp_kinds = infer_timestamp_columns(conn, table_name)
+    cursor = conn.cursor()
+    cursor.arraysize = batch_size
+    where = f" WHERE {condition}" if condition else ''
+    cursor.execute(f"SELECT * FROM {_quote_ident(table_name)}{where}", params)
+    col_names = [description[0] for description in cursor.description]
+    rows_written = 0
+    if fmt in COLUMNAR_SUFFIXES:
+        # الأعمدة العادية تبقى بأنواعها، وأعمدة الطوابع الزمنية نص ص/م؛ NULL قيمة فارغة لا النص "NULL"
+        pa = _load_pyarrow()
+        out_path = out_base + COLUMNAR_SUFFIXES[fmt]
+        types = sqlite_arrow_types(pa, conn, table_name, col_names, condition, params)
+        for index in timestamp_kinds:
+            types[index] = pa.dictionary(pa.int32(), pa.string())
+        with ColumnarWriter(out_path, col_names, fmt, types) as writer:
+            while True:
+                rows = cursor.fetchmany()
+                if not rows:
+                    break
+                columns = list(zip(*rows))
+                for index, kind in timestamp_kinds.items():
+                    shown = format_columns([columns[index]], {0: kind})[0]
+                    columns[index] = [None if v is None else text for v, text in zip(columns[index], shown)]
+                writer.write_columns(columns)
+                rows_written += len(rows)
+    else:
+        out_path = output_name(out_base + '.tsv')
+        with open_text_output(out_path, newline='') as f:
+            writer = csv.writer(f, delimiter='\t', lineterminator='\n')
+            writer.writerow(col_names)
+            while True:
+                rows = cursor.fetchmany()
+                if not rows:
+                    break
+                writer.writerows(zip(*format_columns(list(zip(*rows)), timestamp_kinds)))
+                rows_written += len(rows)
+    cursor.close()
+    return out_path, rows_written
+
+
+@instrumented
 def extract_db_via_excel_to_text(db_path, output_dir):
-    print(f"🗄️→📊→📄 معالجة قاعدة البيانات عبر Excel: {os.path.basename(db_path)}")
-    temp_excel = tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx').name
+    """المسار المنسق لقواعد البيانات (--via-excel): تواريخ مقروءة بصيغة ص/م و NULL و <binary data>.
+    كان يمر سابقاً عبر ملف XLSX مؤقت؛ الآن يُكتب كل جدول مباشرة من SQLite إلى TSV أو Parquet/Arrow."""
+    if not os.path.exists(db_path):
+        return [], 0
+    fmt = columnar_format() or 'tsv'
     try:
-        excel_path, total_rows = export_db_to_excel(db_path, temp_excel)
-        if not excel_path:
-            return [], 0
-        if pd is None:
-            return [], 0
-        excel_file = pd.ExcelFile(excel_path)
-        sheet_names = excel_file.sheet_names
+        conn = sqlite3.connect(sqlite_readonly_uri(db_path), uri=True)
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%';")]
         files_created = []
-        for sheet in sheet_names:
-            df = pd.read_excel(excel_path, sheet_name=sheet)
-            safe_sheet = re.sub(r'[\\/*?:"<>|]', '_', sheet)
-            out_path = os.path.join(output_dir, f"{safe_sheet}.tsv")
-            with open(out_path, 'w', encoding='utf-8') as f:
-                f.write("\t".join(map(str, df.columns)) + "\n")
-                for _, row in df.iterrows():
-                    row_str = [str(val) if not pd.isna(val) else "NULL" for val in row]
-                    f.write("\t".join(row_str) + "\n")
+        total_rows = 0
+        used_names = set()
+        sampled = 0
+        started = time.perf_counter()
+        for table_name in tables:
+            table_started = time.perf_counter()
+            try:
+                condition, params, note = table_sample(conn, table_name)
+                out_path, rows = export_table_formatted(conn, table_name,
+                                                        _table_file_base(output_dir, table_name, used_names), fmt,
+                                                        condition=condition, params=params)
+            except sqlite3.Error as e:
+                print(f" ⚠️ خطأ في تصدير '{table_name}': {str(e)}")
+                continue
+            elapsed = time.perf_counter() - table_started
             files_created.append(out_path)
-            print(f"   ✓ تم إنشاء {os.path.basename(out_path)}")
+            total_rows += rows
+            sampled += bool(note)
+            print(f" ✓ جدول '{table_name}': {rows} صف ({elapsed:.2f} ث، {_format_rate(rows, elapsed)})"
+                  + (f" 🎲 {note}" if note else ""))
+        conn.close()
+        elapsed = time.perf_counter() - started
+        print(f" 📈 الإجمالي: {total_rows} صف في {elapsed:.2f} ث ({_format_rate(total_rows, elapsed)})"
+              + (f" — {sampled} جدول مُصدَّر كعينة" if sampled else ""))
         return files_created, total_rows
-    finally:
-        try:
-            if os.path.exists(temp_excel):
-                os.unlink(temp_excel)
-        except:
-            pass
+    except sqlite3.Error as e:
+        print(f" ❌ خطأ في قاعدة البيانات: {str(e)}")
+        return [], 0
+
 
-def extract_db_direct_to_text(db_path, output_dir):
+@instrumented
+def extract_db_direct_to_text(db_path, output_dir, state_key=None):
     if not os.path.exists(db_path):
         return [], 0
     try:
@@ -294,104 +1529,476 @@ def extract_db_direct_to_text(db_path, output_dir):
             return [], 0
         files_created = []
         total_rows = 0
-        for table in tables:
-            table_name = table[0]
-            cursor.execute(f"SELECT * FROM \"{table_name}\"")
-            rows = cursor.fetchall()
-            col_names = [description[0] for description in cursor.description]
-            safe_name = re.sub(r'[\\/*?:"<>|]', '_', table_name)
-            out_path = os.path.join(output_dir, f"{safe_name}.tsv")
-            with open(out_path, 'w', encoding='utf-8') as f:
-                f.write("\t".join(col_names) + "\n")
-                for row in rows:
-                    row_str = []
-                    for value in row:
-                        if value is None:
-                            row_str.append("NULL")
-                        elif isinstance(value, (bytes, bytearray)):
-                            row_str.append("<binary data>")
-                        else:
-                            row_str.append(str(value))
-                    f.write("\t".join(row_str) + "\n")
-            files_created.append(out_path)
-            total_rows += len(rows)
-            print(f" ✓ جدول {table_name}: {len(rows)} صف")
+        sampled = 0
+        started = time.perf_counter()
+        fmt = columnar_format()
+        if DB_INCREMENTAL:
+            if fmt:
+                print(f" ℹ️ التصدير التزايدي يُلحق صفوفاً بملفات TSV، فيُكتب بصيغة TSV بدلاً من {fmt}")
+            print(f" 🔁 تصدير تزايدي ({DB_INCREMENTAL})")
+            for out_path, rows in export_tables_incremental(db_path, conn, [t[0] for t in tables], output_dir,
+                                                            state_key):
+                files_created.append(out_path)
+                total_rows += rows
+        elif DB_EXPORT_WORKERS > 1 and not DB_SAMPLE_ROWS:
+            print(f" ⚡ تصدير {len(tables)} جدول بالتوازي ({DB_EXPORT_WORKERS} عملية)")
+            for name, out_path, rows, _ in export_tables_parallel(db_path, conn, [t[0] for t in tables],
+                                                                  output_dir, DB_EXPORT_WORKERS, fmt):
+                files_created.append(out_path)
+                total_rows += rows
+                if blob_refs_enabled(conn, name):
+                    files_created.extend(export_table_blobs(conn, name, output_dir)[0])
+        else:
+            for table in tables:
+                table_name = table[0]
+                out_path = table_output_path(output_dir, table_name, fmt)
+                table_started = time.perf_counter()
+                condition, params, note = table_sample(conn, table_name)
+                blob_refs = blob_refs_enabled(conn, table_name)
+                if fmt:
+                    rows = export_table_columnar(conn, table_name, out_path, fmt, condition=condition, params=params)
+                else:
+                    rows = export_table_tsv(conn, table_name, out_path, condition=condition, params=params,
+                                            blob_refs=blob_refs)
+                elapsed = time.perf_counter() - table_started
+                files_created.append(out_path)
+                total_rows += rows
+                sampled += bool(note)
+                print(f" ✓ جدول {table_name}: {rows} صف ({elapsed:.2f} ث، {_format_rate(rows, elapsed)})"
+                      + (f" 🎲 {note}" if note else ""))
+                if blob_refs:
+                    files_created.extend(export_table_blobs(conn, table_name, output_dir, condition, params)[0])
         conn.close()
+        elapsed = time.perf_counter() - started
+        print(f" 📈 الإجمالي: {total_rows} صف في {elapsed:.2f} ث ({_format_rate(total_rows, elapsed)})"
+              + (f" — {sampled} جدول مُصدَّر كعينة" if sampled else ""))
         return files_created, total_rows
     except sqlite3.Error as e:
         print(f" ❌ خطأ في قاعدة البيانات: {str(e)}")
         return [], 0
 
 # ============ دوال معالجة Excel ============
+# صيغ تقرؤها openpyxl تدفقياً؛ .xls القديمة تبقى على pandas
+OPENPYXL_EXTENSIONS = {'.xlsx', '.xlsm', '.xltx', '.xltm'}
+# عدد العمليات لتصدير أوراق مصنف واحد بالتوازي (1 = تسلسلي)؛ يُضبط عبر --sheet-workers
+SHEET_WORKERS = 1
+
+
+def _sheet_cell(value):
+    return "NULL" if value is None else str(value)
+
+
+def _trimmed_width(row):
+    width = len(row)
+    while width and row[width - 1] is None:
+        width -= 1
+    return width
+
+
+def iter_sheet_rows(worksheet):
+    """الترويسة ثم صفوف الورقة كما تُحلَّل من XML، دون تحميل الورقة.
+    الخلايا الفارغة في آخر الصف والصفوف الفارغة في آخر الورقة تُحذف كما في pandas؛
+    ما بينها يُحفظ بعدّاد فقط فتبقى الذاكرة بحجم صف واحد.
+    صف بيانات أعرض من الترويسة يضيف أعمدة "Unnamed: N" كما في pandas، وكل الصفوف بعرض الترويسة."""
+    rows = worksheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return [], iter(())
+    header = list(header)[:_trimmed_width(header)]
+    width = len(header)
+    # أبعاد الورقة المعلنة أعرض من الترويسة (أو غير معروفة): مسح أول لمعرفة أعرض صف فعلي
+    declared = worksheet.max_column
+    if declared is None or declared > width:
+        for row in worksheet.iter_rows(min_row=2, values_only=True):
+            width = max(width, _trimmed_width(row))
+    header += [None] * (width - len(header))
+    header = [f"Unnamed: {index}" if name is None else str(name) for index, name in enumerate(header)]
+
+    def body():
+        pending_blank = 0
+        for row in rows:
+            row = list(row)
+            del row[_trimmed_width(row):]
+            if not row:
+                pending_blank += 1
+                continue
+            for _ in range(pending_blank):
+                yield [None] * width
+            pending_blank = 0
+            if len(row) < width:
+                row.extend([None] * (width - len(row)))
+            yield row[:width]
+
+    return header, body()
+
+
+def export_worksheet(worksheet, out_path, fmt=None, batch_size=DB_FETCH_BATCH):
+    """كتابة ورقة واحدة صفاً بصف (TSV) أو دفعات سجلات (Parquet/Arrow)؛ يعيد عدد الصفوف"""
+    header, rows = iter_sheet_rows(worksheet)
+    rows_written = 0
+    if fmt:
+        with ColumnarWriter(out_path, header, fmt) as writer:
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    writer.write_rows(batch)
+                    rows_written += len(batch)
+                    batch = []
+            writer.write_rows(batch)
+            rows_written += len(batch)
+        return rows_written
+    with open_text_output(out_path) as f:
+        f.write("\t".join(header) + "\n")
+        for row in rows:
+            f.write("\t".join(map(_sheet_cell, row)) + "\n")
+            rows_written += 1
+    return rows_written
+
+
+def _export_sheets_job(excel_path, assignments, fmt, compression, compression_level):
+    """تُنفذ في عملية عاملة: فتح المصنف للقراءة فقط مرة واحدة وتصدير الأوراق المسندة إليها بالترتيب"""
+    global OUTPUT_COMPRESSION, OUTPUT_COMPRESSION_LEVEL
+    OUTPUT_COMPRESSION, OUTPUT_COMPRESSION_LEVEL = compression, compression_level
+    workbook = load_workbook(excel_path, read_only=True, data_only=True)
+    results = []
+    try:
+        for title, out_path in assignments:
+            started = time.perf_counter()
+            rows = export_worksheet(workbook[title], out_path, fmt)
+            results.append((title, rows, time.perf_counter() - started))
+    finally:
+        workbook.close()
+    return results
+
+
+SHEET_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+REL_ID = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id'
+PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+
+def _workbook_sheet_parts(zf):
+    """اسم الورقة -> مسار XML الخاص بها داخل الحزمة، من xl/workbook.xml وعلاقاته"""
+    targets = {}
+    rels = ET.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+    for rel in rels.iter(PKG_REL_NS + 'Relationship'):
+        target = rel.get('Target', '')
+        # الهدف نسبي إلى xl/ عادة، وقد يكون مطلقاً من جذر الحزمة
+        part = target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join('xl', target))
+        targets[rel.get('Id')] = part
+    workbook = ET.fromstring(zf.read('xl/workbook.xml'))
+    return {sheet.get('name'): targets.get(sheet.get(REL_ID))
+            for sheet in workbook.iter(SHEET_NS + 'sheet')}
+
+
+def _sheet_sizes(excel_path, worksheets):
+    """حجم XML كل ورقة داخل الحزمة (غير مضغوط) لتوزيع الأوراق على العمال؛ 1 إن تعذر معرفته"""
+    sizes = {}
+    with zipfile.ZipFile(excel_path) as zf:
+        try:
+            parts = _workbook_sheet_parts(zf)
+        except (KeyError, ET.ParseError):
+            parts = {}
+        for worksheet in worksheets:
+            try:
+                sizes[worksheet.title] = zf.getinfo(parts[worksheet.title]).file_size
+            except (KeyError, TypeError):
+                sizes[worksheet.title] = 1
+    return sizes
+
+
+def export_sheets_parallel(excel_path, worksheets, output_dir, workers, fmt=None):
+    """توزيع الأوراق على عمليات عاملة، الأكبر أولاً على العامل الأقل حملاً، وكل عامل يفتح المصنف مرة واحدة.
+    يعيد [(الورقة، المسار، الصفوف، الزمن)] بترتيب الأوراق."""
+    sizes = _sheet_sizes(excel_path, worksheets)
+    out_paths = {ws.title: table_output_path(output_dir, ws.title, fmt) for ws in worksheets}
+    bins = [[0, []] for _ in range(min(workers, len(worksheets)))]
+    for title in sorted(out_paths, key=lambda name: -sizes[name]):
+        target = min(bins, key=lambda b: b[0])
+        target[0] += sizes[title]
+        target[1].append((title, out_paths[title]))
+    results = {}
+    ctx = multiprocessing.get_context('fork') if hasattr(os, 'fork') else None
+    with concurrent.futures.ProcessPoolExecutor(max_workers=len(bins), mp_context=ctx) as pool:
+        futures = [pool.submit(_export_sheets_job, excel_path, assignments, fmt,
+                               OUTPUT_COMPRESSION, OUTPUT_COMPRESSION_LEVEL) for _, assignments in bins]
+        for future in concurrent.futures.as_completed(futures):
+            for title, rows, elapsed in future.result():
+                results[title] = (title, out_paths[title], rows, elapsed)
+                print(f" ✓ ورقة {title}: {rows} صف ({elapsed:.2f} ث، {_format_rate(rows, elapsed)})")
+    return [results[ws.title] for ws in worksheets]
+
+
+def _extract_excel_with_pandas(excel_path, output_dir, fmt):
+    """مسار .xls: pandas تقرأ كل ورقة كاملة (لا قارئ تدفقي لهذه الصيغة)"""
+    files_created = []
+    total_rows = 0
+    with pd.ExcelFile(excel_path) as excel_file:
+        for sheet in excel_file.sheet_names:
+            df = excel_file.parse(sheet)
+            out_path = table_output_path(output_dir, sheet, fmt)
+            if fmt:
+                with ColumnarWriter(out_path, df.columns, fmt) as writer:
+                    for start in range(0, len(df), DB_FETCH_BATCH):
+                        writer.write_columns([df[c].iloc[start:start + DB_FETCH_BATCH].tolist() for c in df.columns])
+            else:
+                with open_text_output(out_path) as f:
+                    f.write("\t".join(map(str, df.columns)) + "\n")
+                    for row in df.itertuples(index=False):
+                        f.write("\t".join(str(val) if not pd.isna(val) else "NULL" for val in row) + "\n")
+            files_created.append(out_path)
+            total_rows += len(df)
+            print(f" ✓ ورقة {sheet}: {len(df)} صف")
+    return files_created, total_rows
+
+
+@instrumented
 def extract_excel_to_text(excel_path, output_dir):
-    if pd is None:
-        print(" ❌ pandas غير مثبتة. لا يمكن معالجة Excel.")
+    """ملفات XLSX تُقرأ مرة واحدة بـ openpyxl (read_only) وتُكتب كل ورقة أثناء تحليلها.
+    excel_path مسار أو كائن ملف قابل للتنقل (عضو أرشيف)."""
+    if source_missing(excel_path):
         return [], 0
-    if not os.path.exists(excel_path):
+    fmt = columnar_format()
+    streaming = (load_workbook is not None
+                 and os.path.splitext(source_name(excel_path))[1].lower() in OPENPYXL_EXTENSIONS)
+    if not streaming and pd is None:
+        print(" ❌ pandas غير مثبتة. لا يمكن معالجة Excel.")
         return [], 0
     try:
-        excel_file = pd.ExcelFile(excel_path)
-        sheet_names = excel_file.sheet_names
+        if not streaming:
+            return _extract_excel_with_pandas(excel_path, output_dir, fmt)
+        workbook = load_workbook(excel_path, read_only=True, data_only=True)
         files_created = []
         total_rows = 0
-        for sheet in sheet_names:
-            df = pd.read_excel(excel_path, sheet_name=sheet)
-            safe_sheet = re.sub(r'[\\/*?:"<>|]', '_', sheet)
-            out_path = os.path.join(output_dir, f"{safe_sheet}.tsv")
-            with open(out_path, 'w', encoding='utf-8') as f:
-                f.write("\t".join(map(str, df.columns)) + "\n")
-                for _, row in df.iterrows():
-                    row_str = [str(val) if not pd.isna(val) else "NULL" for val in row]
-                    f.write("\t".join(row_str) + "\n")
-            files_created.append(out_path)
-            total_rows += len(df)
-            print(f" ✓ ورقة {sheet}: {len(df)} صف")
+        try:
+            # العمال يفتحون المصنف بمساره، فعضو الأرشيف المحمّل في الذاكرة يُصدَّر تسلسلياً
+            if SHEET_WORKERS > 1 and len(workbook.worksheets) > 1 and isinstance(excel_path, (str, os.PathLike)):
+                started = time.perf_counter()
+                workers = min(SHEET_WORKERS, len(workbook.worksheets))
+                print(f" ⚡ تصدير {len(workbook.worksheets)} ورقة بالتوازي ({workers} عملية)")
+                results = export_sheets_parallel(excel_path, workbook.worksheets, output_dir, workers, fmt)
+                for _, out_path, rows, _ in results:
+                    files_created.append(out_path)
+                    total_rows += rows
+                elapsed = time.perf_counter() - started
+                busy = sum(result[3] for result in results)
+                print(f" 📈 الإجمالي: {total_rows} صف في {elapsed:.2f} ث (زمن العمال {busy:.2f} ث، "
+                      f"{_format_rate(total_rows, elapsed)})")
+                return files_created, total_rows
+            for worksheet in workbook.worksheets:
+                started = time.perf_counter()
+                out_path = table_output_path(output_dir, worksheet.title, fmt)
+                rows = export_worksheet(worksheet, out_path, fmt)
+                elapsed = time.perf_counter() - started
+                files_created.append(out_path)
+                total_rows += rows
+                print(f" ✓ ورقة {worksheet.title}: {rows} صف ({elapsed:.2f} ث، {_format_rate(rows, elapsed)})")
+        finally:
+            workbook.close()
         return files_created, total_rows
     except Exception as e:
         print(f" ❌ خطأ في Excel: {str(e)}")
         return [], 0
 
 # ============ دوال معالجة Word ============
+# يُحلل XML الحزمة مباشرة بـ iterparse دون بناء نموذج python-docx: الفقرات وصفوف الجداول تُكتب
+# بترتيبها في المستند فور اكتمالها، وكل عنصر مكتمل يُزال من الشجرة فتبقى الذاكرة ثابتة.
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+MC_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+_WORD_RUN_TEXT = {W_NS + 'tab': '\t', W_NS + 'br': '\n', W_NS + 'cr': '\n', W_NS + 'noBreakHyphen': '-'}
+_WORD_CONTAINERS = {W_NS + 'body', W_NS + 'hdr', W_NS + 'ftr', W_NS + 'footnotes', W_NS + 'endnotes'}
+# أجزاء الحزمة بعد نص المستند: (عنوان القسم، أنواع الأجزاء بالترتيب)
+WORD_EXTRA_PARTS = (
+    ("رؤوس وتذييلات الصفحات", ('header', 'footer')),
+    ("حواشي", ('footnotes', 'endnotes')),
+)
+_WORD_PART_NAME = re.compile(r'word/(header|footer|footnotes|endnotes)(\d*)\.xml$')
+
+
+def iter_wordml_blocks(stream):
+    """نصوص كتل جزء WordprocessingML بترتيبها: كل فقرة سطر، وكل صف جدول خلاياه مفصولة بـ tab.
+    فقرات الخلية تُضم بمسافة، والجداول المتداخلة تُدمج في خلية الجدول الخارجي. محتوى mc:Fallback
+    (نسخة بديلة من مربعات النص) يُتجاهل حتى لا يتكرر النص."""
+    paragraphs = []  # فقرات مفتوحة (مربع نص داخل فقرة يفتح فقرة داخلية)
+    cell_parts, row_cells = [], []
+    table_depth = fallback_depth = 0
+    container = None
+    for event, elem in ET.iterparse(stream, events=('start', 'end')):
+        tag = elem.tag
+        if event == 'start':
+            if tag == W_NS + 'p':
+                paragraphs.append([])
+            elif tag == W_NS + 'tbl':
+                table_depth += 1
+            elif tag == MC_FALLBACK:
+                fallback_depth += 1
+            elif tag in _WORD_CONTAINERS and container is None:
+                container = elem
+            continue
+        if tag == MC_FALLBACK:
+            fallback_depth -= 1
+        elif tag == W_NS + 'tbl':
+            table_depth -= 1
+        elif tag == W_NS + 'p':
+            text = ''.join(paragraphs.pop())
+            if fallback_depth or not text.strip():
+                pass
+            elif table_depth:
+                cell_parts.append(text.strip())
+            else:
+                yield text
+        elif fallback_depth:
+            pass
+        elif tag == W_NS + 't' and paragraphs:
+            paragraphs[-1].append(elem.text or '')
+        elif tag in _WORD_RUN_TEXT and paragraphs:
+            paragraphs[-1].append(_WORD_RUN_TEXT[tag])
+        elif tag == W_NS + 'tc' and table_depth == 1:
+            row_cells.append(' '.join(cell_parts).replace('\t', ' ').replace('\n', ' '))
+            cell_parts = []
+        elif tag == W_NS + 'tr' and table_depth == 1:
+            if any(row_cells):
+                yield '\t'.join(row_cells)
+            row_cells = []
+            elem.clear()
+        if container is not None and elem is not container and not paragraphs and not table_depth:
+            # الكتلة العليا اكتملت: حذف ما تراكم تحت الحاوية
+            container.clear()
+
+
+@instrumented
 def extract_docx_to_text(docx_path, output_dir):
-    if docx is None:
-        print(" ❌ python-docx غير مثبتة. لا يمكن معالجة Word.")
-        return [], 0
-    if not os.path.exists(docx_path):
+    """نص المستند بترتيبه (فقرات وصفوف جداول)، ثم رؤوس الصفحات وتذييلاتها، ثم الحواشي.
+    docx_path مسار أو كائن ملف قابل للتنقل (عضو أرشيف)."""
+    if source_missing(docx_path):
         return [], 0
     try:
-        doc = docx.Document(docx_path)
-        paragraphs = []
-        for para in doc.paragraphs:
-            if para.text.strip():
-                paragraphs.append(para.text)
-        # استخراج الجداول
-        tables_text = []
-        for table in doc.tables:
-            for row in table.rows:
-                cells = [cell.text.strip() for cell in row.cells]
-                tables_text.append("\t".join(cells))
-        out_path = os.path.join(output_dir, "document_text.txt")
-        with open(out_path, 'w', encoding='utf-8') as f:
-            f.write("\n".join(paragraphs))
-            if tables_text:
-                f.write("\n\n--- جداول ---\n")
-                f.write("\n".join(tables_text))
-        return [out_path], len(paragraphs) + len(tables_text)
+        blocks = 0
+        out_path = output_name(os.path.join(output_dir, "document_text.txt"))
+        with zipfile.ZipFile(docx_path) as zf, open_text_output(out_path) as f:
+            extra_parts = [m for m in map(_WORD_PART_NAME.match, zf.namelist()) if m]
+            with zf.open('word/document.xml') as stream:
+                for text in iter_wordml_blocks(stream):
+                    f.write(("\n" if blocks else "") + text)
+                    blocks += 1
+            for title, kinds in WORD_EXTRA_PARTS:
+                parts = sorted((kinds.index(m.group(1)), int(m.group(2) or 0), m.group(0))
+                               for m in extra_parts if m.group(1) in kinds)
+                wrote_title = False
+                for _, _, part in parts:
+                    with zf.open(part) as stream:
+                        for text in iter_wordml_blocks(stream):
+                            if not wrote_title:
+                                f.write(f"\n\n--- {title} ---")
+                                wrote_title = True
+                            f.write("\n" + text)
+                            blocks += 1
+        return [out_path], blocks
     except Exception as e:
         print(f" ❌ خطأ في Word: {str(e)}")
         return [], 0
 
 # ============ دوال معالجة HTML ============
-def extract_html_to_text(html_path, output_dir):
-    if bs4 is None:
-        # معالجة بسيطة بدون BeautifulSoup
+# المحرك: 'auto' (lxml إن وُجدت وإلا BeautifulSoup) أو 'lxml' أو 'bs4'؛ يُضبط عبر --html-engine.
+# lxml تعيد نص BeautifulSoup نفسه (عقدة نصية في كل سطر) بعشرات أضعاف السرعة، و bs4 احتياط عند فشل التحليل.
+HTML_ENGINE = 'auto'
+# الملفات الأكبر من هذا الحجم تُحلل تدفقياً بـ iterparse وتُحذف عناصرها المكتملة فلا تُبنى الشجرة
+# (محلل HTML في libxml2 يحتفظ بمخزن الإدخال، فتبقى الذاكرة بحجم الملف تقريباً لا بأضعافه)
+HTML_ITERPARSE_BYTES = 32 * 1024 * 1024
+_HTML_SKIP_TAGS = frozenset({'script', 'style', 'head', 'title', 'meta'})
+if lxml_etree is not None:
+    _HTML_TEXT_NODES = lxml_etree.XPath(
+        "//text()[not(" + " or ".join(f"ancestor::{tag}" for tag in sorted(_HTML_SKIP_TAGS)) + ")]",
+        smart_strings=False)
+    _HTML_SCRIPT_FREE_TEXT = lxml_etree.XPath("//text()[not(ancestor::script or ancestor::style)]",
+                                              smart_strings=False)
+
+
+def html_engine(requested=None):
+    """المحرك الفعلي حسب الطلب والمكتبات المثبتة: 'lxml' أو 'bs4' أو None (إزالة الوسوم بتعبير نمطي)"""
+    requested = requested or HTML_ENGINE
+    if requested in ('auto', 'lxml') and lxml_etree is not None:
+        return 'lxml'
+    if bs4 is not None:
+        return 'bs4'
+    return 'lxml' if lxml_etree is not None else None
+
+
+def _iter_html_text_streaming(source):
+    """عقد النص بترتيب المستند من iterparse: نص العنصر يُقرأ عند بداية أول ابن أو عند نهايته،
+    وذيول الأبناء السابقين (عناصر وتعليقات) عند بداية الابن التالي أو نهاية الأب؛ ثم يُحذف ما اكتمل."""
+    skip = 0
+    text_pending = []  # لكل عنصر مفتوح: هل ما زال نصه الأول لم يُقرأ
+    for event, elem in lxml_etree.iterparse(source, events=('start', 'end'), html=True, encoding='utf-8',
+                                            remove_pis=True):
+        if event == 'start':
+            parent = elem.getparent()
+            if text_pending and text_pending[-1]:
+                text_pending[-1] = False
+                if not skip:
+                    yield parent.text
+            # الإخوة السابقون اكتملوا (قد يكون المحلل تقدم بعد elem فلا يُعتمد على موضعه في الأب)
+            previous = list(elem.itersiblings(preceding=True))
+            for node in reversed(previous):
+                if not skip:
+                    yield node.tail
+                parent.remove(node)
+            text_pending.append(True)
+            skip += elem.tag in _HTML_SKIP_TAGS
+            continue
+        if not skip:
+            if text_pending[-1]:
+                yield elem.text
+            for child in elem:
+                yield child.tail
+        text_pending.pop()
+        skip -= elem.tag in _HTML_SKIP_TAGS
+        elem.clear(keep_tail=True)
+
+
+def iter_html_text_lxml(source):
+    """أسطر النص المرئي (عقد نصية مشذبة غير فارغة) بمحرك lxml؛ تدفقي للملفات الكبيرة.
+    يرفع lxml_etree.LxmlError إن تعذر التحليل."""
+    if os.path.getsize(source) > HTML_ITERPARSE_BYTES:
+        nodes = _iter_html_text_streaming(source)
+    else:
+        root = lxml_etree.parse(source, lxml_etree.HTMLParser(encoding='utf-8')).getroot()
+        if root is None:
+            raise lxml_etree.ParserError("Document is empty")
+        nodes = _HTML_TEXT_NODES(root)
+    for text in nodes:
+        text = text.strip() if text else ''
+        if text:
+            yield text
+
+
+@instrumented
+def extract_html_to_text(html_path, output_dir, engine=None):
+    engine = html_engine(engine)
+    if engine == 'lxml':
+        out_path = output_name(os.path.join(output_dir, "html_text.txt"))
+        try:
+            lines = 0
+            with open_text_output(out_path) as f:
+                for text in iter_html_text_lxml(html_path):
+                    f.write(("\n" if lines else "") + text)
+                    lines += text.count("\n") + 1
+            return [out_path], lines
+        except (lxml_etree.LxmlError, OSError, ValueError) as e:
+            if bs4 is None:
+                print(f" ❌ خطأ في HTML: {str(e)}")
+                return [], 0
+            print(f" ⚠️ تعذر تحليل HTML بـ lxml ({e})، إعادة المحاولة بـ BeautifulSoup")
+            engine = 'bs4'
+    if engine is None:
+        # معالجة بسيطة بدون lxml أو BeautifulSoup
         try:
             with open(html_path, 'r', encoding='utf-8') as f:
                 content = f.read()
             text = re.sub(r'<[^>]+>', '', content)
             text = re.sub(r'\s+', ' ', text).strip()
-            out_path = os.path.join(output_dir, "html_text.txt")
-            with open(out_path, 'w', encoding='utf-8') as f:
+            out_path = output_name(os.path.join(output_dir, "html_text.txt"))
+            with open_text_output(out_path) as f:
                 f.write(text)
             return [out_path], 1
         except Exception as e:
@@ -402,8 +2009,8 @@ def extract_html_to_text(html_path, output_dir):
         for tag in soup(['script', 'style', 'head', 'title', 'meta', '[document]']):
             tag.decompose()
         text = soup.get_text(separator='\n', strip=True)
-        out_path = os.path.join(output_dir, "html_text.txt")
-        with open(out_path, 'w', encoding='utf-8') as f:
+        out_path = output_name(os.path.join(output_dir, "html_text.txt"))
+        with open_text_output(out_path) as f:
             f.write(text)
         lines = len(text.split('\n'))
         return [out_path], lines
@@ -412,6 +2019,7 @@ def extract_html_to_text(html_path, output_dir):
         return [], 0
 
 # ============ دوال معالجة PDF المتقدمة ============
+@instrumented
 def extract_pdf_advanced(pdf_path, output_dir, use_ocr=True):
     """
     استخراج متقدم من PDF:
@@ -419,12 +2027,14 @@ def extract_pdf_advanced(pdf_path, output_dir, use_ocr=True):
     - جداول
     - صور مع حفظها ومحاولة OCR
     - بيانات وصفية
+    pdf_path مسار أو كائن ملف قابل للتنقل (عضو أرشيف).
     """
     if pdfplumber is None:
         print(" ❌ pdfplumber غير مثبتة. لا يمكن معالجة PDF.")
         return [], 0, 0
     
-    base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+    pdf_name = os.path.basename(source_name(pdf_path))
+    base_name = os.path.splitext(pdf_name)[0]
     pdf_output_dir = os.path.join(output_dir, f"{base_name}_pdf_extracted")
     safe_makedirs(pdf_output_dir)
     
@@ -433,7 +2043,7 @@ def extract_pdf_advanced(pdf_path, output_dir, use_ocr=True):
     safe_makedirs(images_dir)
     safe_makedirs(tables_dir)
     
-    full_text_path = os.path.join(pdf_output_dir, "full_text.txt")
+    full_text_path = output_name(os.path.join(pdf_output_dir, "full_text.txt"))
     summary_path = os.path.join(pdf_output_dir, "summary.json")
     
     try:
@@ -444,9 +2054,9 @@ def extract_pdf_advanced(pdf_path, output_dir, use_ocr=True):
             total_tables = 0
             metadata = pdf.metadata or {}
             
-            with open(full_text_path, 'w', encoding='utf-8') as txt_out:
+            with open_text_output(full_text_path) as txt_out:
                 txt_out.write("=" * 80 + "\n")
-                txt_out.write(f"محتوى PDF: {os.path.basename(pdf_path)}\n")
+                txt_out.write(f"محتوى PDF: {pdf_name}\n")
                 txt_out.write(f"عدد الصفحات: {total_pages}\n")
                 txt_out.write("=" * 80 + "\n\n")
                 
@@ -471,13 +2081,13 @@ def extract_pdf_advanced(pdf_path, output_dir, use_ocr=True):
                         if table and any(any(row) for row in table):
                             total_tables += 1
                             # حفظ كـ CSV
-                            csv_path = os.path.join(tables_dir, f"page{page_num:04d}_table{i+1:02d}.csv")
-                            with open(csv_path, 'w', encoding='utf-8') as f:
+                            csv_path = output_name(os.path.join(tables_dir, f"page{page_num:04d}_table{i+1:02d}.csv"))
+                            with open_text_output(csv_path) as f:
                                 for row in table:
                                     f.write("\t".join([str(cell) if cell else "" for cell in row]) + "\n")
                             # حفظ كـ Markdown
-                            md_path = os.path.join(tables_dir, f"page{page_num:04d}_table{i+1:02d}.md")
-                            with open(md_path, 'w', encoding='utf-8') as f:
+                            md_path = output_name(os.path.join(tables_dir, f"page{page_num:04d}_table{i+1:02d}.md"))
+                            with open_text_output(md_path) as f:
                                 f.write(f"# جدول من الصفحة {page_num}\n\n")
                                 if table and table[0]:
                                     f.write("| " + " | ".join([str(h) if h else "" for h in table[0]]) + " |\n")
@@ -517,7 +2127,7 @@ def extract_pdf_advanced(pdf_path, output_dir, use_ocr=True):
                             im.save(img_path, format="PNG")
                             # تشغيل OCR
                             ocr_text = pytesseract.image_to_string(PIL.Image.open(img_path), lang='ara+eng')
-                            with open(full_text_path, 'a', encoding='utf-8') as f:
+                            with open_text_output(full_text_path, 'a') as f:
                                 f.write(f"\n[OCR للصفحة {page_num}]\n")
                                 f.write(ocr_text + "\n")
                             pages_with_ocr += 1
@@ -527,7 +2137,7 @@ def extract_pdf_advanced(pdf_path, output_dir, use_ocr=True):
             
             # كتابة الملخص
             summary = {
-                'pdf_file': os.path.basename(pdf_path),
+                'pdf_file': pdf_name,
                 'total_pages': total_pages,
                 'pages_with_ocr': pages_with_ocr,
                 'total_images': total_images,
@@ -538,7 +2148,7 @@ def extract_pdf_advanced(pdf_path, output_dir, use_ocr=True):
             with open(summary_path, 'w', encoding='utf-8') as f:
                 json.dump(summary, f, ensure_ascii=False, indent=2)
             
-            print(f"   ✅ PDF معالج: {os.path.basename(pdf_path)}")
+            print(f"   ✅ PDF معالج: {pdf_name}")
             print(f"      الصفحات: {total_pages}, صور: {total_images}, جداول: {total_tables}")
             return [full_text_path, summary_path], total_pages, 0
         
@@ -547,7 +2157,49 @@ def extract_pdf_advanced(pdf_path, output_dir, use_ocr=True):
         return [], 0, 1
 
 # ============ دوال معالجة الأرشيفات ============
-def extract_archive_to_files(archive_path, output_dir, archive_type="zip"):
+# أعضاء Office/PDF داخل الأرشيف تُمرر إلى معالجاتها من ذاكرة مؤقتة دون فك الأرشيف إلى القرص؛
+# العضو الأكبر من MEMBER_SPOOL_BYTES يُنقل تلقائياً إلى ملف مؤقت مجهول.
+# قواعد SQLite تحتاج ملفاً حقيقياً، فتُنسخ إلى ملف مؤقت يُحذف بعد التصدير.
+MEMBER_SPOOL_BYTES = 64 * 1024 * 1024
+MEMBER_HANDLER_EXTENSIONS = EXCEL_EXTENSIONS | WORD_EXTENSIONS | PDF_EXTENSIONS | DB_EXTENSIONS
+
+
+class MemberBuffer(tempfile.SpooledTemporaryFile):
+    """محتوى عضو أرشيف قابل للتنقل (seek) يحمل اسمه داخل الأرشيف لتحديد المعالج"""
+
+    def __init__(self, member_name, max_size=MEMBER_SPOOL_BYTES):
+        super().__init__(max_size=max_size)
+        self.member_name = member_name
+
+
+def extract_member_with_handler(stream, member_name, output_dir, use_ocr=False, archive_path=None):
+    """نسخ عضو الأرشيف إلى MemberBuffer وتمريره إلى معالجه؛ المخرجات في <مسار العضو>_extracted
+    داخل output_dir. يعيد (الملفات، المعالجة، المتجاهلة)"""
+    member_path = os.path.join(output_dir, member_name)
+    target_dir = item_output_dirname(os.path.dirname(member_path),
+                                     os.path.splitext(os.path.basename(member_path))[0])
+    safe_makedirs(target_dir)
+    ext = pathlib.Path(member_name).suffix.lower()
+    if ext in DB_EXTENSIONS:
+        fd, tmp_path = tempfile.mkstemp(suffix=ext, prefix='.member_')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                shutil.copyfileobj(stream, tmp, COPY_CHUNK_SIZE)
+            # مفتاح الحالة من اسم العضو لا من المسار المؤقت، فتطابق العلامات المائية التشغيل التالي
+            state_key = f"{os.path.abspath(archive_path)}!{member_name}" if archive_path else member_name
+            files, _ = extract_db_direct_to_text(tmp_path, target_dir, state_key=state_key)
+        finally:
+            os.remove(tmp_path)
+        return files, int(bool(files)), int(not files)
+    with MemberBuffer(member_name) as buffer:
+        shutil.copyfileobj(stream, buffer, COPY_CHUNK_SIZE)
+        buffer.seek(0)
+        files, _, _ = extract_file_with_handler(buffer, target_dir, use_ocr=use_ocr)
+    return files, int(bool(files)), int(not files)
+
+
+@instrumented
+def extract_archive_to_files(archive_path, output_dir, archive_type="zip", use_ocr=False):
     """فك ضغط الأرشيف واستخراج كل ملف نصي إلى ملف في output_dir مع الحفاظ على الهيكل"""
     if not os.path.exists(archive_path):
         return [], 0, 0
@@ -571,6 +2223,7 @@ def extract_archive_to_files(archive_path, output_dir, archive_type="zip"):
         files_processed = 0
         files_skipped = 0
         created_files = []
+        detector = CharsetDetector(archive_path)
         
         for file_name in sorted(file_list):
             if file_name.endswith('/'):
@@ -579,33 +2232,27 @@ def extract_archive_to_files(archive_path, output_dir, archive_type="zip"):
                 files_skipped += 1
                 continue
             ext = pathlib.Path(file_name).suffix.lower()
-            if ext in EXCEL_EXTENSIONS or ext in WORD_EXTENSIONS or ext in PDF_EXTENSIONS:
-                files_skipped += 1
+            if ext in MEMBER_HANDLER_EXTENSIONS:
+                try:
+                    with archive.open(file_name, 'r') as f:
+                        files, processed, skipped = extract_member_with_handler(f, file_name, output_dir, use_ocr,
+                                                                                      archive_path)
+                    created_files.extend(files)
+                    files_processed += processed
+                    files_skipped += skipped
+                except Exception as e:
+                    print(f" ⚠️ خطأ في معالجة {file_name}: {str(e)}")
+                    files_skipped += 1
                 continue
             if ext in BINARY_EXTENSIONS:
                 files_skipped += 1
                 continue
             try:
-                if archive_type == "zip":
-                    content_bytes = archive.read(file_name)
-                else:
-                    with archive.open(file_name, 'r') as f:
-                        content_bytes = f.read()
-                if len(content_bytes) == 0:
+                with archive.open(file_name, 'r') as f:
+                    dest_path = decode_stream_to_file(f, os.path.join(output_dir, file_name), detector,
+                                                      fallback='latin-1')
+                if dest_path is None:
                     continue
-                try:
-                    content = content_bytes.decode('utf-8')
-                except UnicodeDecodeError:
-                    try:
-                        content = content_bytes.decode('latin-1')
-                    except:
-                        files_skipped += 1
-                        continue
-                dest_path = os.path.join(output_dir, file_name)
-                dest_dir = os.path.dirname(dest_path)
-                safe_makedirs(dest_dir)
-                with open(dest_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
                 created_files.append(dest_path)
                 files_processed += 1
             except Exception as e:
@@ -616,7 +2263,8 @@ def extract_archive_to_files(archive_path, output_dir, archive_type="zip"):
         print(f" ❌ حدث خطأ في الأرشيف: {str(e)}")
         return [], 0, 0
 
-def extract_tar_to_files(tar_path, output_dir):
+@instrumented
+def extract_tar_to_files(tar_path, output_dir, use_ocr=False):
     """استخراج أرشيف tar (بجميع صيغ الضغط) إلى ملفات منفصلة"""
     if not os.path.exists(tar_path):
         return [], 0, 0
@@ -639,6 +2287,7 @@ def extract_tar_to_files(tar_path, output_dir):
             processed = 0
             skipped = 0
             created_files = []
+            detector = CharsetDetector(tar_path)
             
             for member in members:
                 if member.isfile():
@@ -646,8 +2295,17 @@ def extract_tar_to_files(tar_path, output_dir):
                         skipped += 1
                         continue
                     file_ext = pathlib.Path(member.name).suffix.lower()
-                    if file_ext in EXCEL_EXTENSIONS or file_ext in WORD_EXTENSIONS or file_ext in PDF_EXTENSIONS:
-                        skipped += 1
+                    if file_ext in MEMBER_HANDLER_EXTENSIONS:
+                        try:
+                            with tar.extractfile(member) as f:
+                                files, done, failed = extract_member_with_handler(f, member.name, output_dir,
+                                                                                         use_ocr, tar_path)
+                            created_files.extend(files)
+                            processed += done
+                            skipped += failed
+                        except Exception as e:
+                            print(f" ⚠️ خطأ في معالجة {member.name}: {str(e)}")
+                            skipped += 1
                         continue
                     if file_ext in BINARY_EXTENSIONS:
                         skipped += 1
@@ -655,23 +2313,11 @@ def extract_tar_to_files(tar_path, output_dir):
                     try:
                         f = tar.extractfile(member)
                         if f:
-                            content_bytes = f.read()
-                            f.close()
-                            if len(content_bytes) == 0:
+                            with f:
+                                dest_path = decode_stream_to_file(f, os.path.join(output_dir, member.name), detector,
+                                                                  fallback='latin-1')
+                            if dest_path is None:
                                 continue
-                            try:
-                                content = content_bytes.decode('utf-8')
-                            except UnicodeDecodeError:
-                                try:
-                                    content = content_bytes.decode('latin-1')
-                                except:
-                                    skipped += 1
-                                    continue
-                            dest_path = os.path.join(output_dir, member.name)
-                            dest_dir = os.path.dirname(dest_path)
-                            safe_makedirs(dest_dir)
-                            with open(dest_path, 'w', encoding='utf-8') as f_out:
-                                f_out.write(content)
                             created_files.append(dest_path)
                             processed += 1
                     except Exception as e:
@@ -682,17 +2328,16 @@ def extract_tar_to_files(tar_path, output_dir):
         print(f" ❌ خطأ في معالجة TAR: {str(e)}")
         return [], 0, 0
 
+@instrumented
 def extract_gz_to_file(gz_path, output_dir):
     """فك ضغط ملف .gz مفرد (ليس tar) إلى ملف نصي"""
     try:
-        with gzip.open(gz_path, 'rt', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-        if len(content.strip()) == 0:
-            return [], 0, 1
         out_filename = os.path.splitext(os.path.basename(gz_path))[0] + ".txt"
-        out_path = os.path.join(output_dir, out_filename)
-        with open(out_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        with gzip.open(gz_path, 'rb') as f:
+            out_path = decode_stream_to_file(f, os.path.join(output_dir, out_filename), CharsetDetector(gz_path),
+                                             skip_blank=True, translate_newlines=True)
+        if out_path is None:
+            return [], 0, 1
         return [out_path], 1, 0
     except Exception as e:
         print(f" ❌ خطأ في معالجة GZ: {str(e)}")
@@ -705,6 +2350,86 @@ def extract_archive_to_single_file(archive_path, output_file, archive_type="zip"
     pass
 
 # ============ معالجة ملف واحد عادي (نصي) ============
+FICLONE = 0x40049409  # _IOW(0x94, 9, int): نسخ reflink في btrfs/xfs
+
+
+def scan_utf8_file(path, chunk_size=COPY_CHUNK_SIZE):
+    """فحص تدريجي على أجزاء دون تحميل الملف كاملاً؛ يعيد (UTF-8 صالح، يحتوي نصاً، يحتوي \\r)"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    has_text = False
+    has_cr = False
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            try:
+                text = decoder.decode(chunk, final=not chunk)
+            except UnicodeDecodeError:
+                return False, has_text, has_cr
+            if not has_text and text.strip():
+                has_text = True
+            if not has_cr and b'\r' in chunk:
+                has_cr = True
+            if not chunk:
+                return True, has_text, has_cr
+
+
+def kernel_copy(src_path, dst_path):
+    """نسخ الملف دون تمرير بياناته عبر بايثون: reflink ثم copy_file_range ثم sendfile، وإلا نسخ عادي.
+    يعيد اسم الطريقة المستخدمة."""
+    with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+        src_fd, dst_fd = src.fileno(), dst.fileno()
+        size = os.fstat(src_fd).st_size
+        if fcntl is not None and sys.platform.startswith('linux'):
+            try:
+                fcntl.ioctl(dst_fd, FICLONE, src_fd)
+                return 'reflink'
+            except OSError:
+                pass
+        for method in ('copy_file_range', 'sendfile'):
+            if not hasattr(os, method):
+                continue
+            offset = 0
+            try:
+                while offset < size:
+                    if method == 'copy_file_range':
+                        copied = os.copy_file_range(src_fd, dst_fd, size - offset, offset, offset)
+                    else:
+                        copied = os.sendfile(dst_fd, src_fd, offset, size - offset)
+                    if copied == 0:
+                        break
+                    offset += copied
+                return method
+            except OSError:
+                # غير مدعوم بين هذين النظامين (EXDEV/EINVAL/ENOSYS): نبدأ من جديد بالطريقة التالية
+                os.ftruncate(dst_fd, 0)
+                os.lseek(dst_fd, 0, os.SEEK_SET)
+        shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+        return 'copy'
+
+
+def copy_text_file(src_path, dest_path, detector=None):
+    """نسخ ملف نصي إلى dest_path (مع لاحقة الضغط إن وجدت)؛ يعيد مسار الناتج أو None إن كان فارغاً.
+    UTF-8 الصالح يُنسخ كما هو داخل النواة، والملفات التي تفشل في الفحص فقط يُكشف ترميزها
+    (detector مشترك بين ملفات المصدر نفسه) وتُفك على أجزاء.
+    الملفات التي تحتوي \\r تُنسخ نصياً لتحويل نهايات الأسطر كما في القراءة النصية العادية."""
+    valid, has_text, has_cr = scan_utf8_file(src_path)
+    if not valid:
+        with open(src_path, 'rb') as f:
+            return decode_stream_to_file(f, dest_path, detector or CharsetDetector(src_path),
+                                         skip_blank=True, translate_newlines=True)
+    if not has_text:
+        return None
+    out_path = output_name(dest_path)
+    safe_makedirs(os.path.dirname(out_path))
+    if has_cr or OUTPUT_COMPRESSION:
+        with open(src_path, 'r', encoding='utf-8') as f_in, open_text_output(out_path) as f_out:
+            shutil.copyfileobj(f_in, f_out, COPY_CHUNK_SIZE)
+    else:
+        kernel_copy(src_path, out_path)
+    return out_path
+
+
+@instrumented
 def extract_single_file_to_text(file_path, output_dir):
     """نسخ ملف نصي عادي إلى مجلد الإخراج مع إضافة امتداد .txt إذا لزم الأمر"""
     if not os.path.isfile(file_path):
@@ -713,19 +2438,54 @@ def extract_single_file_to_text(file_path, output_dir):
     if ext in BINARY_EXTENSIONS and ext not in DB_EXTENSIONS and ext not in WORD_EXTENSIONS and ext not in EXCEL_EXTENSIONS and ext not in HTML_EXTENSIONS and ext not in PDF_EXTENSIONS:
         return [], 0, 1
     try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-        if len(content.strip()) == 0:
+        out_path = copy_text_file(file_path, os.path.join(output_dir, os.path.basename(file_path) + ".txt"))
+        if out_path is None:
             return [], 0, 1
-        out_path = os.path.join(output_dir, os.path.basename(file_path) + ".txt")
-        with open(out_path, 'w', encoding='utf-8') as f:
-            f.write(content)
         return [out_path], 1, 0
     except Exception as e:
         print(f" ❌ خطأ في معالجة {file_path}: {str(e)}")
         return [], 0, 1
 
 # ============ المعالج الرئيسي ============
+def is_handled_file(file_path):
+    """هل للملف معالج مخصص (قاعدة بيانات، مستند، PDF، أرشيف) غير النسخ النصي"""
+    ext = pathlib.Path(file_path).suffix.lower()
+    return (ext in DB_EXTENSIONS or ext in EXCEL_EXTENSIONS or ext in WORD_EXTENSIONS or ext in HTML_EXTENSIONS
+            or ext in PDF_EXTENSIONS or ext in TAR_EXTENSIONS or ext in GZ_EXTENSIONS or ext == '.zip'
+            or (ext == '.rar' and rarfile is not None))
+
+
+def extract_file_with_handler(file_path, target_dir, use_ocr=False):
+    """توجيه ملف إلى معالجه حسب الامتداد مع الكتابة في target_dir؛ يعيد (الملفات، المعالجة، المتجاهلة)
+    أو None إن لم يكن له معالج (فيُعامل كملف نصي). file_path قد يكون MemberBuffer لعضو Office/PDF."""
+    name = source_name(file_path)
+    ext = pathlib.Path(name).suffix.lower()
+    if ext in DB_EXTENSIONS:
+        files, count = extract_db_direct_to_text(file_path, target_dir)
+        return files, count, 0
+    if ext in EXCEL_EXTENSIONS:
+        files, count = extract_excel_to_text(file_path, target_dir)
+        return files, count, 0
+    if ext in WORD_EXTENSIONS:
+        files, count = extract_docx_to_text(file_path, target_dir)
+        return files, count, 0
+    if ext in HTML_EXTENSIONS:
+        files, count = extract_html_to_text(file_path, target_dir)
+        return files, count, 0
+    if ext in PDF_EXTENSIONS:
+        files, count, _ = extract_pdf_advanced(file_path, target_dir, use_ocr=use_ocr)
+        return files, count, 0
+    if ext in TAR_EXTENSIONS or name.endswith('.tar.gz'):
+        return extract_tar_to_files(file_path, target_dir, use_ocr=use_ocr)
+    if ext == '.gz':
+        return extract_gz_to_file(file_path, target_dir)
+    if ext == '.zip':
+        return extract_archive_to_files(file_path, target_dir, "zip", use_ocr=use_ocr)
+    if ext == '.rar' and rarfile is not None:
+        return extract_archive_to_files(file_path, target_dir, "rar", use_ocr=use_ocr)
+    return None
+
+
 def process_single_item(item_path, via_excel=False, use_ocr=False):
     """معالجة عنصر واحد (ملف أو مجلد) وإنشاء مجلد مخصص له"""
     results = []  # (files_created, processed_count, skipped_count)
@@ -740,7 +2500,7 @@ def process_single_item(item_path, via_excel=False, use_ocr=False):
     name_without_ext = os.path.splitext(base_name)[0]
     
     # إنشاء مجلد الإخراج بجانب العنصر
-    target_dir = get_unique_dirname(output_dir, name_without_ext)
+    target_dir = item_output_dirname(output_dir, name_without_ext)
     safe_makedirs(target_dir)
     print(f"📁 سيتم حفظ المخرجات في: {target_dir}")
     
@@ -754,7 +2514,7 @@ def process_single_item(item_path, via_excel=False, use_ocr=False):
         # 1. قواعد البيانات
         if file_ext in DB_EXTENSIONS:
             if via_excel:
-                print(f"🗄️→📊→📄 معالجة قاعدة بيانات عبر Excel: {base_name}")
+                print(f"🗄️→📄 معالجة قاعدة بيانات بالتنسيق المقروء: {base_name}")
                 files, total_rows = extract_db_via_excel_to_text(item_path, target_dir)
                 results.append((files, total_rows, 0))
             else:
@@ -789,7 +2549,7 @@ def process_single_item(item_path, via_excel=False, use_ocr=False):
         # 6. أرشيفات TAR
         elif file_ext in TAR_EXTENSIONS or item_path.endswith('.tar.gz'):
             print(f"📦 معالجة ملف TAR: {base_name}")
-            files, processed, skipped = extract_tar_to_files(item_path, target_dir)
+            files, processed, skipped = extract_tar_to_files(item_path, target_dir, use_ocr=use_ocr)
             results.append((files, processed, skipped))
         
         # 7. ملفات GZ مفردة
@@ -801,11 +2561,11 @@ def process_single_item(item_path, via_excel=False, use_ocr=False):
         # 8. أرشيفات ZIP/RAR
         elif file_ext == '.zip':
             print(f"📦 معالجة ملف ZIP: {base_name}")
-            files, processed, skipped = extract_archive_to_files(item_path, target_dir, "zip")
+            files, processed, skipped = extract_archive_to_files(item_path, target_dir, "zip", use_ocr=use_ocr)
             results.append((files, processed, skipped))
         elif file_ext == '.rar' and rarfile is not None:
             print(f"📦 معالجة ملف RAR: {base_name}")
-            files, processed, skipped = extract_archive_to_files(item_path, target_dir, "rar")
+            files, processed, skipped = extract_archive_to_files(item_path, target_dir, "rar", use_ocr=use_ocr)
             results.append((files, processed, skipped))
         elif file_ext == '.rar' and rarfile is None:
             print(f"⚠️ ملف RAR يتجاهل (rarfile غير مثبت)")
@@ -826,6 +2586,7 @@ def process_single_item(item_path, via_excel=False, use_ocr=False):
         all_files = []
         processed = 0
         skipped = 0
+        detector = CharsetDetector(item_path)
         for root, dirs, files in os.walk(item_path):
             dirs[:] = [d for d in dirs if not d.startswith('.') and d != '__pycache__' and d != 'venv']
             for file in files:
@@ -834,64 +2595,25 @@ def process_single_item(item_path, via_excel=False, use_ocr=False):
                 if should_ignore_file(rel_path):
                     skipped += 1
                     continue
-                ext = pathlib.Path(file).suffix.lower()
-                # توجيه إلى المعالج المناسب حسب الامتداد
-                # (يمكن إعادة استخدام الدوال أعلاه ولكن مع وجهة target_dir)
+                # توجيه إلى المعالج المناسب حسب الامتداد، مع وجهة target_dir
                 try:
-                    if ext in DB_EXTENSIONS:
-                        f, cnt = extract_db_direct_to_text(full_path, target_dir)
-                        all_files.extend(f)
-                        processed += cnt
-                    elif ext in EXCEL_EXTENSIONS:
-                        f, cnt = extract_excel_to_text(full_path, target_dir)
-                        all_files.extend(f)
-                        processed += cnt
-                    elif ext in WORD_EXTENSIONS:
-                        f, cnt = extract_docx_to_text(full_path, target_dir)
-                        all_files.extend(f)
-                        processed += cnt
-                    elif ext in HTML_EXTENSIONS:
-                        f, cnt = extract_html_to_text(full_path, target_dir)
-                        all_files.extend(f)
-                        processed += cnt
-                    elif ext in PDF_EXTENSIONS:
-                        f, cnt, err = extract_pdf_advanced(full_path, target_dir, use_ocr=use_ocr)
-                        all_files.extend(f)
-                        processed += cnt
-                    elif ext in TAR_EXTENSIONS or full_path.endswith('.tar.gz'):
-                        f, p, s = extract_tar_to_files(full_path, target_dir)
-                        all_files.extend(f)
-                        processed += p
-                        skipped += s
-                    elif ext == '.gz' and not full_path.endswith('.tar.gz'):
-                        f, p, s = extract_gz_to_file(full_path, target_dir)
-                        all_files.extend(f)
-                        processed += p
-                        skipped += s
-                    elif ext == '.zip':
-                        f, p, s = extract_archive_to_files(full_path, target_dir, "zip")
-                        all_files.extend(f)
-                        processed += p
-                        skipped += s
-                    elif ext == '.rar' and rarfile is not None:
-                        f, p, s = extract_archive_to_files(full_path, target_dir, "rar")
+                    handled = extract_file_with_handler(full_path, target_dir, use_ocr=use_ocr)
+                    if handled is not None:
+                        f, p, s = handled
                         all_files.extend(f)
                         processed += p
                         skipped += s
                     else:
                         # ملف نصي عادي
-                        with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            content = f.read()
-                        if content.strip():
-                            dest_path = os.path.join(target_dir, rel_path + ".txt")
-                            dest_dir = os.path.dirname(dest_path)
-                            safe_makedirs(dest_dir)
-                            with open(dest_path, 'w', encoding='utf-8') as f_out:
-                                f_out.write(content)
-                            all_files.append(dest_path)
-                            processed += 1
-                        else:
-                            skipped += 1
+                        with measure_stage('copy_text_file', full_path) as sample:
+                            dest_path = copy_text_file(full_path, os.path.join(target_dir, rel_path + ".txt"), detector)
+                            if dest_path:
+                                all_files.append(dest_path)
+                                processed += 1
+                                sample['items'] = 1
+                                sample['output_bytes'] = _path_size(dest_path)
+                            else:
+                                skipped += 1
                 except Exception as e:
                     print(f" ⚠️ خطأ في معالجة {rel_path}: {str(e)}")
                     skipped += 1
@@ -902,19 +2624,183 @@ def process_single_item(item_path, via_excel=False, use_ocr=False):
     
     return results
 
+# ============ التحليل التفصيلي لكل عنصر (profiling) ============
+class ItemProfiler:
+    """تشغيل process_single_item تحت cProfile (ومع tracemalloc اختيارياً) وكتابة تقرير لكل عنصر.
+    لا تُكتب التقارير إلا للعناصر التي استغرقت threshold ثانية أو أكثر."""
+
+    def __init__(self, profile_dir, threshold=0.0, trace_alloc=False, top_n=30):
+        self.profile_dir = profile_dir
+        self.threshold = threshold
+        self.trace_alloc = trace_alloc
+        self.top_n = top_n
+        self._counter = 0
+        safe_makedirs(profile_dir)
+
+    def run(self, item_path, func, *args, **kwargs):
+        self._counter += 1
+        profiler = cProfile.Profile()
+        started_tracing = False
+        if self.trace_alloc and not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+            started_tracing = True
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            return func(item_path, *args, **kwargs)
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start
+            snapshot = None
+            peak = 0
+            if self.trace_alloc:
+                snapshot = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+            if started_tracing:
+                tracemalloc.stop()
+            if elapsed >= self.threshold:
+                self._write_reports(item_path, profiler, snapshot, peak, elapsed)
+
+    def _write_reports(self, item_path, profiler, snapshot, peak, elapsed):
+        name = os.path.basename(os.path.normpath(str(item_path))) or 'item'
+        safe_name = re.sub(r'[\\/*?:"<>|\s]', '_', name)[:100]
+        base = get_unique_filename(os.path.join(self.profile_dir, f"{self._counter:04d}_{safe_name}"), ".pstats")
+        base = base[:-len(".pstats")]
+        profiler.dump_stats(base + ".pstats")
+        with open(base + ".profile.txt", 'w', encoding='utf-8') as f:
+            f.write(f"# {item_path}\n# الزمن الكلي: {elapsed:.3f} ث\n\n")
+            stats = pstats.Stats(profiler, stream=f)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top_n)
+        written = [base + ".pstats", base + ".profile.txt"]
+        if snapshot is not None:
+            snapshot = snapshot.filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ))
+            with open(base + ".alloc.txt", 'w', encoding='utf-8') as f:
+                f.write(f"# {item_path}\n# ذروة الذاكرة المتتبعة: {peak / 1024 / 1024:.1f} MiB\n")
+                f.write(f"# أكبر {self.top_n} موضع تخصيص للذاكرة (ما زال محجوزاً عند نهاية العنصر)\n\n")
+                for stat in snapshot.statistics('lineno')[:self.top_n]:
+                    f.write(f"{stat.size / 1024:10.1f} KiB  {stat.count:8d} كتلة  {stat.traceback}\n")
+            written.append(base + ".alloc.txt")
+        print(f"🔬 تقرير التحليل ({elapsed:.2f} ث): {', '.join(os.path.basename(p) for p in written)}")
+
+def run_item_job(item_path, via_excel=False, use_ocr=False, profile=None):
+    """معالجة عنصر واحد داخل عملية عاملة وإرجاع ملخص قابل للتسلسل.
+    profile: قاموس معاملات ItemProfiler أو None. مقاييس العملية تُرفق ثم تُصفّر لتدمجها العملية الرئيسية."""
+    # العملية المنسوخة بـ fork ترث ما دمجته العملية الرئيسية من مقاييس؛ نبدأ من الصفر
+    METRICS.drain()
+    started = time.perf_counter()
+    try:
+        with measure_stage('process_single_item', item_path) as sample:
+            if profile:
+                results = ItemProfiler(**profile).run(item_path, process_single_item,
+                                                      via_excel=via_excel, use_ocr=use_ocr)
+            else:
+                results = process_single_item(item_path, via_excel=via_excel, use_ocr=use_ocr)
+            sample['items'] = sum(r[1] for r in results)
+            sample['output_bytes'] = sum(_path_size(p) for r in results for p in r[0])
+    except Exception as e:
+        return {'status': 'error', 'error': str(e), 'seconds': round(time.perf_counter() - started, 3),
+                'metrics': METRICS.drain()}
+    return {
+        'status': 'ok',
+        'files': sum(len(r[0]) for r in results),
+        'processed': sum(r[1] for r in results),
+        'skipped': sum(r[2] for r in results),
+        'seconds': round(time.perf_counter() - started, 3),
+        'metrics': METRICS.drain(),
+    }
+
+
+def _load_adaptive_pool():
+    try:
+        from scripts import adaptive_pool
+    except ImportError:
+        import adaptive_pool
+    return adaptive_pool
+
+
+def process_items_parallel(items, via_excel=False, use_ocr=False, profile=None,
+                           min_workers=1, max_workers=None, memory_budget_mb=None):
+    """معالجة عدة عناصر في عمليات متوازية بتزامن متكيف حسب الذاكرة والحمل"""
+    adaptive_pool = _load_adaptive_pool()
+    pool = adaptive_pool.AdaptivePool(min_workers=min_workers, max_workers=max_workers,
+                                      memory_budget_mb=memory_budget_mb)
+    print(f"⚙️ التوازي المتكيف: {pool.min_workers}-{pool.max_workers} عامل، ميزانية الذاكرة {pool.memory_budget_mb:.0f} MB")
+    for item in items:
+        cost, tag = adaptive_pool.estimate_job_memory(item, use_ocr=use_ocr)
+        if tag != 'normal':
+            print(f"   🏷️ {os.path.basename(item)}: {tag} (~{cost:.0f} MB)")
+        pool.submit(item, run_item_job, item, via_excel, use_ocr, profile, cost_mb=cost, tag=tag)
+    for item, ok, summary in pool.run_all():
+        if not ok:
+            summary = {'status': 'error', 'error': summary}
+        METRICS.merge(summary.pop('metrics', {}))
+        yield item, summary
+
 def main():
+    global DB_EXPORT_WORKERS, SHEET_WORKERS, HTML_ENGINE, TABLE_OUTPUT_FORMAT, DB_INCREMENTAL, DB_WATERMARK_COLUMN, DB_STATE_PATH, DB_EXTRACT_BLOBS
+    global DB_SAMPLE_ROWS, DB_SAMPLE_MODE, DB_SAMPLE_SEED, DB_SPLIT_ROWS
+    parser = argparse.ArgumentParser(description="استخراج النصوص من الأرشيفات والمستندات وقواعد البيانات إلى ملفات نصية.")
+    parser.add_argument('--via-excel', action='store_true',
+                        help='تصدير قواعد البيانات بالتنسيق المقروء (تواريخ ص/م) كما في مسار Excel السابق')
+    parser.add_argument('--table-format', '--db-format', dest='table_format', choices=['tsv', 'parquet', 'arrow'],
+                        default='tsv', help='صيغة مخرجات جداول قواعد البيانات وأوراق Excel؛ parquet و arrow '
+                                            '(Arrow IPC قابل للـ memory-map) بأنواع الأعمدة ويتطلبان pyarrow')
+    parser.add_argument('--html-engine', choices=['auto', 'lxml', 'bs4'], default='auto',
+                        help='محرك استخراج نص HTML: lxml (الأسرع، الافتراضي إن وُجدت) أو BeautifulSoup')
+    parser.add_argument('--ocr', action='store_true', help='تشغيل OCR على صفحات PDF التي لا تحتوي على نص')
+    parser.add_argument('--metrics-json', metavar='PATH', help='كتابة تقرير JSON بمقاييس كل مرحلة')
+    parser.add_argument('--metrics-prom', metavar='PATH', help='كتابة المقاييس بصيغة Prometheus textfile لـ node_exporter')
+    parser.add_argument('--profile', nargs='?', const='profiles', metavar='DIR',
+                        help='تحليل كل عنصر عبر cProfile وكتابة ملف .pstats وتقرير نصي في DIR (الافتراضي: profiles)')
+    parser.add_argument('--profile-threshold', type=float, default=0.0, metavar='SECONDS',
+                        help='عدم كتابة تقارير التحليل إلا للعناصر الأبطأ من هذا الزمن')
+    parser.add_argument('--profile-alloc', action='store_true', help='إضافة لقطة tracemalloc بأكبر مواضع تخصيص الذاكرة')
+    parser.add_argument('--profile-top', type=int, default=30, metavar='N', help='عدد الأسطر في تقارير التحليل')
+    parser.add_argument('--workers', type=int, default=1, metavar='N',
+                        help='الحد الأعلى للعناصر المعالجة بالتوازي (يتكيف التزامن آلياً حسب الذاكرة والحمل)')
+    parser.add_argument('--min-workers', type=int, default=1, metavar='N', help='الحد الأدنى للتزامن في الوضع المتوازي')
+    parser.add_argument('--memory-budget', type=float, metavar='MB',
+                        help='ميزانية الذاكرة للوضع المتوازي (الافتراضي 70%% من الذاكرة المتاحة)')
+    parser.add_argument('--db-workers', type=int, default=1, metavar='N',
+                        help='تصدير جداول قاعدة البيانات الواحدة بالتوازي في N عملية (الأكبر أولاً)')
+    parser.add_argument('--sheet-workers', type=int, default=1, metavar='N',
+                        help='تصدير أوراق مصنف XLSX الواحد بالتوازي في N عملية، كل منها تفتح المصنف للقراءة فقط')
+    parser.add_argument('--split-rows', type=int, default=DB_SPLIT_ROWS, metavar='N',
+                        help='مع --db-workers: تقسيم الجدول الأكبر من N صف إلى مديات rowid متوازية (0 = بلا تقسيم)')
+    parser.add_argument('--incremental', choices=['append', 'delta'],
+                        help='تصدير الصفوف الجديدة فقط منذ التشغيل السابق: إلحاقاً بملف الجدول أو كملف دلتا منفصل')
+    parser.add_argument('--watermark-column', metavar='COL',
+                        help='عمود updated_at للعلامة المائية بدلاً من rowid (للجداول التي تحتويه)')
+    parser.add_argument('--extract-blobs', action='store_true',
+                        help='كتابة BLOB إلى ملفات جانبية (PDF، DOCX، ZIP ...) ومعالجتها، والإشارة إليها بمعرّفها في TSV')
+    parser.add_argument('--sample', type=int, metavar='N',
+                        help='تصدير عينة من N صف لكل جدول بدلاً من الجدول كاملاً (للمعاينة السريعة)')
+    parser.add_argument('--sample-mode', choices=['stratified', 'uniform'], default='stratified',
+                        help='stratified: صف من كل شريحة متساوية من مدى rowid؛ uniform: مواضع عشوائية')
+    parser.add_argument('--sample-seed', type=int, default=0, help='بذرة العينة (النتيجة نفسها عند تكرارها)')
+    parser.add_argument('--db-state', metavar='PATH',
+                        help=f'ملف حالة التصدير التزايدي (الافتراضي: <مجلد المخرجات>/{DB_STATE_NAME})')
+    parser.add_argument('--compress', choices=['none', 'gzip', 'zstd'], default='none',
+                        help='ضغط المخرجات النصية أثناء كتابتها (zstd تتطلب مكتبة zstandard)')
+    parser.add_argument('--compress-level', type=int, metavar='N', help='مستوى الضغط (الافتراضي: gzip 6، zstd 3)')
+    parser.add_argument('files', nargs='+', help='الملفات أو المجلدات المراد معالجتها')
+
     print("🔍 فحص المكتبات المثبتة:")
     print(f" ✓ zipfile: مثبت")
     print(f" ✓ tarfile: مثبت")
     print(f" ✓ gzip: مثبت")
     print(f" ✓ sqlite3: مثبت")
-    print(f" ✓ python-docx: {'مثبت' if docx else 'غير مثبت'}")
     print(f" ✓ pandas: {'مثبت' if pd else 'غير مثبت'}")
     print(f" ✓ beautifulsoup4: {'مثبت' if bs4 else 'غير مثبت'}")
+    print(f" ✓ lxml: {'مثبت' if lxml_etree is not None else 'غير مثبت'}")
     print(f" ✓ rarfile: {'مثبت' if rarfile else 'غير مثبت'}")
     print(f" ✓ pdfplumber: {'مثبت' if pdfplumber else 'غير مثبت'}")
     print(f" ✓ PIL: {'مثبت' if PIL else 'غير مثبت'}")
     print(f" ✓ pytesseract: {'مثبت' if pytesseract else 'غير مثبت (OCR معطل)'}")
+    print(f" ✓ chardet: {'مثبت' if chardet else 'غير مثبت (كشف الترميز معطل)'}")
     print()
     
     if len(sys.argv) < 2:
@@ -924,41 +2810,115 @@ def main():
         print("2. سطر الأوامر:")
         print("   python script.py [--via-excel] [--ocr] ملف1 ملف2 ...")
         print("الخيارات:")
-        print("   --via-excel : تحويل قواعد البيانات عبر Excel (موصى به)")
-        print("   --ocr       : تشغيل OCR على صفحات PDF التي لا تحتوي على نص")
+        print("   --via-excel         : تصدير قواعد البيانات بالتنسيق المقروء (تواريخ ص/م)")
+        print("   --ocr               : تشغيل OCR على صفحات PDF التي لا تحتوي على نص")
+        print("   --metrics-json PATH : تقرير JSON بالزمن والبايتات لكل مرحلة")
+        print("   --metrics-prom PATH : ملف Prometheus textfile لـ node_exporter")
+        print("   --profile [DIR]     : تقرير cProfile لكل عنصر (مع --profile-threshold و --profile-alloc)")
+        print("   --workers N         : معالجة متوازية متكيفة حسب الذاكرة والحمل (مع --memory-budget)")
+        print("   --compress gzip|zstd: كتابة المخرجات النصية مضغوطة مباشرة")
+        print("   --db-workers N      : تصدير جداول قاعدة البيانات بالتوازي")
+        print("   --sheet-workers N   : تصدير أوراق Excel بالتوازي")
         print("=" * 60)
         input("اضغط Enter للخروج...")
         return
     
-    via_excel = "--via-excel" in sys.argv
-    use_ocr = "--ocr" in sys.argv
-    args = [arg for arg in sys.argv[1:] if arg not in ("--via-excel", "--ocr")]
+    args = parser.parse_args()
+    via_excel = args.via_excel
+    use_ocr = args.ocr
     
     if via_excel:
-        print("💡 استخدام التحويل عبر Excel للقواعد البيانات")
+        print(f"💡 تصدير قواعد البيانات بالتنسيق المقروء ({args.table_format})")
     if use_ocr:
         print("💡 تشغيل OCR على PDF")
+    DB_EXPORT_WORKERS = max(1, args.db_workers)
+    SHEET_WORKERS = max(1, args.sheet_workers)
+    HTML_ENGINE = args.html_engine
+    DB_SPLIT_ROWS = max(0, args.split_rows)
+    TABLE_OUTPUT_FORMAT = args.table_format
+    DB_INCREMENTAL = args.incremental
+    DB_WATERMARK_COLUMN = args.watermark_column
+    DB_STATE_PATH = os.path.abspath(args.db_state) if args.db_state else None
+    DB_EXTRACT_BLOBS = args.extract_blobs
+    if args.sample is not None and args.sample < 1:
+        parser.error('--sample يجب أن يكون عدداً موجباً')
+    if args.sample and args.incremental:
+        parser.error('--sample لا يُجمع مع --incremental')
+    DB_SAMPLE_ROWS, DB_SAMPLE_MODE, DB_SAMPLE_SEED = args.sample, args.sample_mode, args.sample_seed
+    if set_output_compression(args.compress, args.compress_level):
+        print(f"💡 ضغط المخرجات: {OUTPUT_COMPRESSION}")
+    profiler = None
+    if args.profile:
+        profiler = ItemProfiler(args.profile, threshold=args.profile_threshold,
+                                trace_alloc=args.profile_alloc, top_n=args.profile_top)
+        print(f"🔬 التحليل التفصيلي مفعل: {args.profile}")
     
-    all_files_created = []
+    files_created = 0
     total_processed = 0
     total_skipped = 0
+    run_started = datetime.datetime.now()
     
-    print(f"\n🎯 تم العثور على {len(args)} عنصر للمعالجة:")
-    for i, item in enumerate(args, 1):
-        print(f"\n[{i}/{len(args)}] {'='*50}")
-        results = process_single_item(item, via_excel=via_excel, use_ocr=use_ocr)
-        for files, proc, skip in results:
-            all_files_created.extend(files)
-            total_processed += proc
-            total_skipped += skip
-        print(f"✓ اكتمل: {len(files)} ملف منشأ")
+    print(f"\n🎯 تم العثور على {len(args.files)} عنصر للمعالجة:")
+    if args.workers > 1 and len(args.files) > 1:
+        profile = None
+        if profiler:
+            profile = {'profile_dir': os.path.abspath(args.profile), 'threshold': args.profile_threshold,
+                       'trace_alloc': args.profile_alloc, 'top_n': args.profile_top}
+        finished = process_items_parallel(args.files, via_excel=via_excel, use_ocr=use_ocr, profile=profile,
+                                          min_workers=args.min_workers, max_workers=args.workers,
+                                          memory_budget_mb=args.memory_budget)
+        for i, (item, summary) in enumerate(finished, 1):
+            if summary['status'] == 'ok':
+                files_created += summary['files']
+                total_processed += summary['processed']
+                total_skipped += summary['skipped']
+                print(f"[{i}/{len(args.files)}] ✓ {os.path.basename(item)}: {summary['files']} ملف منشأ ({summary['seconds']} ث)")
+            else:
+                print(f"[{i}/{len(args.files)}] ❌ {os.path.basename(item)}: {summary['error']}")
+    else:
+        for i, item in enumerate(args.files, 1):
+            print(f"\n[{i}/{len(args.files)}] {'='*50}")
+            with measure_stage('process_single_item', item) as sample:
+                if profiler:
+                    results = profiler.run(item, process_single_item, via_excel=via_excel, use_ocr=use_ocr)
+                else:
+                    results = process_single_item(item, via_excel=via_excel, use_ocr=use_ocr)
+                files = []
+                for files, proc, skip in results:
+                    files_created += len(files)
+                    total_processed += proc
+                    total_skipped += skip
+                    sample['items'] += proc
+                    sample['output_bytes'] += sum(_path_size(p) for p in files)
+            print(f"✓ اكتمل: {len(files)} ملف منشأ")
     
     print("\n" + "=" * 60)
     print("📊 ملخص المعالجة النهائي:")
     print("=" * 60)
-    print(f"📁 عدد الملفات النصية المنشأة: {len(all_files_created)}")
+    print(f"📁 عدد الملفات النصية المنشأة: {files_created}")
     print(f"📄 إجمالي العناصر المعالجة: {total_processed}")
     print(f"🚫 إجمالي العناصر المتجاهلة: {total_skipped}")
+    if DB_SAMPLE_ROWS:
+        print(f"🎲 الجداول الأكبر من {DB_SAMPLE_ROWS} صف صُدّرت كعينة ({DB_SAMPLE_MODE})، لا كاملة")
+    
+    stages = METRICS.snapshot()
+    if stages:
+        print("\n⏱️ زمن المراحل:")
+        for stage, entry in sorted(stages.items(), key=lambda kv: -kv[1]['wall_seconds']):
+            print(f"   {stage}: {entry['wall_seconds']:.2f} ث (معالج {entry['cpu_seconds']:.2f} ث)، "
+                  f"{entry['calls']} استدعاء، {entry['errors']} خطأ")
+    if args.metrics_json:
+        METRICS.write_json(args.metrics_json,
+                           started_at=run_started.isoformat(timespec='seconds'),
+                           finished_at=datetime.datetime.now().isoformat(timespec='seconds'),
+                           inputs=args.files,
+                           files_created=files_created,
+                           total_processed=total_processed,
+                           total_skipped=total_skipped)
+        print(f"📈 تقرير المقاييس: {args.metrics_json}")
+    if args.metrics_prom:
+        METRICS.write_prometheus(args.metrics_prom)
+        print(f"📈 ملف Prometheus: {args.metrics_prom}")
     
     print("\n✅ اكتملت المعالجة!")
     print("📅 التاريخ: " + datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""إعداد مشترك للاختبارات: جذر المشروع في مسار الاستيراد وأدوات توليد المدخلات"""
+
+import os
+import sys
+import sqlite3
+import zipfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from scripts import zip_rar_folder2txt as extractor  # noqa: E402
+
+
+@pytest.fixture
+def ext(monkeypatch):
+    """الوحدة بخياراتها الافتراضية؛ ما يغيّره الاختبار عبر monkeypatch يُستعاد بعده"""
+    monkeypatch.setattr(extractor, 'DB_INCREMENTAL', None)
+    monkeypatch.setattr(extractor, 'DB_STATE_PATH', None)
+    return extractor
+
+
+def make_db(path, rows, table='items'):
+    """قاعدة SQLite صغيرة بجدول (id, name, score) وصفوف من rows"""
+    conn = sqlite3.connect(path)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER, name TEXT, score REAL)")
+    conn.executemany(f"INSERT INTO {table} VALUES (?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    return str(path)
+
+
+def read_tsv(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.rstrip('\n').split('\t') for line in f]
+
+
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+
+def _paragraph(text):
+    return f'<w:p><w:r><w:t>{text}</w:t></w:r></w:p>'
+
+
+def _row(*cells):
+    return '<w:tr>' + ''.join(f'<w:tc>{_paragraph(c)}</w:tc>' for c in cells) + '</w:tr>'
+
+
+def make_docx(path_or_file):
+    """مستند Word صغير: فقرة ثم جدول ثم فقرة، مع رأس صفحة وحاشية"""
+    body = (_paragraph('قبل الجدول') + '<w:tbl>' + _row('أ1', 'ب1') + _row('أ2', 'ب2') + '</w:tbl>'
+            + _paragraph('بعد الجدول'))
+    with zipfile.ZipFile(path_or_file, 'w') as z:
+        z.writestr('word/document.xml', f'<w:document {W}><w:body>{body}</w:body></w:document>')
+        z.writestr('word/footer1.xml', f'<w:ftr {W}>{_paragraph("تذييل")}</w:ftr>')
+        z.writestr('word/header1.xml', f'<w:hdr {W}>{_paragraph("رأس")}</w:hdr>')
+        z.writestr('word/footnotes.xml', f'<w:footnotes {W}><w:footnote>{_paragraph("حاشية")}</w:footnote></w:footnotes>')
+    return path_or_file
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""اختبارات AdaptivePool: القبول حسب الميزانية، تكيف الحد مع RSS، وإعادة المهمة المقتولة مرة واحدة"""
+
+import os
+import time
+import signal
+
+import pytest
+
+from scripts import adaptive_pool
+
+
+class FakeCpu:
+    def __init__(self, load):
+        self.load = load
+
+    def sample(self):
+        return self.load
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def _die_once(marker):
+    """تقتل نفسها بالإشارة في المحاولة الأولى فقط، كما يفعل OOM killer"""
+    if not os.path.exists(marker):
+        open(marker, 'w').close()
+        os.kill(os.getpid(), signal.SIGKILL)
+    return 'نجحت'
+
+
+def _always_die():
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+@pytest.fixture
+def rss(monkeypatch):
+    """قارئ RSS وهمي: القيمة بالميغابايت تُضبط من الاختبار"""
+    reading = {'mb': 0}
+    monkeypatch.setattr(adaptive_pool, 'process_tree_rss', lambda root_pid=None: reading['mb'] * adaptive_pool.MB)
+    monkeypatch.setattr(adaptive_pool, 'available_memory', lambda: None)
+    return reading
+
+
+def test_admission_waits_for_memory_budget(rss):
+    pool = adaptive_pool.AdaptivePool(min_workers=3, max_workers=3, memory_budget_mb=100, verbose=False)
+    for i in range(3):
+        pool.submit(i, _sleep, 0.3, cost_mb=60)
+    pool.poll(timeout=0)
+    # مهمتان بكلفة 60 لا تتسعان معاً في ميزانية 100
+    assert len(pool.running) == 1 and len(pool.queue) == 2
+    results = sorted(pool.run_all())
+    assert results == [(0, True, 0.3), (1, True, 0.3), (2, True, 0.3)]
+    assert pool.reserved_mb == 0
+
+
+def test_limit_grows_when_idle_and_shrinks_under_rss_pressure(rss):
+    pool = adaptive_pool.AdaptivePool(min_workers=1, max_workers=4, memory_budget_mb=1000, interval=0,
+                                      verbose=False)
+    pool._cpu = FakeCpu(0.1)
+    for i in range(8):
+        pool.submit(i, _sleep, 30, cost_mb=10)
+    rss['mb'] = 100
+    # الحد يزيد واحداً في كل تعديل ما دامت كل الأماكن مشغولة والمعالج خاملاً
+    for _ in range(3):
+        pool.poll(timeout=0)
+    assert pool.limit == 3 and len(pool.running) == 3
+
+    rss['mb'] = 950
+    pool.poll(timeout=0)
+    assert pool.limit == 2
+    rss['mb'] = 100
+    pool._cpu.load = 0.99
+    pool.poll(timeout=0)
+    # المعالج مشغول: لا زيادة رغم انخفاض الذاكرة
+    assert pool.limit == 2
+    pool.shutdown(cancel=True)
+
+
+def test_killed_job_retried_once_alone(rss, tmp_path):
+    pool = adaptive_pool.AdaptivePool(min_workers=1, max_workers=4, memory_budget_mb=1000, verbose=False)
+    pool.limit = 4
+    pool.submit('flaky', _die_once, str(tmp_path / 'marker'))
+    pool.submit('doomed', _always_die)
+    results = {key: (ok, result) for key, ok, result in pool.run_all()}
+
+    assert results['flaky'] == (True, 'نجحت')
+    assert results['doomed'][0] is False
+    assert 'SIGKILL' in results['doomed'][1]
+    assert pool.limit == 1
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""اختبارات كشف الترميز (CharsetDetector) وفك التدفقات في zip_rar_folder2txt.py"""
+
+import io
+
+import pytest
+
+ARABIC = [
+    "مرحباً بكم في هذا الملف النصي الذي يحتوي على جمل عربية لاختبار كشف الترميز.\n" * 20,
+    "تقرير المبيعات الشهري: ارتفعت المبيعات في المنطقة الشرقية بنسبة عشرة بالمئة.\n" * 20,
+    "ملاحظات الاجتماع الأسبوعي حول خطة العمل والمواعيد القادمة للفريق.\n" * 20,
+]
+
+
+def _decode(ext, detector, data, path):
+    dest = ext.decode_stream_to_file(io.BytesIO(data), str(path), detector, fallback='latin-1')
+    with open(dest, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_windows_1256_members_detected_once_then_cached(ext, tmp_path):
+    pytest.importorskip('chardet')
+    detector = ext.CharsetDetector('archive.zip')
+    for index, text in enumerate(ARABIC):
+        assert _decode(ext, detector, text.encode('cp1256'), tmp_path / f'{index}.txt') == text
+    assert detector.cached == 'cp1256'
+    assert (detector.detections, detector.cache_hits) == (1, 2)
+    # UTF-8 لا يمر على الذاكرة ولا على chardet
+    assert _decode(ext, detector, ARABIC[0].encode('utf-8'), tmp_path / 'utf8.txt') == ARABIC[0]
+    assert (detector.detections, detector.cache_hits) == (1, 2)
+
+
+def test_low_confidence_detection_is_not_reused(ext, monkeypatch, tmp_path):
+    chardet = pytest.importorskip('chardet')
+    monkeypatch.setattr(chardet, 'detect', lambda sample: {'encoding': 'windows-1251', 'confidence': 0.35})
+    detector = ext.CharsetDetector('archive.zip')
+    text = "Привет мир\n" * 10
+    assert _decode(ext, detector, text.encode('cp1251'), tmp_path / 'a.txt') == text
+    assert detector.cached is None
+    # الكشف الضعيف لا يُخزن، فالملف الشقيق يُكشف من جديد بدلاً من فكه بـ cp1251 دون تحقق
+    _decode(ext, detector, ARABIC[0].encode('cp1256'), tmp_path / 'b.txt')
+    assert (detector.detections, detector.cache_hits) == (2, 0)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""اختبارات chat_export.py: كشف التخطيط، ذاكرة البصمات المؤقتة، واستخراج الأدوار إلى JSONL"""
+
+import json
+
+import pytest
+
+from scripts import chat_export
+
+pytestmark = pytest.mark.skipif(chat_export.lxml_etree is None, reason='lxml غير مثبتة')
+
+CHATGPT_PAGE = """<!DOCTYPE html>
+<!-- saved from url=(0040)https://chatgpt.com/c/{cid} -->
+<html><head><meta charset="utf-8"><title>{title} | ChatGPT</title>
+<script>window.__state = {{"hidden": "لا يظهر"}};</script></head>
+<body><nav>الشريط الجانبي</nav>
+<main>
+<div data-message-author-role="user"><div>ما هي عاصمة <b>مصر</b>؟</div></div>
+<div data-message-author-role="assistant">
+  <p>العاصمة هي القاهرة.</p>
+  <ul><li>أكبر مدينة عربية</li><li>على نهر النيل</li></ul>
+  <button>نسخ</button><span class="sr-only">مخفي</span>
+</div>
+<div data-message-author-role="user"><div>ومثال شيفرة؟</div></div>
+<div data-message-author-role="assistant"><pre>def f():
+    return 1</pre></div>
+</main></body></html>
+"""
+
+CLAUDE_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>خطة الرحلة - Claude</title>
+<link rel="canonical" href="https://claude.ai/chat/abc"></head>
+<body>
+<div data-testid="user-message"><p>اقترح خطة ليوم واحد</p></div>
+<div class="font-claude-message"><p>الصباح: متحف.</p><p>المساء: <em>عشاء</em> على البحر.</p>
+<button>Copy</button></div>
+</body></html>
+"""
+
+UNKNOWN_PAGE = """<html><head><title>مدونة</title></head><body><p>مقال عادي</p></body></html>"""
+
+
+@pytest.fixture
+def pages(monkeypatch, tmp_path):
+    """مجلد صفحات محفوظة وذاكرة بصمات فارغة لكل اختبار"""
+    monkeypatch.setattr(chat_export, '_LAYOUT_CACHE', {})
+    monkeypatch.setattr(chat_export, '_CACHE_STATS', {'hits': 0, 'misses': 0})
+    folder = tmp_path / 'pages'
+    folder.mkdir()
+    (folder / 'a_chatgpt.html').write_text(CHATGPT_PAGE.format(cid='1', title='العواصم'), encoding='utf-8')
+    (folder / 'b_chatgpt.html').write_text(CHATGPT_PAGE.format(cid='2', title='أسئلة'), encoding='utf-8')
+    (folder / 'c_claude.html').write_text(CLAUDE_PAGE, encoding='utf-8')
+    (folder / 'd_blog.htm').write_text(UNKNOWN_PAGE, encoding='utf-8')
+    return folder
+
+
+def _export(folder, tmp_path):
+    out = tmp_path / 'conversations.jsonl'
+    stats = chat_export.export_conversations([str(folder)], str(out))
+    with open(out, encoding='utf-8') as f:
+        return stats, [json.loads(line) for line in f]
+
+
+def test_layout_detection(pages):
+    for name, expected in (('a_chatgpt.html', 'chatgpt'), ('c_claude.html', 'claude'), ('d_blog.htm', None)):
+        path = str(pages / name)
+        assert chat_export.detect_layout(path, chat_export.page_head(path)) == expected
+
+
+def test_signature_cache_reused_for_same_site(pages):
+    first, second = (str(pages / name) for name in ('a_chatgpt.html', 'b_chatgpt.html'))
+    assert chat_export.detect_layout(first, chat_export.page_head(first)) == 'chatgpt'
+    # صفحة ثانية من المضيف نفسه لا تُفحص علاماتها
+    assert chat_export.layout_signature(chat_export.page_head(second)) == ('chatgpt.com', None, None)
+    assert chat_export.detect_layout(second, chat_export.page_head(second)) == 'chatgpt'
+    assert chat_export._CACHE_STATS == {'hits': 1, 'misses': 1}
+    assert chat_export._LAYOUT_CACHE == {('chatgpt.com', None, None): 'chatgpt'}
+
+
+def test_export_turns_jsonl(pages, tmp_path):
+    stats, records = _export(pages, tmp_path)
+    assert (stats['pages'], stats['conversations'], stats['turns'], stats['unknown']) == (4, 3, 10, 1)
+    assert stats['failed'] == 0 and stats['empty'] == 0
+    assert chat_export._CACHE_STATS['hits'] == 1
+
+    chatgpt, _, claude = records
+    assert chatgpt['layout'] == 'chatgpt'
+    assert chatgpt['title'] == 'العواصم'
+    assert chatgpt['url'] == 'https://chatgpt.com/c/1'
+    assert chatgpt['turns'] == [
+        {'role': 'user', 'text': 'ما هي عاصمة مصر؟'},
+        {'role': 'assistant', 'text': 'العاصمة هي القاهرة.\nأكبر مدينة عربية\nعلى نهر النيل'},
+        {'role': 'user', 'text': 'ومثال شيفرة؟'},
+        {'role': 'assistant', 'text': 'def f():\n    return 1'},
+    ]
+
+    assert claude['layout'] == 'claude'
+    assert claude['title'] == 'خطة الرحلة'
+    assert claude['url'] == 'https://claude.ai/chat/abc'
+    assert claude['turns'] == [
+        {'role': 'user', 'text': 'اقترح خطة ليوم واحد'},
+        {'role': 'assistant', 'text': 'الصباح: متحف.\nالمساء: عشاء على البحر.'},
+    ]
@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+"""اختبارات مسارات تصدير SQLite في zip_rar_folder2txt.py"""
+
+import io
+import os
+import csv
+import gzip
+import json
+import sqlite3
+import zipfile
+
+import pytest
+
+from conftest import make_db, make_docx, read_tsv
+
+
+# ============ التصدير التدفقي ============
+def test_streaming_tsv_export_handles_nulls_blobs_and_quoting(ext, tmp_path):
+    conn = sqlite3.connect(tmp_path / 'app.db')
+    conn.execute("CREATE TABLE notes (id INTEGER, body TEXT, payload BLOB)")
+    conn.executemany("INSERT INTO notes VALUES (?, ?, ?)", [
+        (1, 'سطر\tمع tab', None),
+        (2, None, b'\x00\x01'),
+        (3, 'سطران\nفي خلية', None),
+        (4, 'عادي', None),
+        (5, 'علامة "تنصيص"', None),
+    ])
+    out_path = tmp_path / 'notes.tsv'
+
+    # دفعات من صفين: الصفوف تعبر عدة استدعاءات fetchmany
+    rows = ext.export_table_tsv(conn, 'notes', str(out_path), batch_size=2)
+    conn.close()
+
+    assert rows == 5
+    with open(out_path, encoding='utf-8', newline='') as f:
+        assert list(csv.reader(f, delimiter='\t')) == [
+            ['id', 'body', 'payload'],
+            ['1', 'سطر\tمع tab', 'NULL'],
+            ['2', 'NULL', '<binary data>'],
+            ['3', 'سطران\nفي خلية', 'NULL'],
+            ['4', 'عادي', 'NULL'],
+            ['5', 'علامة "تنصيص"', 'NULL'],
+        ]
+
+
+# ============ التصدير المتوازي ============
+def _export_dir(ext, db_path, out_dir):
+    out_dir.mkdir()
+    files, rows = ext.extract_db_direct_to_text(db_path, str(out_dir))
+    contents = {os.path.basename(p): read_tsv(p) for p in files}
+    return sorted(os.listdir(out_dir)), contents, rows
+
+
+def test_parallel_export_matches_serial(ext, monkeypatch, tmp_path):
+    db_path = make_db(tmp_path / 'app.db', [(i, f'n{i}', i / 4) for i in range(300)])
+    make_db(db_path, [(i, f'm{i}', None) for i in range(7)], table='small')
+    make_db(db_path, [], table='empty')
+    serial = _export_dir(ext, db_path, tmp_path / 'serial')
+
+    monkeypatch.setattr(ext, 'DB_EXPORT_WORKERS', 2)
+    parallel = _export_dir(ext, db_path, tmp_path / 'parallel')
+
+    assert parallel == serial
+    assert serial[0] == ['empty.tsv', 'items.tsv', 'small.tsv']
+    assert serial[2] == 307
+
+
+def test_split_table_ranges_concatenate_in_order(ext, monkeypatch, tmp_path, capsys):
+    db_path = make_db(tmp_path / 'app.db', [(i, f'n{i}', i / 4) for i in range(500)])
+    conn = sqlite3.connect(db_path)
+    conn.execute("DELETE FROM items WHERE id % 7 = 0")  # فجوات في rowid
+    conn.commit()
+    conn.close()
+    serial = _export_dir(ext, db_path, tmp_path / 'serial')
+
+    monkeypatch.setattr(ext, 'DB_EXPORT_WORKERS', 2)
+    monkeypatch.setattr(ext, 'DB_SPLIT_ROWS', 100)
+    split = _export_dir(ext, db_path, tmp_path / 'split')
+    assert 'مقسم إلى' in capsys.readouterr().out
+    assert split == serial
+
+    # أجزاء gzip تُدمج كإطارات متتالية دون فك الضغط
+    monkeypatch.setattr(ext, 'OUTPUT_COMPRESSION', 'gzip')
+    out_dir = tmp_path / 'gz'
+    out_dir.mkdir()
+    files, _ = ext.extract_db_direct_to_text(db_path, str(out_dir))
+    assert os.listdir(out_dir) == ['items.tsv.gz']
+    with gzip.open(files[0], 'rt', encoding='utf-8') as f:
+        assert [line.rstrip('\n').split('\t') for line in f] == serial[1]['items.tsv']
+
+
+def _write_parts(tmp_path, chunks):
+    paths = []
+    for index, chunk in enumerate(chunks):
+        path = tmp_path / f'items.tsv.part{index:04d}'
+        path.write_bytes(chunk)
+        paths.append(str(path))
+    return paths
+
+
+def test_concat_part_files_copies_inside_the_kernel(ext, monkeypatch, tmp_path):
+    if not hasattr(os, 'copy_file_range'):
+        pytest.skip('copy_file_range غير متاحة على هذا النظام')
+    chunks = [b'id\tname\n1\ta\n', b'2\tb\n' * 1000, b'', b'3\tc\n']
+    parts = _write_parts(tmp_path, chunks)
+
+    def no_userspace_copy(*args, **kwargs):
+        raise AssertionError('المسار الاحتياطي في بايثون استُخدم بدلاً من copy_file_range')
+    monkeypatch.setattr(ext.shutil, 'copyfileobj', no_userspace_copy)
+    ext.concat_part_files(str(tmp_path / 'items.tsv'), parts)
+
+    assert (tmp_path / 'items.tsv').read_bytes() == b''.join(chunks)
+    assert os.listdir(tmp_path) == ['items.tsv']
+
+
+def test_concat_part_files_falls_back_when_kernel_copy_fails(ext, monkeypatch, tmp_path):
+    chunks = [b'id\n', b'1\n2\n', b'3\n']
+    parts = _write_parts(tmp_path, chunks)
+
+    def unsupported(*args, **kwargs):
+        raise OSError('copy_file_range غير مدعومة')
+    monkeypatch.setattr(ext.os, 'copy_file_range', unsupported, raising=False)
+    ext.concat_part_files(str(tmp_path / 'items.tsv'), parts)
+
+    assert (tmp_path / 'items.tsv').read_bytes() == b''.join(chunks)
+
+
+# ============ العينات ============
+def test_sampling_is_bounded_ordered_and_reproducible(ext, monkeypatch, tmp_path):
+    db_path = make_db(tmp_path / 'app.db', [(i, f'n{i}', i / 2) for i in range(2000)])
+    make_db(db_path, [(i, f'm{i}', 0.0) for i in range(10)], table='small')
+    monkeypatch.setattr(ext, 'DB_SAMPLE_ROWS', 50)
+
+    for mode in ('stratified', 'uniform'):
+        monkeypatch.setattr(ext, 'DB_SAMPLE_MODE', mode)
+        first = _export_dir(ext, db_path, tmp_path / f'{mode}1')
+        second = _export_dir(ext, db_path, tmp_path / f'{mode}2')
+        assert first == second
+        ids = [int(row[0]) for row in first[1]['items.tsv'][1:]]
+        assert ids == sorted(set(ids))
+        # الطبقية تختار صفاً من كل شريحة، والموحدة قد تقع نقطتان على الصف نفسه فتُعوَّض جزئياً
+        assert len(ids) == 50 if mode == 'stratified' else 40 < len(ids) <= 50
+        # الجدول الأصغر من حجم العينة يُصدّر كاملاً
+        assert len(first[1]['small.tsv']) == 1 + 10
+
+
+def test_sampling_without_rowid_follows_the_seed(ext, monkeypatch, tmp_path):
+    db_path = tmp_path / 'app.db'
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE pairs (region TEXT, id INTEGER, value REAL, PRIMARY KEY (region, id)) WITHOUT ROWID")
+    conn.executemany("INSERT INTO pairs VALUES (?, ?, ?)",
+                     [(region, i, i / 2) for region in ('شمال', 'جنوب') for i in range(600)])
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(ext, 'DB_SAMPLE_ROWS', 40)
+
+    for mode in ('stratified', 'uniform'):
+        monkeypatch.setattr(ext, 'DB_SAMPLE_MODE', mode)
+        first = _export_dir(ext, str(db_path), tmp_path / f'{mode}1')
+        second = _export_dir(ext, str(db_path), tmp_path / f'{mode}2')
+        assert first == second
+        keys = [(row[0], int(row[1])) for row in first[1]['pairs.tsv'][1:]]
+        assert len(keys) == 40 and len(set(keys)) == 40
+        assert {region for region, _ in keys} == {'شمال', 'جنوب'}
+
+    monkeypatch.setattr(ext, 'DB_SAMPLE_SEED', 7)
+    reseeded = _export_dir(ext, str(db_path), tmp_path / 'seed7')
+    assert reseeded[1] != first[1]
+
+
+# ============ المخرجات العمودية (Parquet / Arrow) ============
+def test_columnar_export_keeps_types_and_nulls(ext, monkeypatch, tmp_path):
+    pa = pytest.importorskip('pyarrow')
+    import pyarrow.parquet as pq
+    db_path = make_db(tmp_path / 'app.db', [(1, 'أ', 0.5), (2, None, None), (3, 'أ', 1.5)])
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE files (id INTEGER, data BLOB)")
+    conn.execute("INSERT INTO files VALUES (1, x'0001')")
+    conn.commit()
+    conn.close()
+    expected = [{'id': 1, 'name': 'أ', 'score': 0.5},
+                {'id': 2, 'name': None, 'score': None},
+                {'id': 3, 'name': 'أ', 'score': 1.5}]
+
+    for fmt in ('parquet', 'arrow'):
+        monkeypatch.setattr(ext, 'TABLE_OUTPUT_FORMAT', fmt)
+        out_dir = tmp_path / fmt
+        out_dir.mkdir()
+        files, rows = ext.extract_db_direct_to_text(db_path, str(out_dir))
+        assert rows == 4
+        assert sorted(os.listdir(out_dir)) == [f'files.{fmt}', f'items.{fmt}']
+        if fmt == 'parquet':
+            items, blobs = pq.read_table(out_dir / 'items.parquet'), pq.read_table(out_dir / 'files.parquet')
+        else:
+            with pa.memory_map(str(out_dir / 'items.arrow')) as src:
+                items = pa.ipc.open_file(src).read_all()
+            with pa.memory_map(str(out_dir / 'files.arrow')) as src:
+                blobs = pa.ipc.open_file(src).read_all()
+        assert items.to_pylist() == expected
+        assert items.schema.field('id').type == pa.int64()
+        assert items.schema.field('score').type == pa.float64()
+        assert pa.types.is_dictionary(items.schema.field('name').type)
+        assert blobs.to_pylist() == [{'id': 1, 'data': b'\x00\x01'}]
+
+
+# ============ ملفات BLOB الجانبية ============
+def test_blobs_written_to_sidecars_and_routed_to_handlers(ext, monkeypatch, tmp_path):
+    monkeypatch.setattr(ext, 'DB_EXTRACT_BLOBS', True)
+    docx = io.BytesIO()
+    make_docx(docx)
+    db_path = tmp_path / 'app.db'
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE files (id INTEGER, name TEXT, data BLOB)")
+    conn.executemany("INSERT INTO files VALUES (?, ?, ?)", [
+        (1, 'report', docx.getvalue()),
+        (2, 'note', 'ملاحظة نصية'.encode('utf-8')),
+        (3, 'empty', None),
+    ])
+    conn.commit()
+    conn.close()
+    out_dir = tmp_path / 'out'
+    out_dir.mkdir()
+
+    files, rows = ext.extract_db_direct_to_text(str(db_path), str(out_dir))
+
+    assert rows == 3
+    assert read_tsv(out_dir / 'files.tsv') == [
+        ['id', 'name', 'data'],
+        ['1', 'report', '<blob:files_blobs/data-1>'],
+        ['2', 'note', '<blob:files_blobs/data-2>'],
+        ['3', 'empty', 'NULL'],
+    ]
+    blob_dir = out_dir / 'files_blobs'
+    assert sorted(os.listdir(blob_dir)) == ['data-1.docx', 'data-1_extracted', 'data-2.txt']
+    assert str(blob_dir / 'data-2.txt') in files
+    docx_text = [p for p in files if p.startswith(str(blob_dir / 'data-1_extracted'))]
+    assert len(docx_text) == 1
+    with open(docx_text[0], encoding='utf-8') as f:
+        assert f.read().startswith('قبل الجدول')
+
+
+# ============ التصدير التزايدي ============
+def test_incremental_folder_run_twice_appends_only_new_rows(ext, monkeypatch, tmp_path):
+    monkeypatch.setattr(ext, 'DB_INCREMENTAL', 'append')
+    folder = tmp_path / 'inbox'
+    folder.mkdir()
+    db_path = make_db(folder / 'app.db', [(i, f'n{i}', i / 2) for i in range(5)])
+
+    ext.process_single_item(str(folder))
+    out_path = tmp_path / 'inbox_extracted' / 'items.tsv'
+    assert len(read_tsv(out_path)) == 1 + 5
+
+    make_db(db_path, [(i, f'n{i}', i / 2) for i in range(5, 8)])
+    results = ext.process_single_item(str(folder))
+
+    # المجلد نفسه في التشغيل الثاني، والصفوف الجديدة فقط أُلحقت بالملف
+    assert sorted(os.listdir(tmp_path)) == ['inbox', 'inbox_extracted']
+    rows = read_tsv(out_path)
+    assert [row[0] for row in rows] == ['id'] + [str(i) for i in range(8)]
+    assert sum(processed for _, processed, _ in results) == 3
+
+
+def test_incremental_archive_member_keyed_by_member_name(ext, monkeypatch, tmp_path):
+    monkeypatch.setattr(ext, 'DB_INCREMENTAL', 'append')
+    db_path = make_db(tmp_path / 'app.db', [(i, f'n{i}', 0.5) for i in range(4)])
+    archive = tmp_path / 'bundle.zip'
+    with zipfile.ZipFile(archive, 'w') as z:
+        z.write(db_path, 'data/app.db')
+    ext.process_single_item(str(archive))
+
+    make_db(db_path, [(9, 'n9', 0.5)])
+    with zipfile.ZipFile(archive, 'w') as z:
+        z.write(db_path, 'data/app.db')
+    ext.process_single_item(str(archive))
+
+    out_dir = tmp_path / 'bundle_extracted' / 'data' / 'app_extracted'
+    assert [row[0] for row in read_tsv(out_dir / 'items.tsv')] == ['id', '0', '1', '2', '3', '9']
+    with open(out_dir / ext.DB_STATE_NAME, encoding='utf-8') as f:
+        assert list(json.load(f)['databases']) == [f"{archive}!data/app.db"]
+
+
+# ============ المسار المنسق (--via-excel) ============
+def test_via_excel_writes_formatted_tsv_without_workbook(ext, tmp_path):
+    db_path = tmp_path / 'app.db'
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE events (id INTEGER, created_at TEXT, note TEXT, payload BLOB)")
+    conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?)", [
+        (1, '2024-01-02 13:05:09', 'first', None),
+        (2, '2024-01-03 08:00:00', None, b'\x00\x01'),
+    ])
+    conn.commit()
+    conn.close()
+    out_dir = tmp_path / 'out'
+    out_dir.mkdir()
+
+    files, rows = ext.extract_db_via_excel_to_text(str(db_path), str(out_dir))
+
+    assert rows == 2
+    assert os.listdir(out_dir) == ['events.tsv']
+    assert read_tsv(files[0]) == [
+        ['id', 'created_at', 'note', 'payload'],
+        ['1', '02/01/2024 1:05:09 م', 'first', 'NULL'],
+        ['2', '03/01/2024 8:00:00 ص', 'NULL', '<binary data>'],
+    ]
+
+
+# ============ استنتاج أعمدة الطوابع الزمنية ============
+@pytest.mark.parametrize('name, declared, values, kind', [
+    ('user_id', 'INTEGER', [1700000000, 1700000100], None),
+    ('created_at', 'INTEGER', [1700000000, 1700003600], ('epoch', 's')),
+    ('updatedOn', '', [1700000000000, 1700000360000], ('epoch', 'ms')),
+    ('counter', 'INTEGER', [1700000000, 1700000001], ('epoch', 's')),
+    ('counter', 'INTEGER', [5, 17, 300], None),
+    ('amount', 'REAL', [1700000000.5, 12.0], None),
+    ('note', 'TEXT', ['2024-01-02 13:05:09', '2024-02-03 00:00:00'], ('text', '%Y-%m-%d %H:%M:%S')),
+    ('when', 'TEXT', ['2024-01-02', '02/01/2024 10:00:00'], ('text', None)),
+    ('note', 'TEXT', ['2024 summary', 'hello'], None),
+])
+def test_infer_column_kind(ext, name, declared, values, kind):
+    assert ext._infer_column_kind(name, declared, values) == kind
+
+
+def test_hinted_text_column_tolerates_a_few_outliers(ext):
+    values = ['2024-01-%02d 08:00:00' % day for day in range(1, 10)] + ['غير معروف']
+    assert ext._infer_column_kind('created', 'TEXT', values) == ('text', '%Y-%m-%d %H:%M:%S')
+    # دون تلميح من الاسم أو النوع، القيمة الشاذة الواحدة تكفي لرفض العمود
+    assert ext._infer_column_kind('label', 'TEXT', values) is None
+
+
+def test_timestamp_conversion_same_with_and_without_pandas(ext, monkeypatch, tmp_path):
+    pytest.importorskip('pandas')
+    conn = sqlite3.connect(tmp_path / 'app.db')
+    conn.execute("CREATE TABLE events (id INTEGER, created_at TEXT, seen_ts INTEGER, note TEXT)")
+    conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?)", [
+        (1, '2024-01-02 13:05:09', 1700000000, 'أ'),
+        (2, '2024-01-03 00:00:00', None, None),
+        (3, '2024-01-04 09:30:00', 1700003600, 'ب'),
+        (4, '2024-01-05 23:59:59', 1700007200, 'ج'),
+        (5, 'لاحقاً', 1700010800, 'د'),
+    ])
+    kinds = ext.infer_timestamp_columns(conn, 'events')
+    assert kinds == {1: ('text', '%Y-%m-%d %H:%M:%S'), 2: ('epoch', 's')}
+    columns = [list(c) for c in zip(*conn.execute("SELECT * FROM events").fetchall())]
+    conn.close()
+
+    vectorized = ext.format_columns(columns, kinds)
+    monkeypatch.setattr(ext, 'pd', None)
+    assert ext.format_columns(columns, kinds) == vectorized
+    assert vectorized[0] == ['1', '2', '3', '4', '5']
+    assert vectorized[1] == ['02/01/2024 1:05:09 م', '03/01/2024 12:00:00 ص', '04/01/2024 9:30:00 ص',
+                             '05/01/2024 11:59:59 م', 'لاحقاً']
+    assert vectorized[2][1] == 'NULL'
+    assert vectorized[3] == ['أ', 'NULL', 'ب', 'ج', 'د']
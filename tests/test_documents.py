@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""اختبارات معالجات المستندات (DOCX وXLSX) وأعضاء الأرشيفات في zip_rar_folder2txt.py"""
+
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from conftest import make_db, make_docx
+
+
+def _read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_docx_keeps_document_order_then_headers_and_notes(ext, tmp_path):
+    files, blocks = ext.extract_docx_to_text(str(make_docx(tmp_path / 'doc.docx')), str(tmp_path))
+    assert blocks == 7
+    assert _read(files[0]) == ("قبل الجدول\nأ1\tب1\nأ2\tب2\nبعد الجدول"
+                               "\n\n--- رؤوس وتذييلات الصفحات ---\nرأس\nتذييل"
+                               "\n\n--- حواشي ---\nحاشية")
+
+
+def test_docx_errors_return_empty_result(ext, tmp_path):
+    (tmp_path / 'dir.docx').mkdir()
+    assert ext.extract_docx_to_text(str(tmp_path / 'dir.docx'), str(tmp_path)) == ([], 0)
+    (tmp_path / 'broken.docx').write_bytes(b'not a zip')
+    assert ext.extract_docx_to_text(str(tmp_path / 'broken.docx'), str(tmp_path)) == ([], 0)
+
+
+def test_sheet_sizes_read_from_workbook_relationships(ext, tmp_path):
+    openpyxl = pytest.importorskip('openpyxl')
+    workbook = openpyxl.Workbook()
+    workbook.active.title = 'صغيرة'
+    workbook.active.append([1])
+    big = workbook.create_sheet('كبيرة')
+    for i in range(200):
+        big.append([i, 'نص' * 10])
+    workbook.save(tmp_path / 'book.xlsx')
+    reader = openpyxl.load_workbook(tmp_path / 'book.xlsx', read_only=True)
+    sizes = ext._sheet_sizes(str(tmp_path / 'book.xlsx'), reader.worksheets)
+    reader.close()
+    assert sizes['كبيرة'] > sizes['صغيرة'] > 1
+
+    # حزمة بلا workbook.xml.rels: كل الأوراق بحجم 1 بدل رفع استثناء
+    with zipfile.ZipFile(tmp_path / 'book.xlsx') as src, zipfile.ZipFile(tmp_path / 'norels.xlsx', 'w') as dst:
+        for info in src.infolist():
+            if info.filename != 'xl/_rels/workbook.xml.rels':
+                dst.writestr(info, src.read(info))
+    assert ext._sheet_sizes(str(tmp_path / 'norels.xlsx'), reader.worksheets) == {'صغيرة': 1, 'كبيرة': 1}
+
+
+def test_ragged_sheet_rows_get_unnamed_columns(ext, monkeypatch, tmp_path):
+    openpyxl = pytest.importorskip('openpyxl')
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = 'بيانات'
+    for row in (['الاسم', None, 'القيمة'], ['أ', 1], ['ب', 2, 3, None, 'زائد'], [], [None, None, 'ج']):
+        sheet.append(row)
+    sheet['H1'].number_format = '0.00'  # خلية منسقة بلا قيمة لا تضيف عموداً
+    workbook.save(tmp_path / 'ragged.xlsx')
+    header = ['الاسم', 'Unnamed: 1', 'القيمة', 'Unnamed: 3', 'Unnamed: 4']
+
+    out_dir = tmp_path / 'tsv'
+    out_dir.mkdir()
+    files, rows = ext.extract_excel_to_text(str(tmp_path / 'ragged.xlsx'), str(out_dir))
+    assert rows == 4
+    with open(files[0], encoding='utf-8') as f:
+        lines = [line.rstrip('\n').split('\t') for line in f]
+    assert lines == [header,
+                     ['أ', '1', 'NULL', 'NULL', 'NULL'],
+                     ['ب', '2', '3', 'NULL', 'زائد'],
+                     ['NULL'] * 5,
+                     ['NULL', 'NULL', 'ج', 'NULL', 'NULL']]
+
+    pytest.importorskip('pyarrow')
+    import pyarrow.parquet as pq
+    monkeypatch.setattr(ext, 'TABLE_OUTPUT_FORMAT', 'parquet')
+    out_dir = tmp_path / 'parquet'
+    out_dir.mkdir()
+    files, _ = ext.extract_excel_to_text(str(tmp_path / 'ragged.xlsx'), str(out_dir))
+    table = pq.read_table(files[0])
+    assert table.column_names == header
+    # عمود القيمة يجمع أرقاماً ونصاً فيُكتب نصاً
+    assert table.to_pylist()[1] == dict(zip(header, ['ب', 2, '3', None, 'زائد']))
+
+
+def _relative_files(root):
+    return sorted(os.path.relpath(os.path.join(base, name), root)
+                  for base, _, names in os.walk(root) for name in names)
+
+
+def test_archive_members_routed_to_handlers_under_member_paths(ext, tmp_path):
+    db_path = make_db(tmp_path / 'app.db', [(1, 'n1', 0.5)])
+    make_docx(tmp_path / 'q1.docx')
+    with zipfile.ZipFile(tmp_path / 'bundle.zip', 'w') as z:
+        z.write(tmp_path / 'q1.docx', 'reports/q1.docx')
+        z.write(db_path, 'data/app.db')
+        z.writestr('notes.txt', 'ملاحظة')
+        z.writestr('broken/x.docx', 'ليس مستند Word')
+    with tarfile.open(tmp_path / 'bundle.tar.gz', 'w:gz') as t:
+        t.add(tmp_path / 'q1.docx', 'reports/q1.docx')
+        t.add(db_path, 'data/app.db')
+
+    (files, processed, skipped), = ext.process_single_item(str(tmp_path / 'bundle.zip'))
+    assert (processed, skipped) == (3, 1)
+    assert _relative_files(tmp_path / 'bundle_extracted') == [
+        'data/app_extracted/items.tsv', 'notes.txt', 'reports/q1_extracted/document_text.txt']
+    assert _read(tmp_path / 'bundle_extracted' / 'reports' / 'q1_extracted' / 'document_text.txt').startswith('قبل الجدول')
+
+    (files, processed, skipped), = ext.process_single_item(str(tmp_path / 'bundle.tar.gz'))
+    assert (processed, skipped) == (2, 0)
+    assert _relative_files(tmp_path / 'bundle.tar_extracted') == [
+        'data/app_extracted/items.tsv', 'reports/q1_extracted/document_text.txt']
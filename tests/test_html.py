@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""تطابق مخرجات محركات HTML في zip_rar_folder2txt.py: lxml (XPath و iterparse) مقابل BeautifulSoup"""
+
+import pytest
+
+PAGE = """<!DOCTYPE html>
+<html lang="ar" dir="rtl">
+<head>
+  <meta charset="utf-8">
+  <title>عنوان لا يظهر</title>
+  <style>body { color: red; }</style>
+  <script>var hidden = "لا يظهر";</script>
+</head>
+<body>
+  <h1>تقرير <em>الربع</em> الأول</h1>
+  <!-- تعليق لا يظهر -->
+  <p>فقرة فيها <a href="#">رابط</a> ثم ذيل، و&amp; كيان &lt;محرف&gt;.</p>
+  <ul><li>أول</li><li>ثانٍ <b>عريض</b></li></ul>
+  <table><tr><td>خلية 1</td><td> خلية 2 </td></tr></table>
+  <div>نص<br>بعد فاصل<script>document.write("لا")</script> وذيل بعد السكربت</div>
+  <p>   </p>
+  <pre>سطر أول
+سطر ثان</pre>
+</body>
+</html>
+"""
+
+
+def _run(ext, tmp_path, engine, name):
+    out_dir = tmp_path / name
+    out_dir.mkdir()
+    files, lines = ext.extract_html_to_text(str(tmp_path / 'page.html'), str(out_dir), engine=engine)
+    with open(files[0], encoding='utf-8') as f:
+        return f.read(), lines
+
+
+def test_lxml_paths_match_beautifulsoup(ext, monkeypatch, tmp_path):
+    pytest.importorskip('bs4')
+    pytest.importorskip('lxml')
+    (tmp_path / 'page.html').write_text(PAGE, encoding='utf-8')
+
+    expected = _run(ext, tmp_path, 'bs4', 'bs4')
+    assert 'لا يظهر' not in expected[0] and 'color' not in expected[0]
+    assert _run(ext, tmp_path, 'lxml', 'xpath') == expected
+
+    # عتبة صفرية تجبر مسار iterparse، ونتأكد أنه هو الذي عمل فعلاً
+    streamed = []
+    real = ext._iter_html_text_streaming
+    monkeypatch.setattr(ext, 'HTML_ITERPARSE_BYTES', 0)
+    monkeypatch.setattr(ext, '_iter_html_text_streaming', lambda src: streamed.append(src) or real(src))
+    assert _run(ext, tmp_path, 'lxml', 'iterparse') == expected
+    assert streamed
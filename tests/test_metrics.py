@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""اختبارات قياس المراحل (measure_stage / instrumented) في zip_rar_folder2txt.py"""
+
+import os
+import time
+import zipfile
+
+from conftest import make_db
+
+
+def test_nested_stage_time_and_bytes_are_exclusive(ext, monkeypatch):
+    monkeypatch.setattr(ext, 'METRICS', ext.StageMetrics())
+    with ext.measure_stage('outer') as outer:
+        with ext.measure_stage('inner') as inner:
+            time.sleep(0.05)
+            inner['output_bytes'] = 100
+        outer['output_bytes'] = 150
+    stages = ext.METRICS.snapshot()
+    assert stages['inner']['wall_seconds'] >= 0.05
+    assert stages['outer']['wall_seconds'] < 0.05
+    assert stages['inner']['output_bytes'] == 100
+    assert stages['outer']['output_bytes'] == 50
+
+
+def test_archive_member_output_counted_once(ext, monkeypatch, tmp_path):
+    monkeypatch.setattr(ext, 'METRICS', ext.StageMetrics())
+    db_path = make_db(tmp_path / 'app.db', [(i, f'n{i}', i / 2) for i in range(50)])
+    with zipfile.ZipFile(tmp_path / 'bundle.zip', 'w') as z:
+        z.write(db_path, 'data/app.db')
+        z.writestr('notes.txt', 'ملاحظة')
+
+    ext.process_single_item(str(tmp_path / 'bundle.zip'))
+    on_disk = sum(os.path.getsize(os.path.join(root, name))
+                  for root, _, names in os.walk(tmp_path / 'bundle_extracted') for name in names)
+    stages = ext.METRICS.snapshot()
+    assert 'extract_db_direct_to_text' in stages
+    assert sum(entry['output_bytes'] for entry in stages.values()) == on_disk
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""اختبار تقسيم الملف المجمّع المضغوط: ما يكتبه open_text_output يقرؤه split_big_text_enhanced"""
+
+import os
+
+import pytest
+
+from scripts import split_big_text_enhanced as splitter
+
+
+def _section(name, body):
+    return f"اسم الملف: {name}\n{'-' * 50}\n{body}\n{'=' * 80}\n"
+
+
+@pytest.mark.parametrize('compression', ['gzip', 'zstd'])
+def test_split_reads_multi_frame_compressed_output(ext, monkeypatch, tmp_path, compression):
+    if compression == 'zstd' and ext._load_zstd() is None:
+        pytest.skip('zstd غير متوفرة')
+    monkeypatch.setattr(ext, 'OUTPUT_COMPRESSION', compression)
+    path = ext.output_name(str(tmp_path / 'merged.txt'))
+    # كتابتان منفصلتان: الثانية تُلحق إطاراً مضغوطاً جديداً
+    with ext.open_text_output(path) as f:
+        f.write(_section('docs/readme.md', 'مرحباً'))
+    with ext.open_text_output(path, 'a') as f:
+        f.write(_section('src/main.py', 'print("سلام")'))
+
+    assert splitter.split_big_text_file(path)
+
+    out_dir = tmp_path / 'merged_split'
+    assert not os.path.exists(path)
+    # safe_filename يستبدل فواصل المسار
+    assert sorted(os.listdir(out_dir)) == ['docs_readme.md', 'src_main.py']
+    with open(out_dir / 'docs_readme.md', encoding='utf-8') as f:
+        assert f.read().endswith('\n\nمرحباً')
+    with open(out_dir / 'src_main.py', encoding='utf-8') as f:
+        assert f.read().endswith('\n\nprint("سلام")')
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""اختبارات سجل الإدخال (IngestManifest) وإعادة محاولة العناصر الفاشلة في watch_folder.py"""
+
+import os
+import json
+
+from scripts import watch_folder
+
+
+def test_manifest_skips_successes_and_retries_failures_up_to_the_limit(tmp_path):
+    path = str(tmp_path / 'manifest.jsonl')
+    manifest = watch_folder.IngestManifest(path, max_attempts=2)
+    sig = (100, 1)
+    manifest.record('locked.zip', sig, {'status': 'error', 'error': 'الملف مقفل'})
+    assert not manifest.contains('locked.zip', sig)
+    manifest.record('ok.zip', sig, {'status': 'ok', 'files': 1})
+    assert manifest.contains('ok.zip', sig)
+
+    # السجل يُقرأ من جديد بعد إعادة التشغيل: المحاولة الفاشلة محسوبة
+    reloaded = watch_folder.IngestManifest(path, max_attempts=2)
+    assert reloaded.attempts('locked.zip', sig) == 1
+    assert not reloaded.contains('locked.zip', sig)
+    reloaded.record('locked.zip', sig, {'status': 'error', 'error': 'الملف مقفل'})
+    assert reloaded.contains('locked.zip', sig)
+    # تغيّر الملف على القرص يعني بصمة جديدة ومحاولات جديدة
+    assert not reloaded.contains('locked.zip', (100, 2))
+
+
+def _fail_first_time(path, *args):
+    # العلامة خارج المجلد المراقب حتى لا تُعد عنصراً جديداً
+    marker = os.path.join(os.path.dirname(os.path.dirname(path)), os.path.basename(path) + '.tried')
+    if not os.path.exists(marker):
+        open(marker, 'w').close()
+        return {'status': 'error', 'error': 'خطأ عابر', 'seconds': 0.0}
+    return {'status': 'ok', 'files': 1, 'processed': 1, 'skipped': 0, 'seconds': 0.0}
+
+
+def test_watch_retries_a_transient_failure(monkeypatch, tmp_path):
+    monkeypatch.setattr(watch_folder.extractor, 'run_item_job', _fail_first_time)
+    inbox = tmp_path / 'inbox'
+    inbox.mkdir()
+    (inbox / 'report.txt').write_text('نص', encoding='utf-8')
+    manifest_path = tmp_path / 'manifest.jsonl'
+
+    watch_folder.watch(str(inbox), workers=1, settle=0, poll_interval=0.05, manifest_path=str(manifest_path),
+                       once=True, force_polling=True)
+
+    with open(manifest_path, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert [(r['name'], r['status']) for r in records] == [('report.txt', 'error'), ('report.txt', 'ok')]
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""اختبارات طابور الإيجار في work_queue.py: عودة الإيجار المنتهي والفشل بعد max_attempts"""
+
+import os
+
+import pytest
+
+from scripts import work_queue
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(params=['queue.db', 'queue.json'])
+def queue_factory(request, tmp_path):
+    def make(clock, max_attempts=2):
+        path = str(tmp_path / request.param)
+        cls = work_queue.FileLeaseQueue if path.endswith('.json') else work_queue.SQLiteLeaseQueue
+        return cls(path, max_attempts=max_attempts, clock=clock)
+    return make
+
+
+def test_expired_lease_requeued_then_failed_after_max_attempts(queue_factory):
+    clock = FakeClock()
+    queue = queue_factory(clock)
+    assert queue.enqueue(['/data/a.zip', '/data/b.zip', '/data/a.zip']) == 2
+
+    item_id, path = queue.lease('w1', lease_seconds=60)
+    assert path == '/data/a.zip'
+    clock.now += 30
+    assert queue.heartbeat(item_id, 'w1', lease_seconds=60)
+    clock.now += 61
+    # الإيجار انتهى: يعود العنصر إلى الطابور ويفقد العامل الأول ملكيته
+    assert queue.stats() == {'queued': 2, 'leased': 0, 'done': 0, 'failed': 0}
+    assert queue.lease('w2', lease_seconds=60) == (item_id, '/data/a.zip')
+    assert not queue.complete(item_id, 'w1', {'status': 'ok'})
+
+    clock.now += 61
+    # المحاولة الثانية انتهت أيضاً وهي الأخيرة
+    assert queue.stats() == {'queued': 1, 'leased': 0, 'done': 0, 'failed': 1}
+    assert queue.failures() == [('/data/a.zip', 2, 'انتهى الإيجار في كل المحاولات')]
+    assert queue.lease('w3')[1] == '/data/b.zip'
+    assert queue.lease('w4') is None
+
+    assert queue.requeue_failed() == 1
+    assert queue.lease('w4') == (item_id, '/data/a.zip')
+
+
+def test_completed_item_stays_done_after_lease_time(queue_factory):
+    clock = FakeClock()
+    queue = queue_factory(clock)
+    queue.enqueue(['/data/a.zip'])
+    item_id, _ = queue.lease('w1', lease_seconds=60)
+    assert queue.complete(item_id, 'w1', {'status': 'ok', 'files': 3})
+    clock.now += 3600
+    assert queue.stats() == {'queued': 0, 'leased': 0, 'done': 1, 'failed': 0}
+
+
+def test_expand_inputs_skips_output_folders(tmp_path):
+    for name in ('a.zip', 'b.db', '.hidden', 'a_extracted', 'a_extracted_2', 'my_extracted_data'):
+        path = tmp_path / name
+        if '.' in name:
+            path.write_bytes(b'')
+        else:
+            path.mkdir()
+    paths = work_queue.expand_inputs([str(tmp_path)], expand=True)
+    assert [os.path.basename(p) for p in paths] == ['a.zip', 'b.db', 'my_extracted_data']